@@ -0,0 +1,166 @@
+"""
+Εφάπαξ συμπίεση (compaction) των διπλοεγγραφών του ClassBot.
+
+Διαβάζει κάθε worksheet καταχωρήσεων (το ClassBot ή κάθε shard) απευθείας από το Sheet και
+ομαδοποιεί τις σειρές του ίδιου εκπαιδευτικού (UserId) με το ίδιο hash περιεχομένου
+(voithos.content_hashes: ίδια School, Tmima, Keyword, Info, URL, Date).
+
+Διαγράφονται μόνο οι ακριβείς διπλοεγγραφές (exact hash: διαφορές μόνο σε κενά στην αρχή/τέλος): από
+κάθε ομάδα κρατείται η παλαιότερη σειρά (μικρότερο Internal_ID) και, αν δεν έχει ActionDate, παίρνει
+την πρώτη ActionDate των διπλότυπων. Οι υπόλοιπες σειρές διαγράφονται με ένα batch_update ανά worksheet.
+Οι πιθανές διπλοεγγραφές (near hash: διαφορές και σε κεφαλαία/πεζά, τόνους, κενά και στίξη) μόνο
+αναφέρονται, ώστε να τις ελέγξει ο εκπαιδευτικός.
+
+Χωρίς --apply γίνεται μόνο δοκιμαστική εκτέλεση (αναφορά χωρίς εγγραφές). Η εφαρμογή βλέπει τις
+αλλαγές ως εξωτερική επεξεργασία του Sheet (νέα έκδοση δεδομένων) και ξαναφορτώνει τα δεδομένα.
+
+Η εντολή είναι ξεχωριστή διεργασία με δικό της SheetsQuotaManager: δεν συντονίζεται με το όριο
+αιτημάτων της εφαρμογής, αν και μοιράζεται το ίδιο όριο του Google API. Τρέξτε τη σε ώρες χαμηλής κίνησης.
+
+Χρήση (από τον φάκελο με το .streamlit/secrets.toml):
+    python compact.py            # αναφορά των διπλοεγγραφών
+    python compact.py --apply    # συγχώνευση και διαγραφή των ακριβών διπλοεγγραφών
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+import voithos
+from voithos import CLASSBOT_REQUIRED_COLS
+
+
+def classbot_worksheets():
+    """(όνομα, worksheet) για κάθε worksheet καταχωρήσεων: τα shards ή το ενιαίο ClassBot."""
+    if voithos.SHARDED_MODE:
+        routes = sorted(set(voithos.shard_routes().values()))
+        return [
+            (f"{spreadsheet_name}/{worksheet_name}", voithos.open_spreadsheet(spreadsheet_name).worksheet(worksheet_name))
+            for spreadsheet_name, worksheet_name in routes
+        ]
+    return [(voithos.SHEET_NAME, voithos.open_spreadsheet(voithos.SHEET_NAME).get_worksheet(0))]
+
+def find_duplicate_groups(df, exact=True):
+    """
+    Λίστα ομάδων διπλοεγγραφών: ταξινομημένα Internal_ID (τουλάχιστον δύο) με το ίδιο UserId και το ίδιο
+    exact hash, ή με exact=False το ίδιο near hash.
+    """
+    if df.empty:
+        return []
+    hashes = voithos.content_hashes(df)[0 if exact else 1]
+    groups = {}
+    for internal_id, user_id, content_hash in zip(df['Internal_ID'].tolist(), df['UserId'].tolist(), hashes.tolist()):
+        groups.setdefault((user_id, content_hash), []).append(int(internal_id))
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+def near_only_groups(df, exact_groups):
+    """Ομάδες πιθανών διπλοεγγραφών (ίδιο near hash) που δεν είναι ήδη ολόκληρες μία ακριβής ομάδα."""
+    exact = {tuple(group) for group in exact_groups}
+    return [group for group in find_duplicate_groups(df, exact=False) if tuple(group) not in exact]
+
+def plan_compaction(df, groups):
+    """
+    Για κάθε ομάδα: (Internal_ID που κρατείται, καταχώρηση μετά τη συγχώνευση - λίστα με τη σειρά του
+    CLASSBOT_REQUIRED_COLS - ή None αν δεν αλλάζει, Internal_ID προς διαγραφή). Η σειρά που κρατείται
+    συμπληρώνει την ActionDate από τα διπλότυπα.
+    """
+    records = df.set_index(df['Internal_ID'].astype(int))[CLASSBOT_REQUIRED_COLS]
+    plan = []
+    for group in groups:
+        keep, duplicates = group[0], group[1:]
+        merged = None
+        if pd.isna(records.at[keep, 'ActionDate']):
+            action_dates = records.loc[duplicates, 'ActionDate'].dropna()
+            if not action_dates.empty:
+                record = records.loc[keep].copy()
+                record['ActionDate'] = action_dates.iloc[0]
+                merged = voithos.record_to_sheet_row(tuple(record))
+        plan.append((keep, merged, duplicates))
+    return plan
+
+def unchanged_since_plan(ws, df, plan):
+    """Ξαναδιαβάζει το worksheet: True αν όλες οι σειρές του σχεδίου έχουν ακόμη το ίδιο περιεχόμενο και θέση."""
+    current, _ = voithos.ingest_classbot_worksheet(ws)
+    touched = [iid for keep, _, duplicates in plan for iid in [keep, *duplicates]]
+    before = df.set_index(df['Internal_ID'].astype(int))
+    after = current.set_index(current['Internal_ID'].astype(int))
+    if not set(touched) <= set(after.index):
+        return False
+    exact_before, _ = voithos.content_hashes(before.loc[touched])
+    exact_after, _ = voithos.content_hashes(after.loc[touched])
+    return bool((exact_before == exact_after).all())
+
+def apply_compaction(ws, plan, headers):
+    """
+    Γράφει τις συγχωνευμένες σειρές (στις στήλες της επικεφαλίδας headers) και διαγράφει τα διπλότυπα
+    (από κάτω προς τα πάνω, ένα αίτημα).
+    """
+    cells = [cell for keep, merged, _ in plan if merged is not None for cell in voithos.entry_cell_updates(keep + 1, merged, headers)]
+    if cells:
+        ws.batch_update(cells, value_input_option='USER_ENTERED')
+
+    # Internal_ID = σειρά Sheet - 1 = startIndex (0-based) της διαγραφής
+    rows = sorted((iid for _, _, duplicates in plan for iid in duplicates), reverse=True)
+    ws.spreadsheet.batch_update({'requests': [
+        {'deleteDimension': {'range': {'sheetId': ws.id, 'dimension': 'ROWS', 'startIndex': iid, 'endIndex': iid + 1}}}
+        for iid in rows
+    ]})
+    return len(rows)
+
+def compact_worksheet(name, ws, apply=False):
+    """Εντοπίζει (και με apply=True συγχωνεύει) τις διπλοεγγραφές ενός worksheet. Επιστρέφει τις σειρές που (θα) διαγραφούν."""
+    df, report = voithos.ingest_classbot_worksheet(ws)
+    if report['quarantined']:
+        print(f"[{name}] {report['quarantined']} άκυρες σειρές αγνοήθηκαν (βλ. αναφορά καραντίνας).")
+
+    groups = find_duplicate_groups(df)
+    plan = plan_compaction(df, groups)
+    records = df.set_index(df['Internal_ID'].astype(int))
+    for group in near_only_groups(df, groups):
+        row = records.loc[group[0]]
+        print(
+            f"[{name}] {row['School']} / {row['Tmima']} '{row['Keyword']}': πιθανές διπλοεγγραφές τα ID "
+            f"{', '.join(map(str, group))} (δεν διαγράφονται, ελέγξτε τις χειροκίνητα)"
+        )
+    if not plan:
+        print(f"[{name}] Δεν βρέθηκαν ακριβείς διπλοεγγραφές.")
+        return 0
+
+    for keep, merged, duplicates in plan:
+        row = records.loc[keep]
+        merge_note = " (συμπληρώνεται η ActionDate)" if merged is not None else ""
+        print(
+            f"[{name}] {row['School']} / {row['Tmima']} '{row['Keyword']}': κρατείται το ID {keep}{merge_note}, "
+            f"διαγράφονται τα ID {', '.join(map(str, duplicates))}"
+        )
+
+    count = sum(len(duplicates) for _, _, duplicates in plan)
+    if not apply:
+        return count
+    if not unchanged_since_plan(ws, df, plan):
+        print(f"[{name}] Το worksheet άλλαξε κατά την ανάλυση: δεν έγινε καμία αλλαγή, ξανατρέξτε την εντολή.", file=sys.stderr)
+        return 0
+    return apply_compaction(ws, plan, df.attrs[voithos.SHEET_HEADERS_ATTR])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Εντοπισμός και συγχώνευση των διπλοεγγραφών του ClassBot.")
+    parser.add_argument('--apply', action='store_true', help="Εφαρμογή των αλλαγών (χωρίς αυτό: μόνο αναφορά)")
+    args = parser.parse_args(argv)
+
+    if voithos.gc is None:
+        print("Η σύνδεση με το Google Sheets απέτυχε. Ελέγξτε τα secrets.toml.", file=sys.stderr)
+        return 1
+
+    total = 0
+    for name, ws in classbot_worksheets():
+        total += compact_worksheet(name, ws, apply=args.apply)
+
+    if args.apply:
+        print(f"Διαγράφηκαν {total} ακριβώς διπλότυπες σειρές.")
+    else:
+        print(f"Βρέθηκαν {total} ακριβώς διπλότυπες σειρές. Δοκιμαστική εκτέλεση: χρησιμοποιήστε --apply για συγχώνευση.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
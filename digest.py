@@ -0,0 +1,238 @@
+"""
+Offline ημερήσιο digest του Ψηφιακού Βοηθού Τάξης.
+
+Διαβάζει μία φορά τα δεδομένα ClassBot και γράφει, για κάθε (School, Tmima), τις ενότητες
+"Πρόσφατες Ανακοινώσεις" και "Προσεχείς Ενέργειες" με τους ίδιους κανόνες της σελίδας
+(select_recent_posts / select_upcoming_posts του voithos.py), ως στατικά αρχεία JSON/HTML
+και προαιρετικά ως .ics ημερολόγιο ανά τμήμα. Τα αρχεία μπορούν να σερβίρονται απευθείας
+ή να αποστέλλονται με email, χωρίς φόρτο στη διεργασία του Streamlit.
+
+Χρήση (από τον φάκελο με το .streamlit/secrets.toml):
+    python digest.py --out digest [--ics] [--date 20/10/2025]
+"""
+import argparse
+import html
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+from unidecode import unidecode
+
+import voithos
+from voithos import DATE_FORMAT
+
+
+def slugify(name):
+    """Ασφαλές (ASCII) όνομα αρχείου για Σχολείο/Τμήμα."""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', unidecode(str(name))).strip('_')
+    return slug or 'empty'
+
+def markdown_bold_to_html(text):
+    """Μετατρέπει τα **...** (markdown του Streamlit) σε <strong> για τα στατικά HTML."""
+    return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
+
+def write_file_atomic(path, content):
+    """Γράφει ένα αρχείο μέσω προσωρινού αρχείου, ώστε ο web server να μη σερβίρει μισό digest."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def load_all_posts(strict=False):
+    """
+    Φορτώνει μία φορά όλα τα δεδομένα ClassBot (ή όλα τα shards, παράλληλα). Με strict=True μια
+    αποτυχία ανάγνωσης προκαλεί voithos.SheetLoadError αντί να δώσει άδεια (ή ελλιπή) δεδομένα.
+    """
+    if voithos.SHARDED_MODE:
+        routes = voithos.shard_routes()
+        if strict and not routes:
+            raise voithos.SheetLoadError(f"Ο πίνακας δρομολόγησης '{voithos.SHARDS_SHEET}' δεν φορτώθηκε.")
+        frames = voithos.load_school_shards(routes, raise_errors=strict)
+        frames = [df for df, _ in frames.values() if not df.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    load_data = voithos.load_data.__wrapped__ if strict else voithos.load_data
+    df, _ = load_data(voithos.classbot_data_version())
+    return df
+
+
+# --------------------------------------------------------------------------------
+# ΔΗΜΙΟΥΡΓΙΑ DIGEST ΑΝΑ ΤΜΗΜΑ
+# --------------------------------------------------------------------------------
+
+def _entry_dict(row):
+    return {
+        'keyword': row['Keyword'],
+        'type': row['Type'],
+        'info': row['Info'],
+        'url': row['URL'],
+    }
+
+def build_class_digest(school, tmima, class_df, today):
+    """Υπολογίζει τις δύο ενότητες της σελίδας για ένα τμήμα."""
+    recent_posts = voithos.select_recent_posts(class_df, today)
+    future_posts = voithos.select_upcoming_posts(class_df, today)
+
+    recent = [dict(_entry_dict(row), date=row['Date'].strftime(DATE_FORMAT)) for _, row in recent_posts.iterrows()]
+    upcoming = []
+    for date_only, group in future_posts.groupby('Action_Date_Only'):
+        upcoming.append({
+            'date': date_only.strftime(DATE_FORMAT),
+            'days_remaining': (date_only - today).days,
+            'items': [dict(_entry_dict(row), internal_id=int(row['Internal_ID'])) for _, row in group.iterrows()],
+        })
+
+    return {
+        'school': school,
+        'tmima': tmima,
+        'date': today.strftime(DATE_FORMAT),
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'recent': recent,
+        'upcoming': upcoming,
+    }
+
+def render_digest_html(digest, today):
+    """Στατική σελίδα HTML με τις ίδιες κάρτες (και το ίδιο CSS) με την εφαρμογή."""
+    school = html.escape(digest['school'])
+    tmima = html.escape(digest['tmima'])
+    parts = [
+        "<!DOCTYPE html>",
+        "<html lang='el'><head><meta charset='utf-8'>",
+        "<meta name='viewport' content='width=device-width, initial-scale=1'>",
+        f"<title>Βοηθός Τάξης - {school} ({tmima})</title>",
+        voithos.CUSTOM_CSS,
+        "</head><body style='font-family: sans-serif; max-width: 730px; margin: auto; padding: 1em;'>",
+        f"<h2 class='main-header'>Ψηφιακός Βοηθός Τάξης - {school} ({tmima})</h2>",
+        f"<h2>📢 Πρόσφατες Ανακοινώσεις ({tmima})</h2>",
+    ]
+    if digest['recent']:
+        for item in digest['recent']:
+            parts.append(voithos.render_card_html(item['type'], item['info'], item['url'], item['keyword'], item['date']))
+    else:
+        parts.append(f"<p>Δεν υπάρχουν πρόσφατες ανακοινώσεις (τελευταίες {voithos.RECENT_DAYS} ημέρες).</p>")
+
+    parts.append(f"<h2>📅 Προσεχείς Ενέργειες/Γεγονότα ({tmima})</h2>")
+    if digest['upcoming']:
+        for day in digest['upcoming']:
+            date_only = datetime.strptime(day['date'], DATE_FORMAT).date()
+            days_message = markdown_bold_to_html(voithos.days_remaining_message(date_only, today))
+            parts.append(f"<h3>🗓️ {day['date']} - {days_message}</h3>")
+            for item in day['items']:
+                parts.append(voithos.render_card_html(item['type'], item['info'], item['url'], item['keyword']))
+    else:
+        parts.append(f"<p>Δεν υπάρχουν προγραμματισμένες ενέργειες/γεγονότα τις επόμενες {voithos.UPCOMING_DAYS} ημέρες.</p>")
+
+    parts.append(f"<p style='color: #5D6D7E; font-size: 0.8em;'>Ενημέρωση: {digest['generated_at']}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+# --------------------------------------------------------------------------------
+# ICS (ΗΜΕΡΟΛΟΓΙΟ ΑΝΑ ΤΜΗΜΑ)
+# --------------------------------------------------------------------------------
+
+def _ics_escape(text):
+    return str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _ics_fold(line):
+    """Αναδίπλωση γραμμής στα 75 octets (RFC 5545)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    chunks, current = [], b''
+    for char in line:
+        char_bytes = char.encode('utf-8')
+        if len(current) + len(char_bytes) > (75 if not chunks else 74):
+            chunks.append(current.decode('utf-8'))
+            current = b''
+        current += char_bytes
+    chunks.append(current.decode('utf-8'))
+    return '\r\n '.join(chunks)
+
+def render_digest_ics(digest):
+    """Ημερολόγιο .ics με τις προσεχείς ενέργειες του τμήματος (ολοήμερα γεγονότα)."""
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Steam Project//Psifiakos Voithos Taxis//EL",
+        f"X-WR-CALNAME:{_ics_escape(digest['school'])} - {_ics_escape(digest['tmima'])}",
+    ]
+    for day in digest['upcoming']:
+        date_only = datetime.strptime(day['date'], DATE_FORMAT).date()
+        for item in day['items']:
+            description = item['info'] + (f"\n{item['url']}" if item['url'] else "")
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{slugify(digest['school'])}-{slugify(digest['tmima'])}-{item['internal_id']}@classbot",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART;VALUE=DATE:{date_only.strftime('%Y%m%d')}",
+                f"DTEND;VALUE=DATE:{(date_only + timedelta(days=1)).strftime('%Y%m%d')}",
+                f"SUMMARY:{_ics_escape(item['keyword'])}",
+                f"DESCRIPTION:{_ics_escape(description)}",
+                "END:VEVENT",
+            ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_ics_fold(line) for line in lines) + "\r\n"
+
+
+# --------------------------------------------------------------------------------
+# ΚΥΡΙΑ ΛΟΓΙΚΗ
+# --------------------------------------------------------------------------------
+
+def write_digests(df, out_dir, today, with_ics=False):
+    """Γράφει τα digest όλων των τμημάτων και ένα index.json. Επιστρέφει το πλήθος των τμημάτων."""
+    os.makedirs(out_dir, exist_ok=True)
+    index = []
+
+    for (school, tmima), class_df in df.groupby(['School', 'Tmima'], sort=True):
+        digest = build_class_digest(school, tmima, class_df, today)
+        school_dir = os.path.join(out_dir, slugify(school))
+        os.makedirs(school_dir, exist_ok=True)
+        base_name = slugify(tmima)
+
+        files = {'json': f"{slugify(school)}/{base_name}.json", 'html': f"{slugify(school)}/{base_name}.html"}
+        write_file_atomic(os.path.join(school_dir, f"{base_name}.json"), json.dumps(digest, ensure_ascii=False, indent=1))
+        write_file_atomic(os.path.join(school_dir, f"{base_name}.html"), render_digest_html(digest, today))
+        if with_ics:
+            files['ics'] = f"{slugify(school)}/{base_name}.ics"
+            write_file_atomic(os.path.join(school_dir, f"{base_name}.ics"), render_digest_ics(digest))
+
+        index.append({
+            'school': school,
+            'tmima': tmima,
+            'recent': len(digest['recent']),
+            'upcoming': sum(len(day['items']) for day in digest['upcoming']),
+            'files': files,
+        })
+
+    write_file_atomic(os.path.join(out_dir, 'index.json'), json.dumps({
+        'date': today.strftime(DATE_FORMAT),
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'classes': index,
+    }, ensure_ascii=False, indent=1))
+    return len(index)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Δημιουργία στατικών digest (JSON/HTML/ICS) ανά Σχολείο και Τμήμα.")
+    parser.add_argument('--out', default='digest', help="Φάκελος εξόδου (προεπιλογή: digest)")
+    parser.add_argument('--ics', action='store_true', help="Δημιουργία και ημερολογίου .ics ανά τμήμα")
+    parser.add_argument('--date', help=f"Ημερομηνία αναφοράς σε μορφή {DATE_FORMAT} (προεπιλογή: σήμερα)")
+    args = parser.parse_args(argv)
+
+    today = datetime.strptime(args.date, DATE_FORMAT).date() if args.date else datetime.now().date()
+
+    df = load_all_posts()
+    if df.empty:
+        print("Δεν φορτώθηκαν δεδομένα ClassBot. Ελέγξτε τα secrets.toml και τη δομή του Sheet.", file=sys.stderr)
+        return 1
+
+    count = write_digests(df, args.out, today, with_ics=args.ics)
+    print(f"Δημιουργήθηκαν digest για {count} τμήματα στον φάκελο '{args.out}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+Συμπαγή πακέτα εξαγωγής (gzip JSON) ανά Σχολείο/Τμήμα για τους mobile/offline clients.
+
+Κάθε πακέτο περιέχει τις καταχωρήσεις του τμήματος, τις προσεχείς ενέργειες (ίδιοι κανόνες με τη
+σελίδα) και το ευρετήριο αναζήτησης (tag -> φράσεις-κλειδιά). Η έκδοσή του (ETag) είναι hash του
+περιεχομένου, οπότε ένα αμετάβλητο πακέτο δίνει πάντα το ίδιο ETag (και τα ίδια bytes). Κάθε
+καταχώρηση έχει ως id την έκδοσή της (voithos.entry_version), που δεν αλλάζει όταν μετακινούνται
+οι σειρές του Sheet: έτσι ένα delta "από την έκδοση Χ" είναι απλώς νέα ids και ids που αφαιρέθηκαν.
+
+Χρήση (από τον φάκελο με το .streamlit/secrets.toml):
+    python export.py --out exports               # εγγραφή των πακέτων σε αρχεία .json.gz
+    python export.py --serve [--port 8502]       # HTTP server:
+        GET /index                                   λίστα τμημάτων και εκδόσεων
+        GET /bundle?school=...&tmima=...             πλήρες πακέτο (304 με If-None-Match: <ETag>)
+        GET /bundle?school=...&tmima=...&since=<ETag>  μόνο οι αλλαγές από εκείνη την έκδοση
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import voithos
+from voithos import CLASSBOT_REQUIRED_COLS, DATE_FORMAT
+from digest import load_all_posts, slugify
+
+BUNDLE_FORMAT = 1
+BUNDLE_HISTORY = 20 # Εκδόσεις ανά τμήμα που κρατούνται για τα delta
+
+
+# --------------------------------------------------------------------------------
+# ΔΗΜΙΟΥΡΓΙΑ ΠΑΚΕΤΟΥ ΑΝΑ ΤΜΗΜΑ
+# --------------------------------------------------------------------------------
+
+def _format_date(value):
+    return value.strftime(DATE_FORMAT) if pd.notna(value) else ""
+
+def entry_ids(class_df):
+    """
+    Τα ids των καταχωρήσεων του τμήματος (Series με το index του class_df): η έκδοση της καταχώρησης
+    (voithos.entry_version) και, για κάθε επόμενη πανομοιότυπη καταχώρηση, '.1', '.2', ... ώστε οι
+    διπλοεγγραφές να μην ενώνονται σε ένα id στα delta.
+    """
+    seen = {}
+    ids = []
+    for record in zip(*[class_df[col] for col in CLASSBOT_REQUIRED_COLS]):
+        version = voithos.entry_version(record)
+        occurrence = seen.get(version, 0)
+        seen[version] = occurrence + 1
+        ids.append(f"{version}.{occurrence}" if occurrence else version)
+    return pd.Series(ids, index=class_df.index, dtype=object)
+
+def bundle_entries(class_df, ids):
+    """Οι καταχωρήσεις του τμήματος σε συμπαγή μορφή, με τα ids της entry_ids (τα νεότερα πρώτα)."""
+    items = []
+    columns = [class_df[col] for col in CLASSBOT_REQUIRED_COLS]
+    for entry_id, record in zip(ids, zip(*columns)):
+        keyword, info, url, item_type, date, _, _, _, action_date = record
+        items.append((date, {
+            'id': entry_id,
+            'keyword': keyword,
+            'info': info,
+            'url': url,
+            'type': item_type,
+            'date': _format_date(date),
+            'action_date': _format_date(action_date),
+        }))
+    # Σταθερή σειρά (ίδιο περιεχόμενο -> ίδια bytes): ημερομηνία φθίνουσα, μετά id
+    items.sort(key=lambda item: item[1]['id'])
+    items.sort(key=lambda item: item[0], reverse=True)
+    return [entry for _, entry in items]
+
+def build_class_bundle(school, tmima, class_df, today):
+    """Το πακέτο ενός τμήματος: καταχωρήσεις, προσεχείς ενέργειες και ευρετήριο φράσεων-κλειδιών."""
+    ids = entry_ids(class_df)
+    entries = bundle_entries(class_df, ids)
+
+    upcoming_df = voithos.select_upcoming_posts(class_df, today)
+    upcoming = []
+    for date_only, group in upcoming_df.groupby('Action_Date_Only'):
+        upcoming.append({
+            'date': date_only.strftime(DATE_FORMAT),
+            'days_remaining': (date_only - today).days,
+            'ids': sorted(ids.loc[group.index]),
+        })
+
+    keywords = {}
+    for keyword in sorted(class_df['Keyword'].unique()):
+        for tag in voithos.get_tags_from_keyword(keyword):
+            keywords.setdefault(tag, []).append(keyword)
+
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'school': school,
+        'tmima': tmima,
+        'date': today.strftime(DATE_FORMAT),
+        'entries': entries,
+        'upcoming': upcoming,
+        'keywords': keywords,
+    }
+    bundle['version'] = content_version(bundle)
+    return bundle
+
+def content_version(payload):
+    """Σταθερό ETag: hash της κανονικοποιημένης JSON μορφής."""
+    return hashlib.sha256(canonical_json(payload)).hexdigest()[:20]
+
+def canonical_json(payload):
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+def encode_bundle(payload):
+    """gzip χωρίς χρονοσφραγίδα (mtime=0): ίδιο περιεχόμενο -> ίδια bytes."""
+    return gzip.compress(canonical_json(payload), mtime=0)
+
+def build_delta(bundle, since_version, since_ids):
+    """Οι αλλαγές από μια παλαιότερη έκδοση: νέες καταχωρήσεις και ids που αφαιρέθηκαν."""
+    current_ids = {entry['id'] for entry in bundle['entries']}
+    return {
+        'format': BUNDLE_FORMAT,
+        'delta': True,
+        'school': bundle['school'],
+        'tmima': bundle['tmima'],
+        'date': bundle['date'],
+        'since': since_version,
+        'version': bundle['version'],
+        'added': [entry for entry in bundle['entries'] if entry['id'] not in since_ids],
+        'removed': sorted(since_ids - current_ids),
+        # Μικρά και εξαρτώνται από την ημέρα: στέλνονται πάντα ολόκληρα
+        'upcoming': bundle['upcoming'],
+        'keywords': bundle['keywords'],
+    }
+
+
+# --------------------------------------------------------------------------------
+# ΑΠΟΘΗΚΗ ΠΑΚΕΤΩΝ (ΜΕ ΙΣΤΟΡΙΚΟ ΓΙΑ ΤΑ DELTA)
+# --------------------------------------------------------------------------------
+
+class BundleStore:
+    """
+    Τα τρέχοντα πακέτα όλων των τμημάτων (και σε συμπιεσμένη μορφή), μαζί με τα ids των
+    τελευταίων BUNDLE_HISTORY εκδόσεων κάθε τμήματος, ώστε να απαντώνται αιτήματα "since".
+    """
+
+    def __init__(self, history=BUNDLE_HISTORY):
+        self._lock = threading.Lock()
+        self._history_size = history
+        self._bundles = {}   # (School, Tmima) -> (πακέτο, gzip bytes)
+        self._history = {}   # (School, Tmima) -> OrderedDict(έκδοση -> frozenset ids)
+        self.data_key = None
+
+    def refresh(self, df, today, data_key=None):
+        """Ξαναχτίζει τα πακέτα από το DataFrame του ClassBot. Επιστρέφει το πλήθος των τμημάτων."""
+        bundles = {}
+        if not df.empty:
+            for (school, tmima), class_df in df.groupby(['School', 'Tmima'], sort=True):
+                bundle = build_class_bundle(school, tmima, class_df, today)
+                bundles[(school, tmima)] = (bundle, encode_bundle(bundle))
+
+        with self._lock:
+            for key, (bundle, _) in bundles.items():
+                history = self._history.setdefault(key, OrderedDict())
+                history[bundle['version']] = frozenset(entry['id'] for entry in bundle['entries'])
+                history.move_to_end(bundle['version'])
+                while len(history) > self._history_size:
+                    history.popitem(last=False)
+            # Τμήματα που δεν υπάρχουν πια δεν κρατούν ιστορικό
+            for key in self._history.keys() - bundles.keys():
+                del self._history[key]
+            self._bundles = bundles
+            self.data_key = data_key
+        return len(bundles)
+
+    def get(self, school, tmima):
+        """(πακέτο, gzip bytes) του τμήματος, ή None."""
+        with self._lock:
+            return self._bundles.get((school, tmima))
+
+    def delta(self, school, tmima, since_version):
+        """(delta, gzip bytes) από την since_version, ή None αν η έκδοση δεν είναι πια γνωστή."""
+        with self._lock:
+            current = self._bundles.get((school, tmima))
+            since_ids = self._history.get((school, tmima), {}).get(since_version)
+        if current is None or since_ids is None:
+            return None
+        delta = build_delta(current[0], since_version, since_ids)
+        return delta, encode_bundle(delta)
+
+    def index(self):
+        """Λίστα τμημάτων με την τρέχουσα έκδοση και το μέγεθος του πακέτου τους."""
+        with self._lock:
+            return [
+                {'school': school, 'tmima': tmima, 'version': bundle['version'], 'bytes': len(encoded)}
+                for (school, tmima), (bundle, encoded) in sorted(self._bundles.items())
+            ]
+
+
+def current_data_key(today):
+    """Κλειδί της τρέχουσας έκδοσης δεδομένων ClassBot (όλων των shards) και της ημέρας."""
+    if voithos.SHARDED_MODE:
+        versions = tuple(sorted((school, voithos.classbot_data_version(school)) for school in voithos.shard_routes()))
+    else:
+        versions = voithos.classbot_data_version()
+    return versions, today
+
+def refresh_if_changed(store):
+    """
+    Ξαναχτίζει τα πακέτα μόνο αν άλλαξε η έκδοση δεδομένων (έλεγχος modifiedTime) ή η ημέρα. Μια
+    αποτυχία ανάγνωσης (voithos.SheetLoadError, QuotaTimeout, ...) περνά στον καλούντα και το store
+    κρατά τα προηγούμενα πακέτα.
+    """
+    today = datetime.now().date()
+    data_key = current_data_key(today)
+    if data_key != store.data_key:
+        store.refresh(load_all_posts(strict=True), today, data_key)
+
+
+# --------------------------------------------------------------------------------
+# HTTP (ETag / 304 / since)
+# --------------------------------------------------------------------------------
+
+def _etag_matches(header, version):
+    """If-None-Match: λίστα ETags (με ή χωρίς εισαγωγικά / W/) ή '*'."""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/').strip('"') == version for tag in tags)
+
+class BundleRequestHandler(BaseHTTPRequestHandler):
+    """GET /index και GET /bundle με υποστήριξη If-None-Match (304) και since (delta)."""
+
+    store = None # BundleStore, ορίζεται από το serve()
+    refresh_lock = threading.Lock()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        with self.refresh_lock:
+            try:
+                refresh_if_changed(self.store)
+            except Exception as e:
+                # Σφάλμα API ή όριο αιτημάτων: σερβίρονται τα τελευταία καλά πακέτα (αν υπάρχουν)
+                self.log_error("Αποτυχία ανανέωσης των πακέτων: %s", e)
+                if self.store.data_key is None:
+                    self._send_json(503, {'error': 'τα δεδομένα δεν είναι διαθέσιμα, δοκιμάστε ξανά'})
+                    return
+
+        if parts.path == '/index':
+            self._send_json(200, {'format': BUNDLE_FORMAT, 'classes': self.store.index()})
+        elif parts.path == '/bundle':
+            self._send_bundle(query.get('school', ''), query.get('tmima', ''), query.get('since'))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _send_bundle(self, school, tmima, since):
+        current = self.store.get(school, tmima)
+        if current is None:
+            self._send_json(404, {'error': f"άγνωστο τμήμα '{school}' / '{tmima}'"})
+            return
+        bundle, encoded = current
+        version = bundle['version']
+
+        if _etag_matches(self.headers.get('If-None-Match'), version) or since == version:
+            self.send_response(304)
+            self.send_header('ETag', f'"{version}"')
+            self.end_headers()
+            return
+
+        if since:
+            delta = self.store.delta(school, tmima, since)
+            if delta is not None:
+                encoded = delta[1]
+            # Άγνωστη (πολύ παλιά) έκδοση: στέλνεται ολόκληρο το πακέτο
+
+        self._send_body(200, encoded, etag=version)
+
+    def _send_json(self, status, payload):
+        self._send_body(status, encode_bundle(payload))
+
+    def _send_body(self, status, gzipped, etag=None):
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = gzipped if accepts_gzip else gzip.decompress(gzipped)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if accepts_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache') # Οι clients επαληθεύουν πάντα με ETag
+        if etag:
+            self.send_header('ETag', f'"{etag}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(port, host='0.0.0.0', store=None):
+    """Ξεκινά τον HTTP server των πακέτων (blocking)."""
+    BundleRequestHandler.store = store or BundleStore()
+    server = ThreadingHTTPServer((host, port), BundleRequestHandler)
+    print(f"Πακέτα εξαγωγής στο http://{host}:{port}/index")
+    server.serve_forever()
+
+
+# --------------------------------------------------------------------------------
+# ΕΓΓΡΑΦΗ ΣΕ ΑΡΧΕΙΑ
+# --------------------------------------------------------------------------------
+
+def write_bytes_atomic(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def write_bundles(store, out_dir):
+    """Γράφει <σχολείο>/<τμήμα>.json.gz (μόνο όσα άλλαξαν) και ένα index.json. Επιστρέφει το πλήθος των αλλαγμένων."""
+    os.makedirs(out_dir, exist_ok=True)
+    index, changed = [], 0
+    for entry in store.index():
+        school_dir = os.path.join(out_dir, slugify(entry['school']))
+        os.makedirs(school_dir, exist_ok=True)
+        path = os.path.join(school_dir, f"{slugify(entry['tmima'])}.json.gz")
+        _, encoded = store.get(entry['school'], entry['tmima'])
+        # Ίδια έκδοση -> ίδια bytes: δεν ξαναγράφεται (το mtime του αρχείου μένει για τους web servers)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                unchanged = f.read() == encoded
+        else:
+            unchanged = False
+        if not unchanged:
+            write_bytes_atomic(path, encoded)
+            changed += 1
+        index.append(dict(entry, file=f"{slugify(entry['school'])}/{slugify(entry['tmima'])}.json.gz"))
+    write_bytes_atomic(os.path.join(out_dir, 'index.json'), json.dumps({
+        'format': BUNDLE_FORMAT,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'classes': index,
+    }, ensure_ascii=False, indent=1).encode('utf-8'))
+    return changed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Πακέτα εξαγωγής (gzip JSON) ανά Σχολείο και Τμήμα.")
+    parser.add_argument('--out', default='exports', help="Φάκελος εξόδου (προεπιλογή: exports)")
+    parser.add_argument('--serve', action='store_true', help="Εκκίνηση HTTP server αντί για εγγραφή αρχείων")
+    parser.add_argument('--port', type=int, default=8502, help="Θύρα του HTTP server (προεπιλογή: 8502)")
+    args = parser.parse_args(argv)
+
+    store = BundleStore()
+    try:
+        refresh_if_changed(store)
+    except Exception as e:
+        print(f"Αποτυχία φόρτωσης δεδομένων ClassBot. Λεπτομέρειες: {e}", file=sys.stderr)
+        return 1
+    if not store.index():
+        print("Δεν φορτώθηκαν δεδομένα ClassBot. Ελέγξτε τα secrets.toml και τη δομή του Sheet.", file=sys.stderr)
+        return 1
+
+    if args.serve:
+        serve(args.port, store=store)
+        return 0
+
+    changed = write_bundles(store, args.out)
+    print(f"Πακέτα για {len(store.index())} τμήματα ({changed} άλλαξαν) στον φάκελο '{args.out}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
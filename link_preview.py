@@ -0,0 +1,407 @@
+"""
+Μεταδεδομένα συνδέσμων (τίτλος, favicon, διαθεσιμότητα) για τις κάρτες τύπου Link.
+
+Η λήψη γίνεται εκτός της εκτέλεσης της σελίδας: μια δεξαμενή workers asyncio τρέχει σε δικό της
+thread, με όριο ταυτόχρονων αιτημάτων ανά host και χρονικό όριο ανά αίτημα. Τα αποτελέσματα
+αποθηκεύονται σε μόνιμη cache (JSON) και ξαναελέγχονται όταν λήξει το TTL τους. Η σελίδα διαβάζει
+μόνο την cache και δεν περιμένει ποτέ το δίκτυο.
+
+Τα URL δίνονται από τους χρήστες, οπότε ζητούνται μόνο http/https και μόνο από δημόσιες διευθύνσεις:
+κάθε σύνδεση (και μετά από ανακατεύθυνση) γίνεται στη διεύθυνση που ελέγχθηκε, ώστε ένας σύνδεσμος
+να μη φτάνει σε localhost, στο εσωτερικό δίκτυο ή στα metadata του cloud (169.254.169.254).
+
+Δεν εξαρτάται από το Streamlit, ώστε να ελέγχεται και απέναντι σε έναν τοπικό HTTP server
+(με allow_private=True, βλ. tests/test_link_preview.py):
+    cache = LinkPreviewCache(None)
+    fetch = functools.partial(fetch_link_metadata, allow_private=True)
+    asyncio.run(LinkMetadataFetcher(cache, fetch=fetch).fetch_all(["http://127.0.0.1:8000/"]))
+    cache.get("http://127.0.0.1:8000/")
+"""
+import asyncio
+import functools
+import http.client
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+LINK_STATUS_OK = 'ok'
+LINK_STATUS_DEAD = 'dead'                # 404/410: ο σύνδεσμος (π.χ. αρχείο Drive) δεν υπάρχει πια
+LINK_STATUS_RESTRICTED = 'restricted'    # 401/403 ή ανακατεύθυνση στη σύνδεση Google (μη δημόσιο αρχείο Drive)
+LINK_STATUS_UNREACHABLE = 'unreachable'  # timeout, DNS, σφάλμα σύνδεσης, 5xx ή μη επιτρεπτό URL/διεύθυνση
+
+GOOGLE_LOGIN_HOST = 'accounts.google.com'
+MAX_HTML_BYTES = 65536 # Αρκεί για το <head> μιας σελίδας
+USER_AGENT = "Mozilla/5.0 (compatible; ClassBot link preview)"
+ALLOWED_SCHEMES = ('http', 'https')
+READ_CHUNK_BYTES = 8192
+
+
+class _HeadParser(HTMLParser):
+    """Βρίσκει τον τίτλο (<title> ή og:title) και το favicon μιας σελίδας HTML."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.og_title = ''
+        self.icon = None
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'meta' and attrs.get('property') == 'og:title':
+            self.og_title = attrs.get('content') or ''
+        elif tag == 'link' and self.icon is None and 'icon' in (attrs.get('rel') or '').lower().split():
+            self.icon = attrs.get('href')
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+
+def _empty_metadata(url, status=LINK_STATUS_UNREACHABLE, http_status=None):
+    return {
+        'url': url,
+        'status': status,
+        'http_status': http_status,
+        'title': '',
+        'favicon': '',
+        'final_url': url,
+        'checked_at': time.time(),
+    }
+
+class BlockedAddressError(OSError):
+    """Ο host του URL αντιστοιχεί σε μη δημόσια διεύθυνση (loopback, ιδιωτική, link-local κ.λπ.)."""
+
+def is_public_address(address):
+    """True αν η διεύθυνση IP είναι δημόσια (όχι loopback, ιδιωτική RFC 1918, link-local, multicast ή δεσμευμένη)."""
+    ip = ipaddress.ip_address(address.split('%')[0]) # χωρίς το scope id των IPv6 link-local
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+def create_public_connection(address, timeout=None, source_address=None, allow_private=False):
+    """
+    Σαν το socket.create_connection, αλλά αρνείται host που αντιστοιχεί (έστω και με μία εγγραφή DNS)
+    σε μη δημόσια διεύθυνση, και συνδέεται ακριβώς στις διευθύνσεις που ελέγχθηκαν (χωρίς δεύτερη
+    επίλυση DNS ανάμεσα στον έλεγχο και στη σύνδεση).
+    """
+    host, port = address
+    addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    if not allow_private:
+        for *_, sockaddr in addresses:
+            if not is_public_address(sockaddr[0]):
+                raise BlockedAddressError(f"Μη δημόσια διεύθυνση για τον host '{host}': {sockaddr[0]}")
+
+    last_error = None
+    for family, socktype, proto, _, sockaddr in addresses:
+        sock = socket.socket(family, socktype, proto)
+        try:
+            if isinstance(timeout, (int, float)):
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            last_error = e
+    raise last_error or OSError(f"Αποτυχία επίλυσης του host '{host}'")
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, allow_private=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = functools.partial(create_public_connection, allow_private=allow_private)
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, allow_private=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = functools.partial(create_public_connection, allow_private=allow_private)
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, allow_private=False):
+        super().__init__()
+        self._allow_private = allow_private
+
+    def http_open(self, req):
+        return self.do_open(functools.partial(_PublicHTTPConnection, allow_private=self._allow_private), req)
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, allow_private=False):
+        super().__init__()
+        self._allow_private = allow_private
+
+    def https_open(self, req):
+        return self.do_open(functools.partial(_PublicHTTPSConnection, allow_private=self._allow_private), req)
+
+def build_link_opener(allow_private=False):
+    """
+    Opener μόνο για http/https, χωρίς proxy: κάθε σύνδεση, και μετά από ανακατεύθυνση, περνά από την
+    create_public_connection. Ανακατεύθυνση σε άλλο σχήμα (π.χ. ftp:, file:) αποτυγχάνει με URLError.
+    """
+    opener = urllib.request.OpenerDirector()
+    for handler in (
+        _PublicHTTPHandler(allow_private), _PublicHTTPSHandler(allow_private),
+        urllib.request.HTTPRedirectHandler(), urllib.request.HTTPDefaultErrorHandler(),
+        urllib.request.HTTPErrorProcessor(), urllib.request.UnknownHandler(),
+    ):
+        opener.add_handler(handler)
+    return opener
+
+def _read_body(response, limit, deadline):
+    """Διαβάζει έως limit bytes, σταματώντας με TimeoutError όταν περάσει η προθεσμία (time.monotonic)."""
+    chunks, size = [], 0
+    while size < limit:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Η ανάγνωση της σελίδας ξεπέρασε το χρονικό όριο")
+        chunk = response.read1(min(READ_CHUNK_BYTES, limit - size))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return b''.join(chunks)
+
+def fetch_link_metadata(url, timeout=5, allow_private=False):
+    """
+    Blocking λήψη των μεταδεδομένων ενός URL (εκτελείται από τους workers σε thread). Το timeout ισχύει
+    για κάθε λειτουργία του socket και συνολικά για την ανάγνωση της σελίδας. allow_private=True
+    επιτρέπει τοπικές διευθύνσεις (μόνο για δοκιμές απέναντι σε τοπικό server).
+    """
+    if urlsplit(url).scheme.lower() not in ALLOWED_SCHEMES:
+        return _empty_metadata(url)
+    deadline = time.monotonic() + timeout
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    try:
+        with build_link_opener(allow_private).open(request, timeout=timeout) as response:
+            final_url = response.geturl()
+            http_status = response.status
+            body, charset = b'', 'utf-8'
+            if response.headers.get_content_type() == 'text/html':
+                body = _read_body(response, MAX_HTML_BYTES, deadline)
+                charset = response.headers.get_content_charset() or 'utf-8'
+    except urllib.error.HTTPError as e:
+        if e.code in (404, 410):
+            return _empty_metadata(url, LINK_STATUS_DEAD, e.code)
+        if e.code in (401, 403):
+            return _empty_metadata(url, LINK_STATUS_RESTRICTED, e.code)
+        return _empty_metadata(url, LINK_STATUS_UNREACHABLE, e.code)
+    except (urllib.error.URLError, OSError, ValueError):
+        return _empty_metadata(url)
+
+    meta = _empty_metadata(url, LINK_STATUS_OK, http_status)
+    meta['final_url'] = final_url
+    if urlsplit(final_url).hostname == GOOGLE_LOGIN_HOST:
+        # Το Drive ανακατευθύνει στη σύνδεση όταν το αρχείο δεν είναι κοινόχρηστο με "όποιον έχει τον σύνδεσμο"
+        meta['status'] = LINK_STATUS_RESTRICTED
+        return meta
+
+    parser = _HeadParser()
+    try:
+        parser.feed(body.decode(charset, errors='replace'))
+    except LookupError: # Άγνωστο charset
+        parser.feed(body.decode('utf-8', errors='replace'))
+    meta['title'] = ' '.join((parser.og_title or parser.title).split())[:200]
+    meta['favicon'] = urljoin(final_url, parser.icon or '/favicon.ico')
+    return meta
+
+
+class LinkPreviewCache:
+    """
+    Μόνιμη cache (αρχείο JSON) με τα μεταδεδομένα των συνδέσμων. Μια εγγραφή ξαναελέγχεται όταν
+    περάσει το ttl_seconds (ή το πιο σύντομο failure_ttl_seconds για συνδέσμους που δεν απάντησαν).
+    Το generation αυξάνεται μόνο όταν αλλάξει κάτι που φαίνεται στην κάρτα (κατάσταση, τίτλος, favicon).
+    """
+
+    VISIBLE_FIELDS = ('status', 'title', 'favicon')
+
+    def __init__(self, path, ttl_seconds=24 * 3600, failure_ttl_seconds=3600, save_interval=30):
+        self._lock = threading.Lock()
+        self._path = path
+        self._ttl = ttl_seconds
+        self._failure_ttl = failure_ttl_seconds
+        self._save_interval = save_interval
+        self._entries = {}
+        self._dirty = False
+        self._saved_at = time.time()
+        self.generation = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {} # Κατεστραμμένο αρχείο: οι σύνδεσμοι απλώς ξαναελέγχονται
+
+    def get(self, url):
+        """Τα αποθηκευμένα μεταδεδομένα του URL (ίσως ληγμένα), ή None."""
+        with self._lock:
+            meta = self._entries.get(url)
+            return dict(meta) if meta else None
+
+    def needs_refresh(self, url, now=None):
+        """True αν το URL δεν έχει ελεγχθεί ή αν έληξε το TTL της εγγραφής του."""
+        with self._lock:
+            meta = self._entries.get(url)
+        if meta is None:
+            return True
+        ttl = self._failure_ttl if meta['status'] == LINK_STATUS_UNREACHABLE else self._ttl
+        return (now or time.time()) - meta['checked_at'] >= ttl
+
+    def put(self, meta):
+        """Αποθηκεύει τα μεταδεδομένα ενός URL (στο αρχείο το πολύ κάθε save_interval δευτερόλεπτα)."""
+        with self._lock:
+            previous = self._entries.get(meta['url'])
+            self._entries[meta['url']] = meta
+            if previous is None or any(previous.get(field) != meta.get(field) for field in self.VISIBLE_FIELDS):
+                self.generation += 1
+            self._dirty = True
+            due = time.time() - self._saved_at >= self._save_interval
+        if due:
+            self.save()
+
+    def save(self):
+        """Γράφει την cache στο αρχείο (μέσω προσωρινού αρχείου), αν υπάρχουν αλλαγές."""
+        with self._lock:
+            if not self._path or not self._dirty:
+                return
+            payload = json.dumps(self._entries, ensure_ascii=False)
+            self._dirty = False
+            self._saved_at = time.time()
+        tmp_path = f"{self._path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for meta in self._entries.values():
+                counts[meta['status']] = counts.get(meta['status'], 0) + 1
+            return {'entries': len(self._entries), 'generation': self.generation, 'by_status': counts}
+
+
+class _FetchLimits:
+    """Τα όρια ενός event loop: συνολικό πλήθος workers και ταυτόχρονα αιτήματα ανά host."""
+
+    def __init__(self, workers, per_host):
+        self.workers = asyncio.Semaphore(workers)
+        self.per_host = per_host
+        self.hosts = {}
+
+    def host(self, url):
+        host = urlsplit(url).hostname or ''
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.per_host)
+        return self.hosts[host]
+
+
+class LinkMetadataFetcher:
+    """
+    Δεξαμενή workers asyncio για τη λήψη μεταδεδομένων συνδέσμων. Το request() είναι non-blocking
+    (μόνο βάζει τα URL στην ουρά του event loop, που τρέχει σε δικό του daemon thread). Κάθε λήψη
+    παίρνει πρώτα θέση στον host της και μετά μία από τις workers θέσεις, ώστε ένας αργός host
+    (π.χ. drive.google.com) να μην κρατά δεσμευμένους όλους τους workers. Οι blocking λήψεις τρέχουν σε
+    δικό του executor με workers threads: ένα thread που κόλλησε (π.χ. σε DNS) μετά το wait_for δεν
+    σταματά, αλλά δεν μπορεί να δημιουργήσει απεριόριστα νέα threads.
+    """
+
+    def __init__(self, cache, workers=8, per_host=2, timeout=5, fetch=fetch_link_metadata):
+        self.cache = cache
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="link-preview-fetch")
+        self._lock = threading.Lock()
+        self._loop = None
+        self._limits = None
+        self._pending = set()
+
+    def start(self):
+        """Ξεκινά (μία φορά) το thread με το event loop των workers."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            threading.Thread(target=self._run_loop, args=(ready,), name="link-preview", daemon=True).start()
+            ready.wait()
+
+    def _run_loop(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._limits = _FetchLimits(self.workers, self.per_host)
+        self._loop = loop
+        ready.set()
+        loop.run_forever()
+
+    def request(self, urls):
+        """Βάζει στην ουρά όσα URL λείπουν από την cache ή έχουν λήξει. Δεν περιμένει. Επιστρέφει το πλήθος τους."""
+        stale = [url for url in dict.fromkeys(urls) if url and self.cache.needs_refresh(url)]
+        if not stale:
+            return 0
+        self.start()
+        queued = 0
+        with self._lock:
+            for url in stale:
+                if url in self._pending:
+                    continue
+                self._pending.add(url)
+                self._loop.call_soon_threadsafe(self._loop.create_task, self._fetch_queued(url))
+                queued += 1
+        return queued
+
+    def previews(self, urls):
+        """URL -> μεταδεδομένα για όσα υπάρχουν στην cache. Ζητά στο παρασκήνιο όσα λείπουν ή έληξαν."""
+        self.request(urls)
+        previews = {}
+        for url in urls:
+            meta = self.cache.get(url)
+            if meta is not None:
+                previews[url] = meta
+        return previews
+
+    async def _fetch_queued(self, url):
+        try:
+            await self._fetch_one(url, self._limits)
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+                idle = not self._pending
+            if idle:
+                await asyncio.to_thread(self.cache.save)
+
+    async def _fetch_one(self, url, limits):
+        async with limits.host(url):
+            async with limits.workers:
+                try:
+                    # Η fetch τηρεί η ίδια το timeout (ανά λειτουργία και συνολικά για την ανάγνωση):
+                    # το wait_for καλύπτει ό,τι δεν ελέγχει εκείνη, π.χ. την επίλυση DNS
+                    fetching = asyncio.get_running_loop().run_in_executor(self._executor, self._fetch, url, self.timeout)
+                    meta = await asyncio.wait_for(fetching, 2 * self.timeout + 1)
+                except Exception:
+                    meta = _empty_metadata(url) # Timeout ή απρόβλεπτο σφάλμα: "δεν απαντά"
+        self.cache.put(meta)
+        return meta
+
+    async def fetch_all(self, urls):
+        """Λήψη όλων των URL με τα ίδια όρια, στο τρέχον event loop, και αναμονή (για δοκιμές ή offline χρήση)."""
+        limits = _FetchLimits(self.workers, self.per_host)
+        results = await asyncio.gather(*(self._fetch_one(url, limits) for url in dict.fromkeys(urls)))
+        self.cache.save()
+        return results
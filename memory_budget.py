@@ -0,0 +1,277 @@
+"""
+Caches με λογιστική μνήμης και κοινό όριο (budget) για όλη τη διεργασία.
+
+Κάθε BudgetedCache μετρά το (βαθύ) μέγεθος κάθε τιμής που αποθηκεύει. Όταν το σύνολο όλων των
+caches ενός MemoryBudget ξεπεράσει το όριο, αφαιρούνται οι εγγραφές που χρησιμοποιήθηκαν
+λιγότερο πρόσφατα (LRU), από όποια cache κι αν είναι. Δομές που δεν μπορούν να αφαιρεθούν (π.χ. οι
+όψεις δεδομένων) δηλώνουν το μέγεθός τους με το reserve() και μετρούν στο ίδιο όριο. Τα στατιστικά
+ανά cache (εγγραφές, bytes, hit rate, αφαιρέσεις) βοηθούν στη διαστασιολόγηση της μνήμης του container.
+
+Δεν εξαρτάται από το Streamlit:
+    budget = MemoryBudget(64 * 1024 * 1024)
+    frames = budget.cache("frames", max_entries=10)
+    df = frames.get_or_compute(("Σχολείο", "Α1"), lambda: load_frame())
+    budget.stats()
+"""
+import itertools
+import sys
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+
+def deep_sizeof(obj, _seen=None):
+    """
+    Προσεγγιστικό μέγεθος (bytes) ενός αντικειμένου μαζί με ό,τι περιέχει: DataFrame/Series με
+    memory_usage(deep=True), πίνακες numpy με nbytes, containers αναδρομικά. Ένα αντικείμενο που
+    εμφανίζεται πολλές φορές μετράται μία φορά, αλλά ό,τι μοιράζεται με άλλες caches μετράται σε κάθε μία.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return max(sys.getsizeof(obj), obj.nbytes)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, _seen) + deep_sizeof(value, _seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, _seen) for item in obj)
+    return size
+
+
+class BudgetedCache:
+    """
+    LRU cache με μέτρηση μεγέθους ανά εγγραφή. Προαιρετικά με όριο εγγραφών (max_entries) και
+    μέλος ενός MemoryBudget (budget=None: ανεξάρτητη cache, μόνο με στατιστικά). Κάθε κλειδί
+    υπολογίζεται μία φορά, ακόμη και αν το ζητήσουν ταυτόχρονα πολλά threads. Οι τιμές δεν
+    αντιγράφονται: όσοι τις παίρνουν δεν πρέπει να τις τροποποιούν.
+    """
+
+    def __init__(self, name, budget=None, max_entries=None):
+        self.name = name
+        self._budget = budget
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = OrderedDict() # κλειδί -> (τιμή, bytes, token)
+        self._tokens = itertools.count()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+
+    def _lookup(self, key):
+        """(True, τιμή) αν υπάρχει το κλειδί (και το σημειώνει ως πρόσφατο), αλλιώς (False, None). Καλείται με το lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+        if not found:
+            return default
+        if self._budget is not None:
+            self._budget._touch(self.name, key)
+        return value
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            found, value = self._lookup(key)
+            if not found:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+        if found:
+            if self._budget is not None:
+                self._budget._touch(self.name, key)
+            return value
+
+        with key_lock:
+            with self._lock:
+                found, value = self._lookup(key)
+            if found:
+                if self._budget is not None:
+                    self._budget._touch(self.name, key)
+                return value
+            try:
+                value = compute()
+                with self._lock:
+                    self.misses += 1
+                return self.put(key, value)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def put(self, key, value):
+        """Αποθηκεύει την τιμή (εκτός αν μόνη της ξεπερνά όλο το budget) και την επιστρέφει."""
+        size = deep_sizeof(value)
+        if self._budget is not None and size > self._budget.max_bytes:
+            with self._lock:
+                self.oversized += 1
+            return value
+
+        token = next(self._tokens)
+        released = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (value, size, token)
+            self.bytes += size
+            while self._max_entries and len(self._entries) > self._max_entries:
+                old_key, (_, old_size, old_token) = self._entries.popitem(last=False)
+                self.bytes -= old_size
+                self.evictions += 1
+                released.append((old_key, old_token))
+
+        # Το budget ενημερώνεται χωρίς κρατημένο lock της cache (καμία εμφωλευμένη κλείδωση)
+        if self._budget is not None:
+            for old_key, old_token in released:
+                self._budget._release(self.name, old_key, old_token)
+            for cache, victim_key, victim_token in self._budget._charge(self.name, key, token, size):
+                cache._discard(victim_key, victim_token)
+        return value
+
+    def _discard(self, key, token):
+        """Αφαίρεση από το budget (μόνο αν η εγγραφή δεν έχει αντικατασταθεί στο μεταξύ)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] != token:
+                return
+            del self._entries[key]
+            self.bytes -= entry[1]
+            self.evictions += 1
+
+    def pop(self, key):
+        """Αφαιρεί το κλειδί (ακύρωση μετά από αλλαγή δεδομένων, δεν μετρά ως eviction)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            self.bytes -= entry[1]
+        if self._budget is not None:
+            self._budget._release(self.name, key, entry[2])
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+            self.bytes = 0
+        if self._budget is not None:
+            for key, (_, _, token) in entries:
+                self._budget._release(self.name, key, token)
+
+    def items(self):
+        """Στιγμιότυπο των (κλειδί, τιμή), χωρίς να αλλάζει η σειρά LRU."""
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'oversized': self.oversized,
+            }
+
+
+class MemoryBudget:
+    """
+    Κοινό όριο μνήμης (max_bytes) για όλες τις caches που δημιουργούνται με το cache(). Κρατά μία
+    ενιαία σειρά LRU για όλες τις εγγραφές, ώστε να αφαιρείται πρώτα ό,τι χρησιμοποιήθηκε λιγότερο
+    πρόσφατα σε όλη την εφαρμογή και όχι ανά cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._caches = {}
+        self._lru = OrderedDict() # (όνομα cache, κλειδί) -> (token, bytes)
+        self._reserved = {}       # όνομα -> bytes που δεν αφαιρούνται (βλ. reserve)
+        self.used_bytes = 0
+
+    def cache(self, name, max_entries=None):
+        """Η cache με αυτό το όνομα (δημιουργείται την πρώτη φορά)."""
+        with self._lock:
+            if name not in self._caches:
+                self._caches[name] = BudgetedCache(name, budget=self, max_entries=max_entries)
+            return self._caches[name]
+
+    def reserve(self, name, size):
+        """
+        Δηλώνει (ή αντικαθιστά, size=0: αποδεσμεύει) το μέγεθος μιας δομής που κρατείται εκτός των caches
+        και δεν αφαιρείται ποτέ. Μετρά στο όριο, οπότε αφαιρούνται όσες εγγραφές LRU χρειάζεται.
+        """
+        with self._lock:
+            self.used_bytes += size - self._reserved.pop(name, 0)
+            if size:
+                self._reserved[name] = size
+            victims = self._evict(keep=0)
+        for cache, victim_key, victim_token in victims:
+            cache._discard(victim_key, victim_token)
+
+    def _evict(self, keep):
+        """Αφαιρεί από το LRU (κρατώντας τουλάχιστον keep εγγραφές) μέχρι να χωρά στο όριο. Καλείται με το lock."""
+        victims = []
+        while self.used_bytes > self.max_bytes and len(self._lru) > keep:
+            (victim_name, victim_key), (victim_token, victim_size) = self._lru.popitem(last=False)
+            self.used_bytes -= victim_size
+            victims.append((self._caches[victim_name], victim_key, victim_token))
+        return victims
+
+    def _charge(self, name, key, token, size):
+        """Καταγράφει μια νέα εγγραφή και επιστρέφει τις (cache, κλειδί, token) που πρέπει να αφαιρεθούν."""
+        with self._lock:
+            previous = self._lru.pop((name, key), None)
+            if previous is not None:
+                self.used_bytes -= previous[1]
+            self._lru[(name, key)] = (token, size)
+            self.used_bytes += size
+            return self._evict(keep=1)
+
+    def _touch(self, name, key):
+        with self._lock:
+            if (name, key) in self._lru:
+                self._lru.move_to_end((name, key))
+
+    def _release(self, name, key, token):
+        with self._lock:
+            entry = self._lru.get((name, key))
+            if entry is not None and entry[0] == token:
+                del self._lru[(name, key)]
+                self.used_bytes -= entry[1]
+
+    def stats(self):
+        """{'budget_bytes', 'used_bytes', 'reserved': όνομα -> bytes, 'caches': όνομα -> στατιστικά της cache}."""
+        with self._lock:
+            caches = dict(self._caches)
+            used_bytes = self.used_bytes
+            reserved = dict(sorted(self._reserved.items()))
+        return {
+            'budget_bytes': self.max_bytes,
+            'used_bytes': used_bytes,
+            'reserved': reserved,
+            'caches': {name: cache.stats() for name, cache in sorted(caches.items())},
+        }
@@ -0,0 +1,260 @@
+"""
+Κοινό όριο (quota) αιτημάτων προς τα Google Sheets/Drive APIs για όλη τη διεργασία.
+
+Κάθε αίτημα του gspread περνά από τον SheetsQuotaManager (μέσω του HTTP client που επιστρέφει το
+quota_http_client). Ένας token bucket ανά είδος αιτήματος (ανάγνωση Sheets, εγγραφή Sheets, Drive)
+ακολουθεί τα όρια ανά λεπτό. Όταν οι θέσεις λιγοστεύουν, προηγούνται οι εγγραφές και οι αναγνώσεις
+που περιμένει ένας χρήστης. Οι αναγνώσεις παρασκηνίου κρατούν ένα απόθεμα ελεύθερο για αυτές.
+Ίδιες αναγνώσεις (GET) που ζητούνται ταυτόχρονα γίνονται μία φορά και μοιράζονται την απάντηση.
+
+Δεν εξαρτάται από το Streamlit:
+    quota = SheetsQuotaManager(read_per_minute=60, write_per_minute=60)
+    gc = gspread.service_account(http_client=quota_http_client(quota))
+    with quota_priority(PRIORITY_BACKGROUND):
+        gc.open("ClassBot").sheet1.get_all_values()
+    quota.stats()
+"""
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+PRIORITY_WRITE = 0        # Εγγραφές και οι αναγνώσεις που τις προετοιμάζουν
+PRIORITY_INTERACTIVE = 1  # Αναγνώσεις που περιμένει μια συνεδρία (προεπιλογή)
+PRIORITY_BACKGROUND = 2   # Ανανεώσεις παρασκηνίου (π.χ. shards άλλων σχολείων, export)
+PRIORITY_NAMES = {PRIORITY_WRITE: 'write', PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BACKGROUND: 'background'}
+
+KIND_READ = 'read'
+KIND_WRITE = 'write'
+KIND_DRIVE = 'drive'
+
+SHEETS_HOST = 'sheets.googleapis.com'
+READ_POST_SUFFIXES = (':batchGet', ':batchGetByDataFilter') # POST που είναι αναγνώσεις
+
+_priority = contextvars.ContextVar('sheets_quota_priority', default=PRIORITY_INTERACTIVE)
+
+
+class QuotaTimeout(Exception):
+    """Το αίτημα περίμενε περισσότερο από το max_wait για θέση στο όριο του API."""
+
+
+@contextmanager
+def quota_priority(level):
+    """Τα αιτήματα μέσα στο μπλοκ (στο τρέχον thread) έχουν την προτεραιότητα level."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def request_priority(kind):
+    """Η προτεραιότητα ενός αιτήματος του είδους kind: οι εγγραφές πάντα PRIORITY_WRITE."""
+    return PRIORITY_WRITE if kind == KIND_WRITE else _priority.get()
+
+
+def classify_request(method, endpoint, params=None, payload=None):
+    """
+    (είδος, κλειδί ταυτοχρονισμού) ενός αιτήματος. Το κλειδί υπάρχει μόνο για τα GET: δύο GET με
+    ίδιο endpoint και παραμέτρους που εκκρεμούν ταυτόχρονα δίνουν την ίδια απάντηση.
+    """
+    method = method.upper()
+    if urlsplit(endpoint).hostname != SHEETS_HOST:
+        kind = KIND_DRIVE
+    elif method == 'GET' or urlsplit(endpoint).path.endswith(READ_POST_SUFFIXES):
+        kind = KIND_READ
+    else:
+        kind = KIND_WRITE
+    if method != 'GET':
+        return kind, None
+    params = sorted(params.items()) if isinstance(params, dict) else params
+    return kind, (endpoint, json.dumps(params, sort_keys=True, default=str), json.dumps(payload, sort_keys=True, default=str))
+
+
+class TokenBucket:
+    """
+    Token bucket με per_minute θέσεις ανά λεπτό (και το πολύ per_minute διαθέσιμες μαζί). Όσοι
+    περιμένουν εξυπηρετούνται κατά προτεραιότητα. Οι PRIORITY_BACKGROUND παίρνουν θέση μόνο αν μένει
+    ελεύθερο και το απόθεμα (background_reserve του ορίου) για τις υπόλοιπες.
+    """
+
+    def __init__(self, name, per_minute, background_reserve=0.25):
+        self.name = name
+        self.capacity = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._reserve = background_reserve * per_minute
+        self._cond = threading.Condition()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._waiting = {level: 0 for level in PRIORITY_NAMES}
+        self.calls = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.max_queue = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, priority, timeout):
+        """Δεσμεύει μία θέση, περιμένοντας έως timeout δευτερόλεπτα. Επιστρέφει τον χρόνο αναμονής."""
+        start = time.monotonic()
+        deadline = start + timeout
+        needed = 1 + (self._reserve if priority == PRIORITY_BACKGROUND else 0)
+        with self._cond:
+            self._waiting[priority] += 1
+            self.max_queue = max(self.max_queue, sum(self._waiting.values()))
+            try:
+                while True:
+                    self._refill()
+                    ahead = any(self._waiting[level] for level in PRIORITY_NAMES if level < priority)
+                    if not ahead and self._tokens >= needed:
+                        self._tokens -= 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise QuotaTimeout(f"Το όριο αιτημάτων '{self.name}' του Google API εξαντλήθηκε (αναμονή {timeout:.0f} s).")
+                    refill_in = max(needed - self._tokens, 0) / self._rate
+                    self._cond.wait(min(remaining, max(refill_in, 0.05)))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self.calls += 1
+            if waited > 0.001:
+                self.throttled += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def drain(self):
+        """Μετά από 429 (Too Many Requests): καμία διαθέσιμη θέση μέχρι την επόμενη αναπλήρωση."""
+        with self._cond:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+            self.rate_limited += 1
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {
+                'per_minute': self.capacity,
+                'tokens': self._tokens,
+                'calls': self.calls,
+                'throttled': self.throttled,
+                'avg_wait_ms': 1000 * self.wait_seconds / self.throttled if self.throttled else 0.0,
+                'max_wait_ms': 1000 * self.max_wait_seconds,
+                'queued': {PRIORITY_NAMES[level]: count for level, count in self._waiting.items()},
+                'max_queue': self.max_queue,
+                'timeouts': self.timeouts,
+                'rate_limited': self.rate_limited,
+            }
+
+
+class _Flight:
+    """Μια ανάγνωση σε εξέλιξη, που περιμένουν όσοι ζήτησαν την ίδια."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SheetsQuotaManager:
+    """
+    Ο κοινός διαχειριστής ορίων: ένας TokenBucket ανά είδος αιτήματος, συγχώνευση ταυτόχρονων ίδιων
+    αναγνώσεων και επανάληψη (μέχρι retries φορές, με νέα θέση) όταν το API απαντήσει 429.
+    Συγχωνεύονται μόνο αναγνώσεις της ίδιας προτεραιότητας: μια συνεδρία δεν περιμένει ποτέ πίσω από
+    την ίδια ανάγνωση παρασκηνίου, που υποχωρεί στην ουρά του bucket.
+    """
+
+    def __init__(self, read_per_minute=60, write_per_minute=60, drive_per_minute=300, max_wait=60, retries=2):
+        self.max_wait = max_wait
+        self.retries = retries
+        self._buckets = {
+            KIND_READ: TokenBucket(KIND_READ, read_per_minute),
+            KIND_WRITE: TokenBucket(KIND_WRITE, write_per_minute),
+            KIND_DRIVE: TokenBucket(KIND_DRIVE, drive_per_minute),
+        }
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.collapsed = 0
+
+    def call(self, kind, key, func):
+        """Εκτελεί το func() (ένα αίτημα του είδους kind) εντός ορίων. key: κλειδί συγχώνευσης ή None."""
+        if key is None:
+            return self._call_with_quota(kind, func)
+
+        key = (request_priority(kind), key)
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.collapsed += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call_with_quota(kind, func)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def _call_with_quota(self, kind, func):
+        bucket = self._buckets[kind]
+        priority = request_priority(kind)
+        for attempt in range(self.retries + 1):
+            bucket.acquire(priority, self.max_wait)
+            try:
+                return func()
+            except APIError as e:
+                if getattr(e.response, 'status_code', None) != 429:
+                    raise
+                bucket.drain()
+                if attempt == self.retries:
+                    raise
+
+    def stats(self):
+        """{'collapsed', 'in_flight', 'buckets': είδος -> στατιστικά του TokenBucket}."""
+        with self._lock:
+            collapsed, in_flight = self.collapsed, len(self._inflight)
+        return {
+            'collapsed': collapsed,
+            'in_flight': in_flight,
+            'buckets': {kind: bucket.stats() for kind, bucket in self._buckets.items()},
+        }
+
+
+def quota_http_client(manager):
+    """Κλάση HTTP client για το gspread (παράμετρος http_client) που περνά κάθε αίτημα από τον manager."""
+
+    class QuotaHTTPClient(HTTPClient):
+        def request(self, method, endpoint, params=None, data=None, json=None, files=None, headers=None):
+            kind, key = classify_request(method, endpoint, params, json)
+            parent = super().request
+            return manager.call(
+                kind, key,
+                lambda: parent(method, endpoint, params=params, data=data, json=json, files=files, headers=headers)
+            )
+
+    return QuotaHTTPClient
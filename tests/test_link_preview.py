@@ -0,0 +1,151 @@
+"""
+Έλεγχοι της link_preview απέναντι σε τοπικό http.server (χωρίς πρόσβαση στο διαδίκτυο).
+
+Ο τοπικός server ακούει στο 127.0.0.1, οπότε οι λήψεις γίνονται με allow_private=True, εκτός από τους
+ελέγχους που επιβεβαιώνουν ότι οι τοπικές διευθύνσεις απορρίπτονται από προεπιλογή.
+"""
+import asyncio
+import functools
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from link_preview import (
+    LINK_STATUS_DEAD,
+    LINK_STATUS_OK,
+    LINK_STATUS_RESTRICTED,
+    LINK_STATUS_UNREACHABLE,
+    LinkMetadataFetcher,
+    LinkPreviewCache,
+    fetch_link_metadata,
+    is_public_address,
+)
+
+SLOW_SECONDS = 3
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Απαντήσεις ανά διαδρομή: σελίδα HTML, 404, 403, αργή απάντηση και ανακατεύθυνση σε file:."""
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path == '/ok':
+            body = (
+                '<html><head><title> Σχολική\n εκδρομή </title>'
+                '<link rel="shortcut icon" href="/static/icon.png"></head><body></body></html>'
+            ).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/missing':
+            self.send_error(404)
+        elif self.path == '/private':
+            self.send_error(403)
+        elif self.path == '/slow':
+            time.sleep(SLOW_SECONDS)
+            self.send_error(404)
+        elif self.path == '/to-blocked':
+            # Από εδώ και πέρα η διεύθυνση του server θεωρείται μη δημόσια (βλ. test_redirect_is_checked_again)
+            self.server.block = True
+            self.send_response(302)
+            self.send_header('Location', '/ok')
+            self.end_headers()
+        elif self.path == '/to-file':
+            self.send_response(302)
+            self.send_header('Location', 'file:///etc/passwd')
+            self.end_headers()
+        else:
+            self.send_error(500)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LinkPreviewStandInTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        cls.server.daemon_threads = True
+        cls.server.paths = []
+        cls.server.block = False
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def fetch(self, path, timeout=2):
+        return fetch_link_metadata(self.base + path, timeout=timeout, allow_private=True)
+
+    def test_ok_page_title_and_favicon(self):
+        meta = self.fetch('/ok')
+        self.assertEqual(meta['status'], LINK_STATUS_OK)
+        self.assertEqual(meta['http_status'], 200)
+        self.assertEqual(meta['title'], 'Σχολική εκδρομή')
+        self.assertEqual(meta['favicon'], self.base + '/static/icon.png')
+
+    def test_not_found_is_dead(self):
+        meta = self.fetch('/missing')
+        self.assertEqual((meta['status'], meta['http_status']), (LINK_STATUS_DEAD, 404))
+
+    def test_forbidden_is_restricted(self):
+        meta = self.fetch('/private')
+        self.assertEqual((meta['status'], meta['http_status']), (LINK_STATUS_RESTRICTED, 403))
+
+    def test_timeout_is_unreachable(self):
+        started = time.monotonic()
+        meta = self.fetch('/slow', timeout=1)
+        self.assertEqual(meta['status'], LINK_STATUS_UNREACHABLE)
+        self.assertLess(time.monotonic() - started, SLOW_SECONDS)
+
+    def test_loopback_is_blocked_by_default(self):
+        before = len(self.server.paths)
+        for host in ('127.0.0.1', 'localhost'):
+            port = self.server.server_address[1]
+            meta = fetch_link_metadata(f"http://{host}:{port}/ok", timeout=2)
+            self.assertEqual(meta['status'], LINK_STATUS_UNREACHABLE)
+        self.assertEqual(len(self.server.paths), before) # Κανένα αίτημα δεν έφτασε στον server
+
+    def test_redirect_is_checked_again(self):
+        # Η πρώτη σύνδεση επιτρέπεται, η ανακατεύθυνση οδηγεί σε διεύθυνση που πια απορρίπτεται
+        self.server.block = False
+        with mock.patch('link_preview.is_public_address', lambda address: not self.server.block):
+            meta = fetch_link_metadata(self.base + '/to-blocked', timeout=2)
+        self.assertEqual(meta['status'], LINK_STATUS_UNREACHABLE)
+        self.assertEqual(self.server.paths[-1], '/to-blocked') # Η /ok δεν ζητήθηκε ποτέ
+
+    def test_only_http_schemes(self):
+        self.assertEqual(fetch_link_metadata('file:///etc/passwd')['status'], LINK_STATUS_UNREACHABLE)
+        self.assertEqual(fetch_link_metadata('ftp://127.0.0.1/')['status'], LINK_STATUS_UNREACHABLE)
+        self.assertEqual(self.fetch('/to-file')['status'], LINK_STATUS_UNREACHABLE)
+
+    def test_fetcher_stores_results_in_cache(self):
+        cache = LinkPreviewCache(None)
+        fetcher = LinkMetadataFetcher(cache, timeout=1, fetch=functools.partial(fetch_link_metadata, allow_private=True))
+        urls = [self.base + path for path in ('/ok', '/missing', '/private', '/slow')]
+        asyncio.run(fetcher.fetch_all(urls))
+        statuses = [cache.get(url)['status'] for url in urls]
+        self.assertEqual(statuses, [LINK_STATUS_OK, LINK_STATUS_DEAD, LINK_STATUS_RESTRICTED, LINK_STATUS_UNREACHABLE])
+
+
+class PublicAddressTest(unittest.TestCase):
+
+    def test_private_loopback_and_link_local_are_not_public(self):
+        for address in ('127.0.0.1', '10.1.2.3', '172.16.0.1', '192.168.1.10', '169.254.169.254',
+                        '0.0.0.0', '::1', 'fe80::1%eth0', 'fd00::1', '::ffff:127.0.0.1'):
+            self.assertFalse(is_public_address(address), address)
+
+    def test_public_addresses(self):
+        for address in ('8.8.8.8', '142.250.184.14', '2001:4860:4860::8888'):
+            self.assertTrue(is_public_address(address), address)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,23 +2,61 @@ import streamlit as st
 import pandas as pd
 import gspread
 from datetime import datetime, timedelta
+import os
 import re
+import sys
+import atexit
+import json
+import time
+import hashlib
+import html
+import bisect
+import heapq
+import threading
+import functools
+from contextlib import contextmanager
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from urllib.parse import quote_plus
 import numpy as np 
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from memory_budget import BudgetedCache, MemoryBudget, deep_sizeof
+from sheets_quota import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_WRITE,
+    SheetsQuotaManager, quota_http_client, quota_priority,
+)
+from link_preview import (
+    LinkMetadataFetcher, LinkPreviewCache,
+    LINK_STATUS_DEAD, LINK_STATUS_OK, LINK_STATUS_RESTRICTED, LINK_STATUS_UNREACHABLE,
+)
 
 # --------------------------------------------------------------------------------
 # 0. ΡΥΘΜΙΣΕΙΣ (CONNECTION & FORMATS) & CSS
 # --------------------------------------------------------------------------------
 
+@st.cache_resource
+def get_sheets_quota():
+    """
+    Ο κοινός διαχειριστής ορίων των Google APIs (βλ. sheets_quota.py). Τα όρια ανά λεπτό είναι του
+    project του service account: `sheets_read_per_minute` / `sheets_write_per_minute` στα secrets.
+    """
+    return SheetsQuotaManager(
+        read_per_minute=int(st.secrets.get("sheets_read_per_minute", 60)),
+        write_per_minute=int(st.secrets.get("sheets_write_per_minute", 60)),
+        drive_per_minute=int(st.secrets.get("drive_per_minute", 300)),
+    )
+
 @st.cache_resource
 def get_gspread_client():
-    """Δημιουργεί και επιστρέφει τον gspread client."""
+    """Δημιουργεί και επιστρέφει τον gspread client (κάθε αίτημά του περνά από το get_sheets_quota())."""
     try:
         service_account_info = dict(st.secrets["gcp_service_account"])
         # Αντικατάσταση των escape sequences για τη σωστή ανάγνωση του private key
         service_account_info['private_key'] = service_account_info['private_key'].replace('\\n', '\n')
-        gc = gspread.service_account_from_dict(service_account_info)
+        gc = gspread.service_account_from_dict(service_account_info, http_client=quota_http_client(get_sheets_quota()))
         return gc
     except Exception as e:
         # st.error(f"Σφάλμα σύνδεσης gspread. Ελέγξτε τα secrets.toml και τα δικαιώματα. Λεπτομέρειες: {e}")
@@ -28,9 +66,38 @@ gc = get_gspread_client()
 SHEET_NAME = st.secrets["sheet_name"]
 DATE_FORMAT = '%d/%m/%Y'
 
-def apply_custom_css():
-    """Εφαρμόζει Custom CSS για βελτίωση της εμφάνισης."""
-    st.markdown("""
+# Λειτουργία shards: ένα worksheet/spreadsheet ανά Σχολείο (βλ. load_shard_routing)
+SHARDED_MODE = bool(st.secrets.get("sharded_mode", False))
+SHARDS_SHEET = "Shards"
+CLASSBOT_SHEET = "ClassBot" # Το πρώτο worksheet του SHEET_NAME (κλειδί για τον μετρητή εγγραφών)
+SHARD_LOAD_WORKERS = 8
+SHARD_CACHE_MAX_ENTRIES = 200
+ACTIVE_SCHOOL_WINDOW = timedelta(minutes=15)
+
+# Έλεγχος αλλαγών: κάθε πόσα δευτερόλεπτα ελέγχεται το modifiedTime ενός spreadsheet
+VERSION_POLL_SECONDS = 10
+
+# Αρχείο αλλαγών (append-only, JSON lines) των εγγραφών της εφαρμογής
+CHANGE_LOG_PATH = st.secrets.get("change_log_path", "classbot_changes.jsonl")
+CHANGE_LOG_MEMORY_ENTRIES = 10000
+
+# Σταδιακή φόρτωση: πλήθος σειρών ανά αίτημα στο Sheet
+INGEST_CHUNK_ROWS = 5000
+
+# Μεταδεδομένα συνδέσμων (τίτλος, favicon, διαθεσιμότητα) για τις κάρτες Link (βλ. link_preview.py)
+LINK_PREVIEWS_ENABLED = bool(st.secrets.get("link_previews", True))
+LINK_PREVIEW_CACHE_PATH = st.secrets.get("link_preview_cache_path", "classbot_links.json")
+
+# Κοινό όριο μνήμης (MB) για τις caches δεδομένων, όψεων, ενοτήτων και αναζητήσεων (βλ. memory_budget.py)
+CACHE_MEMORY_BUDGET_MB = float(st.secrets.get("cache_memory_budget_mb", 512))
+
+# Στατιστικά χρήσης (αναζητήσεις, επιλογές τμημάτων) και προθέρμανση των δημοφιλών τμημάτων
+ANALYTICS_PATH = st.secrets.get("analytics_path", "classbot_analytics.json")
+ANALYTICS_FLUSH_SECONDS = 60
+WARM_CLASSES = 20 # Τμήματα που προθερμαίνονται μετά από κάθε νέα φόρτωση δεδομένων
+WARM_QUERIES = 5  # Συχνότερες αναζητήσεις ανά τμήμα που προϋπολογίζονται
+
+CUSTOM_CSS = """
         <style>
             /* Κεντρική ρύθμιση εμφάνισης */
             .main-header {
@@ -61,12 +128,34 @@ def apply_custom_css():
                 color: #5D6D7E;
                 float: right;
             }
+            .card-class {
+                font-size: 0.85em;
+                font-weight: bold;
+                color: #1A5276;
+                margin-right: 8px;
+            }
             .card-keyword {
                 font-style: italic;
                 color: #AAB7B8;
                 font-size: 0.8em;
                 margin-top: 5px;
             }
+            /* Τίτλος/favicon και κατάσταση συνδέσμου στις κάρτες Link */
+            .card-link-preview {
+                font-size: 0.85em;
+                color: #5D6D7E;
+                margin-top: 5px;
+            }
+            .card-link-preview img {
+                vertical-align: middle;
+                margin-right: 4px;
+            }
+            .card-link-status {
+                font-size: 0.85em;
+                font-weight: bold;
+                color: #C0392B;
+                margin-top: 5px;
+            }
             /* Εμφάνιση του st.error σε πιο ευγενικό κίτρινο για warnings */
             div.stAlert > div:nth-child(1) {
                 border-left: 10px solid #F1C40F !important;
@@ -100,7 +189,11 @@ def apply_custom_css():
             /* -------------------------------------------------------------------------- */
 
         </style>
-    """, unsafe_allow_html=True)
+    """
+
+def apply_custom_css():
+    """Εφαρμόζει Custom CSS για βελτίωση της εμφάνισης."""
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 
 # --------------------------------------------------------------------------------
@@ -120,63 +213,659 @@ def get_tags_from_keyword(keyword):
     if not keyword or pd.isna(keyword): return []
     return [normalize_text(word) for word in str(keyword).split() if word]
 
-@st.cache_data(ttl=600)
-def load_data():
-    """Φορτώνει, καθαρίζει και ταξινομεί δεδομένα από το ενιαίο Google Sheet (ClassBot)."""
+# --------------------------------------------------------------------------------
+# ΕΚΔΟΣΗ ΔΕΔΟΜΕΝΩΝ (ΦΘΗΝΟΣ ΕΛΕΓΧΟΣ ΑΛΛΑΓΩΝ)
+# --------------------------------------------------------------------------------
+# Οι loaders δεν έχουν TTL: είναι cached ανά έκδοση δεδομένων. Η έκδοση αλλάζει όταν
+# αλλάξει το modifiedTime (Drive) του spreadsheet ή όταν η εφαρμογή γράψει η ίδια σε
+# ένα worksheet, οπότε αμετάβλητα δεδομένα δεν ξανακατεβαίνουν ποτέ και οι απευθείας
+# αλλαγές στο Sheet εμφανίζονται μέσα σε VERSION_POLL_SECONDS.
+
+@st.cache_resource
+def open_spreadsheet(spreadsheet_name: str):
+    """Ανοίγει (μία φορά ανά διεργασία) ένα spreadsheet με το όνομά του."""
+    return gc.open(spreadsheet_name)
+
+class DataVersionProbe:
+    """
+    Έκδοση δεδομένων ανά (spreadsheet, worksheet) = (epoch αλλαγών του spreadsheet, μετρητής εγγραφών
+    της εφαρμογής στο worksheet). Το epoch αυξάνεται όταν αλλάξει το modifiedTime του spreadsheet.
+    """
+
+    def __init__(self, poll_interval):
+        self._lock = threading.Lock()
+        self._poll_interval = poll_interval
+        self._spreadsheets = {}
+        self._write_counters = {}
+
+    def _state(self, spreadsheet_name):
+        with self._lock:
+            if spreadsheet_name not in self._spreadsheets:
+                self._spreadsheets[spreadsheet_name] = {
+                    'modified': None, 'epoch': 0, 'checked_at': None, 'failed': False, 'poll_lock': threading.Lock(),
+                }
+            return self._spreadsheets[spreadsheet_name]
+
+    def _poll(self, state, spreadsheet_name, baseline=None):
+        """
+        Διαβάζει το modifiedTime. Μια αλλαγή αυξάνει το epoch, εκτός αν η προηγούμενη γνωστή τιμή είναι
+        ακόμη το baseline που επέστρεψε η begin_write: τότε η αλλαγή είναι η δική μας εγγραφή.
+        """
+        try:
+            modified = open_spreadsheet(spreadsheet_name).get_lastUpdateTime()
+        except Exception:
+            modified = None
+        with self._lock:
+            state['checked_at'] = time.monotonic()
+            state['failed'] = modified is None
+            if modified is not None and modified != state['modified']:
+                ours = baseline is not None and state['modified'] == baseline
+                if state['modified'] is not None and not ours:
+                    state['epoch'] += 1
+                state['modified'] = modified
+
+    def spreadsheet_epoch(self, spreadsheet_name):
+        """Epoch του spreadsheet, με έλεγχο modifiedTime το πολύ μία φορά ανά poll_interval (για όλες τις συνεδρίες)."""
+        state = self._state(spreadsheet_name)
+        if state['checked_at'] is None:
+            # Πρώτη φορά: περιμένουμε την τιμή (μόνο ένα thread κάνει την κλήση)
+            with state['poll_lock']:
+                if state['checked_at'] is None:
+                    self._poll(state, spreadsheet_name)
+        elif time.monotonic() - state['checked_at'] >= self._poll_interval and state['poll_lock'].acquire(blocking=False):
+            # Οι υπόλοιπες συνεδρίες συνεχίζουν με την τελευταία γνωστή έκδοση όσο γίνεται ο έλεγχος
+            try:
+                self._poll(state, spreadsheet_name)
+            finally:
+                state['poll_lock'].release()
+
+        epoch = str(state['epoch'])
+        if state['failed']:
+            # Χωρίς απάντηση από το Drive επιστρέφουμε στην παλιά συμπεριφορά (ανανέωση ανά 10 λεπτά)
+            epoch += f"~{int(time.time() // 600)}"
+        return epoch
+
+    def data_version(self, spreadsheet_name, worksheet_name=""):
+        """Κλειδί έκδοσης για τα δεδομένα ενός worksheet (για τα κλειδιά των caches)."""
+        epoch = self.spreadsheet_epoch(spreadsheet_name)
+        with self._lock:
+            writes = self._write_counters.get((spreadsheet_name, worksheet_name), 0)
+        return f"{epoch}.{writes}"
+
+    def begin_write(self, spreadsheet_name):
+        """
+        Λίγο πριν από εγγραφή της εφαρμογής: νέος έλεγχος του modifiedTime, ώστε μια εξωτερική αλλαγή ως
+        εδώ να αυξήσει το epoch. Επιστρέφει το baseline για το acknowledge_write (None αν απέτυχε ο έλεγχος).
+        """
+        state = self._state(spreadsheet_name)
+        with state['poll_lock']:
+            self._poll(state, spreadsheet_name)
+            with self._lock:
+                return None if state['failed'] else state['modified']
+
+    def note_write(self, spreadsheet_name, worksheet_name="", baseline=None):
+        """Καταγράφει εγγραφή της εφαρμογής: νέα έκδοση μόνο για αυτό το worksheet, όχι για τα υπόλοιπα."""
+        with self._lock:
+            key = (spreadsheet_name, worksheet_name)
+            self._write_counters[key] = self._write_counters.get(key, 0) + 1
+        self.acknowledge_write(spreadsheet_name, baseline)
+
+    def acknowledge_write(self, spreadsheet_name, baseline=None):
+        """
+        Μετά από εγγραφή της εφαρμογής: η αλλαγή του modifiedTime από το baseline της begin_write είναι δική
+        μας και δεν αυξάνει το epoch. Αν στο μεταξύ είχε αλλάξει (ή δεν υπάρχει baseline), το epoch αυξάνεται.
+        """
+        state = self._state(spreadsheet_name)
+        with state['poll_lock']:
+            self._poll(state, spreadsheet_name, baseline=baseline)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {'modified': state['modified'], 'epoch': state['epoch'], 'failed': state['failed']}
+                for name, state in self._spreadsheets.items()
+            }
+
+@st.cache_resource
+def get_data_version_probe():
+    """Επιστρέφει τον κοινόχρηστο έλεγχο εκδόσεων δεδομένων."""
+    return DataVersionProbe(poll_interval=VERSION_POLL_SECONDS)
+
+def settings_data_version():
+    """Έκδοση των βοηθητικών φύλλων του SHEET_NAME (Χρήστες, Σχολεία, Shards)."""
+    return get_data_version_probe().data_version(SHEET_NAME)
+
+def classbot_data_version(school=None):
+    """Έκδοση των δεδομένων ClassBot (ή, σε λειτουργία shards, του shard του σχολείου)."""
+    if SHARDED_MODE:
+        return get_data_version_probe().data_version(*shard_route(school))
+    return get_data_version_probe().data_version(SHEET_NAME, CLASSBOT_SHEET)
+
+# --------------------------------------------------------------------------------
+# ΜΝΗΜΗ CACHES (ΚΟΙΝΟ ΟΡΙΟ & LRU)
+# --------------------------------------------------------------------------------
+# Όλες οι μεγάλες caches (DataFrames των φύλλων, παράγωγα τμημάτων, έτοιμο HTML, αποτελέσματα
+# αναζήτησης) μετρούν το μέγεθος κάθε εγγραφής και μοιράζονται το CACHE_MEMORY_BUDGET_MB: όταν
+# ξεπεραστεί, αφαιρείται ό,τι χρησιμοποιήθηκε λιγότερο πρόσφατα, από όποια cache κι αν είναι.
+
+@st.cache_resource
+def get_memory_budget():
+    """Επιστρέφει το κοινό όριο μνήμης των caches της διεργασίας."""
+    return MemoryBudget(int(CACHE_MEMORY_BUDGET_MB * 1024 * 1024))
+
+def budgeted_cache_data(name, max_entries=None):
+    """
+    Σαν το @st.cache_data(max_entries=...) για τους loaders των φύλλων, αλλά με την τιμή κοινή για
+    όλες τις συνεδρίες (χωρίς αντίγραφο ανά κλήση) και υπό το κοινό όριο μνήμης. Οι καλούντες δεν
+    τροποποιούν το αποτέλεσμα. Ταυτόχρονες κλήσεις με τα ίδια ορίσματα το υπολογίζουν μία φορά.
+    Το wrapper.release(*args) αφαιρεί την τιμή όταν την κρατά πλέον κάποιος άλλος (π.χ. οι όψεις).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            cache = get_memory_budget().cache(name, max_entries=max_entries)
+            return cache.get_or_compute(args, lambda: func(*args))
+        wrapper.clear = lambda: get_memory_budget().cache(name, max_entries=max_entries).clear()
+        wrapper.release = lambda *args: get_memory_budget().cache(name, max_entries=max_entries).pop(args)
+        return wrapper
+    return decorator
+
+class SheetLoadError(Exception):
+    """
+    Αποτυχία ανάγνωσης ενός φύλλου (σφάλμα API, 429, QuotaTimeout κ.λπ.). Οι caches δεν κρατούν
+    εξαιρέσεις, οπότε η αποτυχία δεν αποθηκεύεται για την έκδοση δεδομένων: η επόμενη κλήση ξαναδοκιμάζει.
+    """
+
+def show_load_errors(default):
+    """
+    Τυλίγει έναν cached loader: μια SheetLoadError εμφανίζεται (st.error, αν έχει μήνυμα) στη συνεδρία
+    που την πήρε και επιστρέφεται το default() αντί για το αποτέλεσμα, χωρίς να μπει στην cache.
+    """
+    def decorator(loader):
+        # Ο cached loader χωρίς τον χειρισμό (που προκαλεί SheetLoadError) μένει στο wrapper.__wrapped__
+        @functools.wraps(loader)
+        def wrapper(*args):
+            try:
+                return loader(*args)
+            except SheetLoadError as e:
+                if str(e):
+                    st.error(str(e))
+                return default()
+        wrapper.clear = loader.clear
+        if hasattr(loader, 'release'):
+            wrapper.release = loader.release
+        return wrapper
+    return decorator
+
+# Κλειδιά στο df.attrs των loaders: το head() του αρχείου αλλαγών λίγο πριν και αμέσως μετά την
+# ανάγνωση του Sheet, και το πλήθος σειρών (row_count) του worksheet που διαβάστηκε
+CHANGE_LOG_SEQ_ATTR = 'change_log_seq'
+CHANGE_LOG_READ_END_ATTR = 'change_log_read_end'
+SHEET_ROWS_ATTR = 'sheet_rows'
+# Κλειδί στο df.attrs της ingest_classbot_worksheet: η επικεφαλίδα του worksheet (βλ. classbot_column_positions)
+SHEET_HEADERS_ATTR = 'sheet_headers'
+
+CLASSBOT_REQUIRED_COLS = ['Keyword', 'Info', 'URL', 'Type', 'Date', 'School', 'Tmima', 'UserId', 'ActionDate']
+
+# Κανόνες των φορμών καταχώρησης, που ελέγχονται και σε κάθε σειρά κατά τη φόρτωση
+TMIMA_PATTERN = re.compile(r'^[Α-Ω0-9]+$')
+ENTRY_TYPES = ('Text', 'Link')
+# Παλαιοί τύποι (πεζά) -> τύπος της εφαρμογής. Το 'File' (σύνδεσμος σε αρχείο, π.χ. στο Drive) διαβάζεται ως 'Link'
+LEGACY_ENTRY_TYPES = {'file': 'Link'}
+QUARANTINE_MAX_ROWS = 500 # Σειρές ανά πηγή που κρατούνται στην αναφορά καραντίνας
+
+# Η εφαρμογή χειρίζεται τις καταχωρήσεις ως λίστες με τη σειρά του CLASSBOT_REQUIRED_COLS. Οι στήλες του
+# worksheet μπορεί να έχουν άλλη σειρά (ή επιπλέον στήλες), οπότε κάθε ανάγνωση/εγγραφή σειράς του
+# Sheet περνά από τις θέσεις της επικεφαλίδας που διαβάστηκε κατά τη φόρτωση.
+
+def classbot_column_positions(headers):
+    """Στήλη του CLASSBOT_REQUIRED_COLS -> θέση της (0-based) στην επικεφαλίδα του worksheet, για όσες υπάρχουν."""
+    headers = [str(header).strip() for header in headers]
+    return {col: headers.index(col) for col in CLASSBOT_REQUIRED_COLS if col in headers}
+
+def entry_from_sheet_values(values, headers):
+    """Μια σειρά του worksheet (τιμές με τη σειρά της επικεφαλίδας) ως λίστα με τη σειρά του CLASSBOT_REQUIRED_COLS."""
+    positions = classbot_column_positions(headers)
+    return [
+        values[positions[col]] if col in positions and positions[col] < len(values) else ''
+        for col in CLASSBOT_REQUIRED_COLS
+    ]
+
+def entry_to_sheet_values(entry_list, headers):
+    """Αντίστροφο της entry_from_sheet_values (για την append_row). Οι υπόλοιπες στήλες μένουν κενές."""
+    positions = classbot_column_positions(headers)
+    values = [''] * (max(positions.values(), default=-1) + 1)
+    for col, value in zip(CLASSBOT_REQUIRED_COLS, entry_list):
+        if col in positions:
+            values[positions[col]] = value
+    return values
+
+def entry_cell_updates(row_number, entry_list, headers):
+    """
+    Τα κελιά (για ws.batch_update) που γράφουν την καταχώρηση στη σειρά row_number (1-based). Γράφονται
+    μόνο οι στήλες του ClassBot, οπότε οι υπόλοιπες στήλες του worksheet μένουν ανέγγιχτες.
+    """
+    positions = classbot_column_positions(headers)
+    return [
+        {'range': gspread.utils.rowcol_to_a1(row_number, positions[col] + 1), 'values': [[value]]}
+        for col, value in zip(CLASSBOT_REQUIRED_COLS, entry_list) if col in positions
+    ]
+
+def classbot_row_problems(values, dates, action_dates):
+    """
+    Διανυσματικός έλεγχος ενός τμήματος σειρών με τους κανόνες των φορμών. values: στήλη -> Series
+    (καθαρισμένα κείμενα), dates/action_dates: οι αναλυμένες ημερομηνίες. Επιστρέφει DataFrame με
+    μία boolean στήλη ανά πρόβλημα (True = η σειρά παραβιάζει τον κανόνα).
+    """
+    item_type = values['Type'].str.lower()
+    return pd.DataFrame({
+        "Κενή φράση-κλειδί (Keyword)": values['Keyword'] == '',
+        "Κενό σχολείο (School)": values['School'] == '',
+        "Μη έγκυρο τμήμα (Tmima: μόνο Α-Ω και 0-9)": ~values['Tmima'].str.match(TMIMA_PATTERN),
+        f"Άγνωστος τύπος (Type: {'/'.join(ENTRY_TYPES)})": ~item_type.isin([entry_type.lower() for entry_type in ENTRY_TYPES]),
+        f"Μη έγκυρη ημερομηνία (Date: {DATE_FORMAT})": dates.isna(),
+        f"Μη έγκυρη ημερομηνία ενέργειας (ActionDate: {DATE_FORMAT})": action_dates.isna() & (values['ActionDate'] != ''),
+        "Σύνδεσμος χωρίς URL": (item_type == 'link') & (values['URL'] == ''),
+    })
+
+class ClassBotColumnBuffers:
+    """
+    Buffers ανά στήλη για τη σταδιακή φόρτωση του ClassBot: προδεσμευμένοι πίνακες datetime64/int64
+    για τις ημερομηνίες και το Internal_ID, και συμπαγή τμήματα (dtype str) για τα κείμενα. Κάθε τμήμα
+    σειρών καθαρίζεται και ελέγχεται μόλις φτάσει, οπότε η μέγιστη μνήμη μένει κοντά στο μέγεθος του
+    τελικού DataFrame. Οι σειρές που παραβιάζουν τους κανόνες των φορμών μπαίνουν σε καραντίνα αντί
+    να χάνονται σιωπηλά, ενώ οι έγκυρες συνεχίζουν να εμφανίζονται.
+    """
+
+    STRING_COLS = ['Keyword', 'Info', 'URL', 'Type', 'School', 'Tmima', 'UserId']
+    DATE_COLS = ['Date', 'ActionDate']
+
+    def __init__(self, headers, capacity):
+        headers = [str(header).strip() for header in headers]
+        # Μια στήλη που λείπει διαβάζεται ως κενή και οι σειρές ελέγχονται κανονικά (π.χ. χωρίς
+        # 'ActionDate' η εφαρμογή συνεχίζει, χωρίς 'Date' όλες οι σειρές μπαίνουν σε καραντίνα)
+        self.missing_columns = [col for col in CLASSBOT_REQUIRED_COLS if col not in headers]
+        self.positions = classbot_column_positions(headers)
+        self.width = max(self.positions.values(), default=0) + 1
+        self.size = 0
+        self.quarantined = 0
+        self.quarantine = []
+        self._strings = {col: [] for col in self.STRING_COLS}
+        self._allocate(max(capacity, 1))
+
+    def _allocate(self, capacity):
+        self._dates = {col: np.full(capacity, np.datetime64('NaT'), dtype='datetime64[us]') for col in self.DATE_COLS}
+        self._ids = np.empty(capacity, dtype=np.int64)
+
+    def _ensure_capacity(self, needed):
+        """Μεγαλώνει τους buffers (διπλασιασμός) αν το worksheet απέκτησε σειρές μετά την ανάγνωση του row_count."""
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        old_dates, old_ids = self._dates, self._ids
+        self._allocate(max(needed, 2 * capacity))
+        for col, buffer in old_dates.items():
+            self._dates[col][:self.size] = buffer[:self.size]
+        self._ids[:self.size] = old_ids[:self.size]
+
+    def append_chunk(self, rows, first_row_number):
+        """
+        Καθαρίζει και ελέγχει ένα τμήμα σειρών (λίστα λιστών, όπως από το Sheet) και γράφει τις έγκυρες
+        στους buffers. first_row_number: ο αριθμός σειράς του Sheet για το rows[0] (Internal_ID = σειρά - 1).
+        Οι εντελώς κενές σειρές αγνοούνται.
+        """
+        if not rows:
+            return
+        width = self.width
+        chunk = pd.DataFrame([row[:width] + [''] * (width - len(row)) for row in rows], columns=range(width))
+        # Εφαρμόζουμε .str.strip() σε όλες τις στήλες (π.χ. για σωστό φιλτράρισμα του UserId)
+        empty = pd.Series('', index=chunk.index, dtype=str)
+        values = {
+            col: chunk[self.positions[col]].astype(str).str.strip() if col in self.positions else empty
+            for col in CLASSBOT_REQUIRED_COLS
+        }
+        values['Type'] = values['Type'].str.lower().map(LEGACY_ENTRY_TYPES).fillna(values['Type'])
+        dates = pd.to_datetime(values['Date'], format=DATE_FORMAT, errors='coerce')
+        action_dates = pd.to_datetime(values['ActionDate'], format=DATE_FORMAT, errors='coerce')
+
+        blank = pd.concat([values[col] == '' for col in CLASSBOT_REQUIRED_COLS], axis=1).all(axis=1)
+        problems = classbot_row_problems(values, dates, action_dates)
+        invalid = problems.any(axis=1) & ~blank
+        if invalid.any():
+            self._quarantine_rows(values, problems, invalid, first_row_number)
+
+        keep = (~invalid & ~blank).to_numpy()
+        count = int(keep.sum())
+        if count == 0:
+            return
+
+        self._ensure_capacity(self.size + count)
+        target = slice(self.size, self.size + count)
+        for col in self.STRING_COLS:
+            self._strings[col].append(values[col][keep])
+        self._dates['Date'][target] = dates[keep].to_numpy()
+        self._dates['ActionDate'][target] = action_dates[keep].to_numpy()
+        self._ids[target] = first_row_number - 1 + np.flatnonzero(keep)
+        self.size += count
+
+    def _quarantine_rows(self, values, problems, invalid, first_row_number):
+        """Καταγράφει τις άκυρες σειρές (αριθμός σειράς Sheet, λόγοι, τιμές) στην αναφορά καραντίνας."""
+        positions = np.flatnonzero(invalid.to_numpy())
+        self.quarantined += len(positions)
+        room = max(QUARANTINE_MAX_ROWS - len(self.quarantine), 0)
+        flags = problems.to_numpy()
+        reasons = problems.columns
+        for position in positions[:room]:
+            row = {'Σειρά': int(first_row_number + position), 'Λόγοι': "; ".join(reasons[flags[position]])}
+            row.update({col: values[col].iloc[position] for col in CLASSBOT_REQUIRED_COLS})
+            self.quarantine.append(row)
+
+    def quarantine_report(self):
+        """Η αναφορά καραντίνας της φόρτωσης: στήλες που λείπουν, πλήθη και (έως QUARANTINE_MAX_ROWS) άκυρες σειρές."""
+        return {
+            'checked_at': datetime.now(),
+            'missing_columns': list(self.missing_columns),
+            'valid': self.size,
+            'quarantined': self.quarantined,
+            'rows': list(self.quarantine),
+        }
+
+    def to_frame(self):
+        """Το τελικό DataFrame (ίδια μορφή με πριν). Κάθε buffer αποδεσμεύεται μόλις γίνει στήλη."""
+        ids = self._ids[:self.size].copy()
+        # Index = θέση στο Sheet χωρίς την επικεφαλίδα, ώστε Internal_ID = index + 1
+        df = pd.DataFrame(index=pd.Index(ids - 1))
+        for col in CLASSBOT_REQUIRED_COLS:
+            if col in self._dates:
+                df[col] = self._dates.pop(col)[:self.size]
+            else:
+                parts = self._strings.pop(col)
+                df[col] = pd.concat(parts, ignore_index=True).array if parts else pd.array([], dtype=str)
+        df['Internal_ID'] = ids
+        self._ids = None
+        return df
+
+def ingest_classbot_worksheet(ws, chunk_rows=INGEST_CHUNK_ROWS):
+    """
+    Σταδιακή φόρτωση ενός worksheet του ClassBot: διαβάζει τις σειρές σε διαστήματα των chunk_rows
+    και καθαρίζει/ελέγχει κάθε τμήμα μόλις φτάσει, χωρίς να κρατά στη μνήμη ολόκληρο το get_all_values().
+    Επιστρέφει (καθαρό DataFrame, αναφορά καραντίνας).
+    """
+    headers = ws.row_values(1)
+    total_rows = ws.row_count
+    buffers = ClassBotColumnBuffers(headers, capacity=total_rows - 1)
+    for start in range(2, total_rows + 1, chunk_rows):
+        end = min(start + chunk_rows - 1, total_rows)
+        range_name = f"{gspread.utils.rowcol_to_a1(start, 1)}:{gspread.utils.rowcol_to_a1(end, buffers.width)}"
+        # Οι κενές σειρές στο τέλος του διαστήματος παραλείπονται από το API (οι ενδιάμεσες έρχονται κενές)
+        buffers.append_chunk(ws.get_values(range_name), first_row_number=start)
+    df = buffers.to_frame()
+    df.attrs[SHEET_HEADERS_ATTR] = list(headers)
+    return df, buffers.quarantine_report()
+
+class IngestQuarantine:
+    """Οι αναφορές καραντίνας της τελευταίας φόρτωσης κάθε πηγής (worksheet), για τους διαχειριστές."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reports = {}
+
+    def update(self, source, report):
+        with self._lock:
+            self._reports[source] = report
+
+    def reports(self):
+        with self._lock:
+            return dict(self._reports)
+
+@st.cache_resource
+def get_ingest_quarantine():
+    """Επιστρέφει το κοινόχρηστο μητρώο αναφορών καραντίνας."""
+    return IngestQuarantine()
+
+@show_load_errors(lambda: (pd.DataFrame(), []))
+@budgeted_cache_data("load_data", max_entries=2)
+def load_data(data_version: str):
+    """Φορτώνει, καθαρίζει και ταξινομεί δεδομένα από το ενιαίο Google Sheet (ClassBot), μία φορά ανά έκδοση."""
     if gc is None:
         return pd.DataFrame(), []
 
     try:
-        sh = gc.open(SHEET_NAME)
+        # Η θέση του αρχείου αλλαγών πριν από την ανάγνωση: ό,τι καταγραφεί μετά δεν είναι σίγουρα στο DataFrame
+        log_seq = get_change_log().head()
+        sh = open_spreadsheet(SHEET_NAME)
         # Χρησιμοποιούμε το πρώτο worksheet (index 0) ως το κύριο φύλλο δεδομένων (ClassBot)
         ws = sh.get_worksheet(0)
-        data = ws.get_all_values()
-        
-        headers = data[0] if data else []
-        df = pd.DataFrame(data[1:], columns=headers)
-        df.columns = df.columns.str.strip()
-        
-        # ΠΡΟΣΟΧΗ: Ελέγχουμε τις βασικές στήλες (ΠΡΟΣΘΗΚΗ: 'ActionDate')
-        required_cols = ['Keyword', 'Info', 'URL', 'Type', 'Date', 'School', 'Tmima', 'UserId', 'ActionDate']
-        if not all(col in df.columns for col in required_cols):
-            st.error(f"Σφάλμα δομής Sheet 'ClassBot': Οι επικεφαλίδες πρέπει να είναι: {', '.join(required_cols)}.")
-            return pd.DataFrame(), []
-        
-        # Καθαρισμός/Επεξεργασία δεδομένων
-        df = df.dropna(subset=['Keyword', 'Date', 'School', 'Tmima'], how='any')
-        
-        # Εφαρμόζουμε .str.strip() σε όλες τις κρίσιμες string στήλες για ασφάλεια
-        # Διορθώνει το πρόβλημα του UserId που δεν φιλτράρεται σωστά
-        string_cols = ['Keyword', 'Info', 'URL', 'Type', 'School', 'Tmima', 'UserId']
-        for col in string_cols:
-            if col in df.columns:
-                # Χρησιμοποιούμε .astype(str) για να εξασφαλίσουμε ότι είναι strings πριν το strip
-                df[col] = df[col].astype(str).str.strip()
-
-        df['Date'] = pd.to_datetime(df['Date'], format=DATE_FORMAT, errors='coerce')
-        # Επεξεργασία της ActionDate
-        df['ActionDate'] = pd.to_datetime(df['ActionDate'], format=DATE_FORMAT, errors='coerce')
-        df = df.dropna(subset=['Date'])
+        sheet_rows = ws.row_count
+        df, report = ingest_classbot_worksheet(ws)
+        df.attrs.update({CHANGE_LOG_SEQ_ATTR: log_seq, CHANGE_LOG_READ_END_ATTR: get_change_log().head(), SHEET_ROWS_ATTR: sheet_rows})
+        # Οι άκυρες σειρές (ή στήλες που λείπουν) δεν σταματούν τη φόρτωση: πηγαίνουν στην αναφορά καραντίνας
+        get_ingest_quarantine().update(CLASSBOT_SHEET, report)
         
         available_schools = sorted(df['School'].unique().tolist()) if 'School' in df.columns else []
         
-        # Προσθήκη μοναδικού ID για διαγραφή/διόρθωση (Αντιστοιχεί στην index της σειράς στο sheet)
-        df['Internal_ID'] = df.index + 1 
-        
         return df, available_schools
         
     except Exception as e:
-        st.error(f"Σφάλμα φόρτωσης/επεξεργασίας δεδομένων 'ClassBot'. Λεπτομέρειες: {e}")
-        return pd.DataFrame(), []
+        raise SheetLoadError(f"Σφάλμα φόρτωσης/επεξεργασίας δεδομένων 'ClassBot'. Λεπτομέρειες: {e}") from e
+
+# --------------------------------------------------------------------------------
+# ΛΕΙΤΟΥΡΓΙΑ SHARDS (ΕΝΑ WORKSHEET/SPREADSHEET ΑΝΑ ΣΧΟΛΕΙΟ)
+# --------------------------------------------------------------------------------
+# Ενεργοποιείται με `sharded_mode = true` στα secrets. Ο πίνακας δρομολόγησης είναι το
+# worksheet 'Shards' του SHEET_NAME με στήλες: School, Spreadsheet, Worksheet
+# (κενό Spreadsheet -> SHEET_NAME, κενό Worksheet -> όνομα σχολείου).
+
+def shard_routes():
+    """Ο τρέχων πίνακας δρομολόγησης School -> (Spreadsheet, Worksheet)."""
+    return load_shard_routing(settings_data_version())
+
+class ShardRouteError(LookupError):
+    """Το σχολείο δεν έχει γραμμή στον πίνακα δρομολόγησης (το μήνυμα εμφανίζεται με st.error)."""
+
+def shard_route(school):
+    """(Spreadsheet, Worksheet) του shard του σχολείου, ή ShardRouteError αν λείπει από το sheet 'Shards'."""
+    route = shard_routes().get(school)
+    if route is None:
+        raise ShardRouteError(f"Το σχολείο '{school}' δεν υπάρχει στον πίνακα δρομολόγησης '{SHARDS_SHEET}'.")
+    return route
+
+@show_load_errors(dict)
+@st.cache_data(max_entries=2)
+def load_shard_routing(data_version: str):
+    """Φορτώνει τον πίνακα δρομολόγησης School -> (Spreadsheet, Worksheet) από το sheet 'Shards'."""
+    if gc is None:
+        return {}
 
-@st.cache_data(ttl=600)
-def load_users_data():
+    try:
+        sh = open_spreadsheet(SHEET_NAME)
+        ws = sh.worksheet(SHARDS_SHEET)
+        data = ws.get_all_values()
+
+        headers = data[0] if data else []
+        df_routes = pd.DataFrame(data[1:], columns=headers)
+        df_routes.columns = df_routes.columns.str.strip()
+
+        if 'School' not in df_routes.columns:
+            st.error(f"Σφάλμα δομής Sheet '{SHARDS_SHEET}': Οι επικεφαλίδες πρέπει να είναι: School, Spreadsheet, Worksheet.")
+            return {}
+
+        routes = {}
+        for _, row in df_routes.iterrows():
+            school = str(row['School']).strip()
+            if not school:
+                continue
+            spreadsheet_name = str(row.get('Spreadsheet', '')).strip() or SHEET_NAME
+            worksheet_name = str(row.get('Worksheet', '')).strip() or school
+            routes[school] = (spreadsheet_name, worksheet_name)
+        return routes
+
+    except gspread.exceptions.WorksheetNotFound:
+        st.error(f"Δεν βρέθηκε το worksheet '{SHARDS_SHEET}' (απαιτείται σε λειτουργία shards).")
+        return {}
+    except Exception as e:
+        # st.error(f"Σφάλμα φόρτωσης του πίνακα δρομολόγησης. Λεπτομέρειες: {e}")
+        raise SheetLoadError() from e
+
+@budgeted_cache_data("load_shard", max_entries=SHARD_CACHE_MAX_ENTRIES)
+def load_shard(spreadsheet_name: str, worksheet_name: str, data_version: str):
+    """
+    Φορτώνει ένα shard (worksheet με τη δομή του ClassBot). Κάθε shard έχει δική του εγγραφή cache,
+    ώστε μια εγγραφή σε ένα σχολείο να μην ακυρώνει τα δεδομένα των υπολοίπων.
+    Επιστρέφει (DataFrame, None) ή προκαλεί SheetLoadError (που δεν αποθηκεύεται στην cache) -
+    εκτελείται και από threads, χωρίς κλήσεις st.*.
+    """
+    if gc is None:
+        return pd.DataFrame(), None
+
+    try:
+        log_seq = get_change_log().head() # βλ. load_data
+        ws = open_spreadsheet(spreadsheet_name).worksheet(worksheet_name)
+        sheet_rows = ws.row_count
+        df, report = ingest_classbot_worksheet(ws)
+        df.attrs.update({CHANGE_LOG_SEQ_ATTR: log_seq, CHANGE_LOG_READ_END_ATTR: get_change_log().head(), SHEET_ROWS_ATTR: sheet_rows})
+        get_ingest_quarantine().update(f"{spreadsheet_name}/{worksheet_name}", report)
+        return df, None
+
+    except Exception as e:
+        raise SheetLoadError(f"Σφάλμα φόρτωσης δεδομένων του shard '{worksheet_name}'. Λεπτομέρειες: {e}") from e
+
+@st.cache_resource
+def get_shard_load_pool():
+    """Κοινόχρηστο (ανά διεργασία) thread pool για τη φόρτωση των shards από όλες τις συνεδρίες."""
+    return ThreadPoolExecutor(max_workers=SHARD_LOAD_WORKERS, thread_name_prefix="shard-load")
+
+@st.cache_resource
+def get_background_shard_refreshes():
+    """Κοινόχρηστο μητρώο School -> Future των ανανεώσεων παρασκηνίου που τρέχουν (μία ανά σχολείο)."""
+    return {}
+
+@st.cache_resource
+def get_active_schools():
+    """Κοινόχρηστο μητρώο School -> τελευταία χρήση, για τα σχολεία που βλέπουν οι ενεργές συνεδρίες."""
+    return {}
+
+def mark_school_active(school):
+    """Καταγράφει ότι μια συνεδρία χρειάζεται τα δεδομένα του σχολείου."""
+    get_active_schools()[school] = datetime.now()
+
+def active_shard_schools():
+    """Σχολεία που χρησιμοποιήθηκαν από κάποια συνεδρία μέσα στο ACTIVE_SCHOOL_WINDOW."""
+    since = datetime.now() - ACTIVE_SCHOOL_WINDOW
+    return [school for school, last_seen in list(get_active_schools().items()) if last_seen >= since]
+
+def load_school_shards(schools, selected_school=None, raise_errors=False):
+    """
+    Φορτώνει παράλληλα (κοινό thread pool) μόνο τα shards των ζητούμενων σχολείων. Επιστρέφει School -> (DataFrame, έκδοση).
+    Αν δοθεί selected_school, μόνο το δικό του shard φορτώνεται με προτεραιότητα συνεδρίας: τα υπόλοιπα
+    είναι ανανεώσεις παρασκηνίου και υποχωρούν όταν λιγοστεύει το όριο αναγνώσεων του API.
+    Ένα shard που απέτυχε εμφανίζεται με st.error ως άδειο, ή με raise_errors=True προκαλεί SheetLoadError.
+    """
+    routes = shard_routes()
+    wanted = {school: routes[school] for school in schools if school in routes}
+    if not wanted:
+        return {}
+
+    # Τα threads παίρνουν το context της συνεδρίας ώστε τα st.cache_* να λειτουργούν κανονικά
+    ctx = get_script_run_ctx()
+
+    def _load(school):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        background = selected_school is not None and school != selected_school
+        with quota_priority(PRIORITY_BACKGROUND if background else PRIORITY_INTERACTIVE):
+            data_version = get_data_version_probe().data_version(*wanted[school])
+            try:
+                df, error = load_shard(*wanted[school], data_version)
+            except SheetLoadError as e:
+                df, error = pd.DataFrame(), str(e)
+        return df, error, data_version
+
+    results = dict(zip(wanted, get_shard_load_pool().map(_load, wanted)))
+
+    frames = {}
+    for school, (df, error, data_version) in results.items():
+        if error and raise_errors:
+            raise SheetLoadError(error)
+        if error:
+            st.error(error)
+        frames[school] = (df, data_version)
+    return frames
+
+def load_school_views(schools, selected_school):
+    """
+    Σαν τη load_school_shards, αλλά για τη σελίδα: ενημερώνει τις όψεις (ClassBotViews) του shard κάθε
+    σχολείου, κατεβάζοντας μόνο όσα shards άλλαξαν έκδοση (βλ. refresh_classbot_views). Η σελίδα περιμένει
+    μόνο το selected_school: τα υπόλοιπα σχολεία ανανεώνονται στο παρασκήνιο (το πολύ μία ανανέωση ανά
+    σχολείο) και τα σφάλματά τους αγνοούνται, αφού θα ξαναδοκιμαστούν στην επόμενη εκτέλεση. Επιστρέφει
+    τις όψεις του selected_school, ή None αν η φόρτωσή του απέτυχε (το σφάλμα εμφανίζεται με st.error).
+    """
+    routes = shard_routes()
+    wanted = {school: routes[school] for school in dict.fromkeys([selected_school, *schools]) if school in routes}
+    if selected_school not in wanted:
+        return None
+
+    ctx = get_script_run_ctx() # βλ. load_school_shards
+
+    def _refresh(school):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        background = school != selected_school
+        with quota_priority(PRIORITY_BACKGROUND if background else PRIORITY_INTERACTIVE):
+            data_version = get_data_version_probe().data_version(*wanted[school])
+            try:
+                return refresh_classbot_views(data_version, load_shard, (*wanted[school], data_version), classbot_shard_key(school)), None
+            except SheetLoadError as e:
+                return None, str(e)
+
+    pool, background = get_shard_load_pool(), get_background_shard_refreshes()
+    selected = pool.submit(_refresh, selected_school)
+    for school in wanted:
+        running = background.get(school)
+        if school != selected_school and (running is None or running.done()):
+            background[school] = pool.submit(_refresh, school)
+
+    views, error = selected.result()
+    if error:
+        st.error(error)
+    return views
+
+def classbot_shard_key(school=None):
+    """Κλειδί του shard ενός σχολείου ('' για το ενιαίο ClassBot)."""
+    if not SHARDED_MODE:
+        return ""
+    spreadsheet_name, worksheet_name = shard_route(school)
+    return f"{spreadsheet_name}/{worksheet_name}"
+
+def open_classbot_worksheet(school=None):
+    """Ανοίγει το worksheet όπου γράφονται οι καταχωρήσεις του σχολείου (το shard του ή το ClassBot)."""
+    # Χρησιμοποιείται πριν από εγγραφές: οι αναγνώσεις του έχουν την προτεραιότητα των εγγραφών
+    with quota_priority(PRIORITY_WRITE):
+        if SHARDED_MODE:
+            spreadsheet_name, worksheet_name = shard_route(school)
+            return open_spreadsheet(spreadsheet_name).worksheet(worksheet_name)
+        return open_spreadsheet(SHEET_NAME).get_worksheet(0) # Sheet ClassBot
+
+def begin_classbot_write(school=None):
+    """Πριν από εγγραφή στο ClassBot (ή στο shard του σχολείου): baseline του modifiedTime (βλ. DataVersionProbe.begin_write)."""
+    if SHARDED_MODE:
+        return get_data_version_probe().begin_write(shard_route(school)[0])
+    return get_data_version_probe().begin_write(SHEET_NAME)
+
+def invalidate_classbot_data(school=None, baseline=None):
+    """Μετά από εγγραφή: νέα έκδοση δεδομένων μόνο για το ClassBot (ή μόνο για το shard του σχολείου)."""
+    if SHARDED_MODE:
+        get_data_version_probe().note_write(*shard_route(school), baseline=baseline)
+    else:
+        get_data_version_probe().note_write(SHEET_NAME, CLASSBOT_SHEET, baseline=baseline)
+
+@show_load_errors(pd.DataFrame)
+@st.cache_data(max_entries=2)
+def load_users_data(data_version: str):
     """Φορτώνει τα δεδομένα χρηστών (UserId, School, Name, UserName, Password) από το sheet 'Χρήστες'."""
     if gc is None:
         return pd.DataFrame()
 
     try:
-        sh = gc.open(SHEET_NAME)
+        sh = open_spreadsheet(SHEET_NAME)
         ws = sh.worksheet("Χρήστες")
         data = ws.get_all_values()
 
@@ -199,16 +888,17 @@ def load_users_data():
 
     except Exception as e:
         # st.error(f"Σφάλμα φόρτωσης δεδομένων χρηστών. Λεπτομέρειες: {e}")
-        return pd.DataFrame()
+        raise SheetLoadError() from e
 
-@st.cache_data(ttl=600)
-def load_tmima_data(school_name: str) -> List[str]:
-    """Φορτώνει τη λίστα των Τμημάτων για ένα συγκεκριμένο Σχολείο από το sheet 'Σχολεία'."""
+@show_load_errors(dict)
+@st.cache_data(max_entries=2)
+def load_school_classes_map(data_version: str):
+    """Φορτώνει μία φορά το sheet 'Σχολεία' και επιστρέφει χάρτη School -> ταξινομημένη λίστα Τμημάτων."""
     if gc is None:
-        return []
+        return {}
 
     try:
-        sh = gc.open(SHEET_NAME)
+        sh = open_spreadsheet(SHEET_NAME)
         ws = sh.worksheet("Σχολεία")
         data = ws.get_all_values()
         
@@ -219,18 +909,28 @@ def load_tmima_data(school_name: str) -> List[str]:
         required_cols = ['School', 'Tmima']
         if not all(col in df_tmima.columns for col in required_cols):
             st.warning(f"⚠️ Προσοχή: Σφάλμα δομής Sheet 'Σχολεία'. Συνεχίζουμε με χειροκίνητη εισαγωγή Τμήματος.")
-            return []
+            return {}
+
+        # Καθαρισμός σε ένα διανυσματικό πέρασμα για όλα τα σχολεία
+        df_tmima = pd.DataFrame({
+            'School': df_tmima['School'].astype(str).str.strip(),
+            'Tmima': df_tmima['Tmima'].astype(str).str.strip().str.upper(),
+        })
+        df_tmima = df_tmima[df_tmima['Tmima'] != ""].drop_duplicates().sort_values(by=['School', 'Tmima'])
 
-        # Φιλτράρισμα βάσει Σχολείου και επιστροφή μοναδικών Τμημάτων
-        tmimata = df_tmima[df_tmima['School'].astype(str).str.strip() == school_name.strip()]['Tmima'].unique().tolist()
-        return sorted([t.strip().upper() for t in tmimata if t.strip()])
+        # Ομαδοποίηση ανά Σχολείο (η ταξινόμηση διατηρείται μέσα σε κάθε ομάδα)
+        return df_tmima.groupby('School', sort=False)['Tmima'].agg(list).to_dict()
         
     except gspread.exceptions.WorksheetNotFound:
         st.warning("⚠️ Προσοχή: Δεν βρέθηκε το worksheet 'Σχολεία'. Η καταχώρηση Τμήματος θα γίνει χειροκίνητα.")
-        return []
+        return {}
     except Exception as e:
         # st.error(f"Σφάλμα φόρτωσης δεδομένων Τμημάτων από το sheet 'Σχολεία'. Λεπτομέρειες: {e}")
-        return []
+        raise SheetLoadError() from e
+
+def load_tmima_data(school_name: str) -> List[str]:
+    """Επιστρέφει τη λίστα των Τμημάτων ενός Σχολείου από τον (cached) χάρτη του sheet 'Σχολεία'."""
+    return load_school_classes_map(settings_data_version()).get(school_name.strip(), [])
 
 def create_search_maps(df):
     """Δημιουργεί τους χάρτες αναζήτησης μετά το φιλτράρισμα."""
@@ -252,23 +952,764 @@ def create_search_maps(df):
             
     return tag_to_keyword_map, keyword_to_data_map
 
+def format_post_label(date_str, tmima, has_action_date, keyword, info):
+    """Δημιουργεί την ετικέτα επιλογής μιας καταχώρησης (χωρίς το '(ID: ...)')."""
+    calendar_status = " [📅]" if has_action_date else ""
+    info_preview = info[:70] + "..." if len(info) > 70 else info
+    return f"[{date_str} - {tmima}]{calendar_status} {keyword} - {info_preview}"
+
+def build_post_labels(df):
+    """Διανυσματική έκδοση της format_post_label για ολόκληρο το DataFrame."""
+    info = df['Info'].astype(str)
+    info_preview = info.where(info.str.len() <= 70, info.str[:70] + "...")
+    calendar_status = pd.Series(np.where(df['ActionDate'].notna(), " [📅]", ""), index=df.index)
+    return (
+        "[" + df['Date'].dt.strftime(DATE_FORMAT) + " - " + df['Tmima'] + "]" + calendar_status
+        + " " + df['Keyword'] + " - " + info_preview
+    )
+
+def _date_sort_key(date_value):
+    """Κλειδί ταξινόμησης για φθίνουσα σειρά Date (νεότερες καταχωρήσεις πρώτα)."""
+    return -pd.Timestamp(date_value).value
+
+class UserPostsIndex:
+    """
+    Κοινόχρηστο ευρετήριο UserId -> καταχωρήσεις, ταξινομημένες κατά Date (νεότερες πρώτα).
+    Κάθε στοιχείο είναι (sort_key, Internal_ID, ετικέτα), ώστε οι αλλαγές του ίδιου του
+    εκπαιδευτικού να εφαρμόζονται τοπικά με bisect, χωρίς νέο φιλτράρισμα του DataFrame.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._posts = {}
+
+    def rebuild(self, df):
+        """Ξαναχτίζει το ευρετήριο από το πλήρες DataFrame (καλείται κατά τη φόρτωση)."""
+        posts = {}
+        if not df.empty:
+            sort_keys = -df['Date'].astype('datetime64[ns]').astype('int64')
+            for userid, sort_key, internal_id, label in zip(df['UserId'], sort_keys, df['Internal_ID'], build_post_labels(df)):
+                posts.setdefault(userid, []).append((int(sort_key), int(internal_id), label))
+            for entries in posts.values():
+                entries.sort()
+        with self._lock:
+            self._posts = posts
+
+    def memory_size(self):
+        """Προσεγγιστικό μέγεθος (bytes): οι λίστες, οι πλειάδες και οι ετικέτες (οι ακέραιοι ως 32 bytes)."""
+        with self._lock:
+            posts = list(self._posts.values())
+        size = sys.getsizeof(self._posts)
+        for entries in posts:
+            size += sys.getsizeof(entries) + sum(sys.getsizeof(entry) + sys.getsizeof(entry[2]) + 64 for entry in entries)
+        return size
+
+    def get(self, userid):
+        """Επιστρέφει [(ετικέτα, Internal_ID), ...] για τον χρήστη, κόστος O(καταχωρήσεις χρήστη)."""
+        with self._lock:
+            entries = list(self._posts.get(str(userid).strip(), []))
+        return [(f"{label} (ID: {internal_id})", internal_id) for _, internal_id, label in entries]
+
+    def add(self, internal_id, entry_list):
+        """Προσθέτει μια νέα καταχώρηση (σειρά ClassBot: Keyword, Info, URL, Type, Date, School, Tmima, UserId, ActionDate)."""
+        keyword, info, _, _, date_str, _, tmima, userid, action_date_str = entry_list
+        entry = (
+            _date_sort_key(datetime.strptime(date_str, DATE_FORMAT)),
+            int(internal_id),
+            format_post_label(date_str, tmima, bool(action_date_str), keyword, info),
+        )
+        with self._lock:
+            bisect.insort(self._posts.setdefault(str(userid).strip(), []), entry)
+
+    def update(self, internal_id, entry_list):
+        """Αντικαθιστά την καταχώρηση με το δοσμένο Internal_ID."""
+        userid = str(entry_list[7]).strip()
+        with self._lock:
+            entries = self._posts.get(userid, [])
+            self._posts[userid] = [e for e in entries if e[1] != int(internal_id)]
+        self.add(internal_id, entry_list)
+
+    def remove(self, userid, internal_id):
+        """Αφαιρεί μια καταχώρηση και μετατοπίζει τα Internal_ID των επόμενων σειρών του sheet."""
+        internal_id = int(internal_id)
+        with self._lock:
+            entries = self._posts.get(str(userid).strip(), [])
+            self._posts[str(userid).strip()] = [e for e in entries if e[1] != internal_id]
+            # Η delete_rows μετακινεί προς τα πάνω όλες τις επόμενες σειρές του sheet
+            for uid, user_entries in self._posts.items():
+                self._posts[uid] = [
+                    (key, iid - 1 if iid > internal_id else iid, label) for key, iid, label in user_entries
+                ]
+
+@st.cache_resource
+def get_user_posts_index(shard_key: str = ""):
+    """Επιστρέφει το κοινόχρηστο (ανά διεργασία) ευρετήριο καταχωρήσεων ανά UserId, ένα ανά shard."""
+    return UserPostsIndex()
+
+def _appended_row_number(append_response):
+    """Εξάγει τον αριθμό σειράς (1-based) από την απάντηση του ws.append_row, ή None."""
+    try:
+        updated_range = append_response['updates']['updatedRange']
+        return int(re.search(r'![A-Z]+(\d+)', updated_range).group(1))
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+# --------------------------------------------------------------------------------
+# ΑΡΧΕΙΟ ΑΛΛΑΓΩΝ (CHANGE LOG) & ΠΑΡΑΓΩΓΕΣ ΟΨΕΙΣ
+# --------------------------------------------------------------------------------
+# Κάθε εγγραφή της εφαρμογής (submit_entry, update_entry, διαγραφή) καταγράφεται σε ένα
+# append-only αρχείο JSON lines με αύξοντα αριθμό (seq), χρήστη και προηγούμενη τιμή.
+# Οι παραγόμενες όψεις (σχολεία, τμήματα, DataFrame/χάρτες αναζήτησης ανά τμήμα, ευρετήριο
+# καταχωρήσεων χρηστών) θυμούνται το τελευταίο seq που εφάρμοσαν και ενημερώνονται
+# σταδιακά από την ουρά του αρχείου, χωρίς νέο κατέβασμα ή επανυπολογισμό από το πλήρες DataFrame.
+
+class ChangeLog:
+    """Append-only αρχείο αλλαγών (JSON lines) με αύξοντες αριθμούς σειράς και τις τελευταίες αλλαγές στη μνήμη."""
+
+    def __init__(self, path, memory_entries):
+        self._lock = threading.Lock()
+        self._path = path
+        self._memory = deque(maxlen=memory_entries)
+        self._seq = 0
+        for entry in self.replay():
+            self._memory.append(entry)
+            self._seq = entry['seq']
+
+    def head(self):
+        """Ο αριθμός της τελευταίας αλλαγής."""
+        with self._lock:
+            return self._seq
+
+    def append(self, op, shard, internal_id, row, user=None, previous=None, row_count=None):
+        """
+        Καταγράφει μια αλλαγή ('insert', 'update', 'delete') και επιστρέφει την εγγραφή της.
+        row_count: το πλήθος σειρών του worksheet αμέσως μετά την εγγραφή (για τις διαγραφές).
+        """
+        with self._lock:
+            self._seq += 1
+            entry = {
+                'seq': self._seq,
+                'ts': datetime.now().isoformat(timespec='seconds'),
+                'op': op,
+                'shard': shard,
+                'user': user,
+                'internal_id': int(internal_id),
+                'row': row,
+                'previous': previous,
+                'row_count': row_count,
+            }
+            if self._path:
+                try:
+                    with open(self._path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                except OSError:
+                    pass # Η εγγραφή στο Sheet έχει ήδη γίνει, οι όψεις ενημερώνονται από τη μνήμη
+            self._memory.append(entry)
+        return entry
+
+    def tail(self, after_seq):
+        """Οι αλλαγές μετά το after_seq (από τη μνήμη, ή από το αρχείο αν είναι παλαιότερες)."""
+        with self._lock:
+            if after_seq >= self._seq:
+                return []
+            entries = []
+            for entry in reversed(self._memory):
+                if entry['seq'] <= after_seq:
+                    break
+                entries.append(entry)
+            if self._memory and self._memory[0]['seq'] <= after_seq + 1:
+                return entries[::-1]
+        return list(self.replay(after_seq))
+
+    def replay(self, after_seq=0):
+        """Διαβάζει από το αρχείο τις αλλαγές μετά το after_seq (για επαναφορά τοπικού αντιγράφου ή έλεγχο)."""
+        if not self._path or not os.path.exists(self._path):
+            return
+        with open(self._path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # Μισογραμμένη τελευταία γραμμή
+                if entry['seq'] > after_seq:
+                    yield entry
+
+@st.cache_resource
+def get_change_log():
+    """Επιστρέφει το κοινόχρηστο αρχείο αλλαγών της διεργασίας."""
+    return ChangeLog(CHANGE_LOG_PATH, memory_entries=CHANGE_LOG_MEMORY_ENTRIES)
+
+def compute_class_versions(df):
+    """
+    Hash περιεχομένου ανά (School, Tmima), υπολογισμένο διανυσματικά κατά τη φόρτωση. Δεν περιέχει το
+    Internal_ID (θέση στο Sheet): μια διαγραφή σε άλλο τμήμα μετατοπίζει τις σειρές, όχι το περιεχόμενο.
+    """
+    if df.empty:
+        return {}
+    row_hashes = pd.util.hash_pandas_object(df[CLASSBOT_REQUIRED_COLS], index=False)
+    # Το άθροισμα uint64 αναδιπλώνεται (mod 2^64), αρκεί ως αποτύπωμα του τμήματος
+    sums = row_hashes.groupby([df['School'], df['Tmima']]).sum()
+    return {key: f"{int(value):016x}" for key, value in sums.items()}
+
+def record_from_sheet_row(row):
+    """Μετατρέπει μια σειρά του Sheet (λίστα strings) στη μορφή εγγραφής των όψεων (ημερομηνίες ως Timestamp)."""
+    values = [str(value).strip() for value in row]
+    values[3] = LEGACY_ENTRY_TYPES.get(values[3].lower(), values[3])
+    values[4] = pd.to_datetime(values[4], format=DATE_FORMAT, errors='coerce')
+    values[8] = pd.to_datetime(values[8], format=DATE_FORMAT, errors='coerce')
+    return tuple(values)
+
+def record_to_sheet_row(record):
+    """Αντίστροφο της record_from_sheet_row (για την προηγούμενη τιμή στο αρχείο αλλαγών)."""
+    values = list(record)
+    for i in (4, 8):
+        values[i] = values[i].strftime(DATE_FORMAT) if pd.notna(values[i]) else ""
+    return values
+
+def entry_version(record):
+    """Έκδοση (hash περιεχομένου) μιας καταχώρησης, για τον έλεγχο πριν από κάθε διόρθωση/διαγραφή."""
+    payload = json.dumps(record_to_sheet_row(record), ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+# Πεδία που ορίζουν το περιεχόμενο μιας καταχώρησης για τον έλεγχο διπλοεγγραφών
+DUPLICATE_KEY_COLS = ['School', 'Tmima', 'Keyword', 'Info', 'URL', 'Date']
+DUPLICATE_STRIP_CHARS = ' .,!;·'
+
+def content_hashes(frame):
+    """
+    (exact, near): πίνακες uint64 με ένα hash περιεχομένου ανά σειρά του frame, υπολογισμένα
+    διανυσματικά πάνω στα DUPLICATE_KEY_COLS. Το exact αγνοεί μόνο τα κενά στην αρχή/τέλος. Το near
+    αγνοεί επιπλέον κεφαλαία/πεζά, τόνους, πολλαπλά κενά και τη στίξη στην αρχή/τέλος κάθε πεδίου.
+    """
+    exact = pd.DataFrame(index=frame.index)
+    for col in DUPLICATE_KEY_COLS:
+        values = frame[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime(DATE_FORMAT).fillna('')
+        exact[col] = values.astype(str).str.strip()
+    near = exact.apply(
+        lambda values: values.str.lower().str.translate(TONES_MAP)
+        .str.replace(r'\s+', ' ', regex=True).str.strip(DUPLICATE_STRIP_CHARS)
+    )
+    return (
+        pd.util.hash_pandas_object(exact, index=False).to_numpy(),
+        pd.util.hash_pandas_object(near, index=False).to_numpy(),
+    )
+
+def entry_content_hashes(row):
+    """(exact, near) hash περιεχομένου μιας σειράς του Sheet (λίστα strings με τη σειρά του CLASSBOT_REQUIRED_COLS)."""
+    width = len(CLASSBOT_REQUIRED_COLS)
+    frame = pd.DataFrame([(list(row) + [''] * width)[:width]], columns=CLASSBOT_REQUIRED_COLS)
+    exact, near = content_hashes(frame)
+    return int(exact[0]), int(near[0])
+
+class ClassBotViews:
+    """
+    Παραγόμενες όψεις των δεδομένων ClassBot ενός shard. Χτίζονται από το DataFrame μιας
+    έκδοσης δεδομένων και μετά ενημερώνονται σταδιακά από την ουρά του ChangeLog.
+
+    Οι σειρές της φόρτωσης μένουν στις στήλες του DataFrame, με πίνακες numpy ανά σειρά για το τρέχον
+    Internal_ID, το αν ισχύει ακόμη, το τμήμα και τα hash περιεχομένου. Εγγραφές (πλειάδες με τη σειρά
+    του CLASSBOT_REQUIRED_COLS) φτιάχνονται μόνο για το τμήμα που ζητείται και για τις αλλαγές από το
+    αρχείο, που κρατούνται χωριστά (overlay) ανά Internal_ID.
+    """
+
+    DERIVED_KINDS = ('frame', 'search_maps', 'timeline', 'actions')
+
+    def __init__(self, shard_key, budget=None):
+        self.shard_key = shard_key
+        self.lock = threading.RLock()
+        self.base_version = None
+        self.last_seq = 0
+        self._read_window = (0, 0, None) # (head πριν, head μετά την ανάγνωση, row_count του στιγμιότυπου)
+        self.headers = list(CLASSBOT_REQUIRED_COLS) # η επικεφαλίδα του worksheet κατά τη φόρτωση
+        self._set_base(pd.DataFrame(columns=CLASSBOT_REQUIRED_COLS + ['Internal_ID']))
+        # Παράγωγα ανά τμήμα, κλειδί (είδος, School, Tmima): DataFrame, χάρτες αναζήτησης και οι
+        # ταξινομημένες λίστες Date/ActionDate. Ξαναχτίζονται όταν ζητηθούν, οπότε μπορούν να
+        # αφαιρεθούν οποτεδήποτε από το όριο μνήμης.
+        name = f"views:{shard_key}" if shard_key else "views"
+        self._derived = budget.cache(name) if budget is not None else BudgetedCache(name)
+        # Οι ίδιες οι όψεις (στήλες της φόρτωσης, overlay, ευρετήρια) δεν αφαιρούνται: δηλώνονται στο όριο
+        self._budget = budget
+        self._base_bytes = 0
+
+    def _set_base(self, df):
+        """Οι στήλες και οι πίνακες ανά σειρά του DataFrame της φόρτωσης, χωρίς αλλαγές από το αρχείο."""
+        self._frame = df[CLASSBOT_REQUIRED_COLS] # επιλογή στηλών χωρίς αντίγραφο (copy-on-write)
+        self._base_ids = df['Internal_ID'].to_numpy(dtype=np.int64, copy=True) # μη φθίνουσα σειρά
+        self._alive = np.ones(len(df), dtype=bool)
+        self._class_keys = []
+        self._class_rows = {}      # (School, Tmima) -> θέσεις σειρών στο DataFrame
+        self._base_class = np.zeros(len(df), dtype=np.int64)
+        if not df.empty:
+            for code, (key, positions) in enumerate(df.groupby(['School', 'Tmima']).indices.items()):
+                self._class_keys.append(key)
+                self._class_rows[key] = positions
+                self._base_class[positions] = code
+        # Ευρετήρια διπλοεγγραφών (βλ. content_hashes): ταξινομημένα hash με τις θέσεις τους
+        exact, near = content_hashes(df) if not df.empty else (np.array([], dtype=np.uint64),) * 2
+        self._hash_order = {}
+        for kind, hashes in (('exact', exact), ('near', near)):
+            order = np.argsort(hashes, kind='stable')
+            self._hash_order[kind] = (hashes[order], order)
+        self._class_count = {key: len(positions) for key, positions in self._class_rows.items()}
+        self._base_bytes = deep_sizeof(self._frame) + sum(
+            array.nbytes for array in (self._base_ids, self._alive, self._base_class, *self._class_rows.values())
+        ) + sum(hashes.nbytes + order.nbytes for hashes, order in self._hash_order.values())
+        self._school_classes = {}  # School -> {Tmima} με τουλάχιστον μία καταχώρηση
+        for school, tmima in self._class_keys:
+            self._school_classes.setdefault(school, set()).add(tmima)
+        # Αλλαγές από το αρχείο: Internal_ID -> εγγραφή, με τα δικά τους ευρετήρια
+        self._overlay = {}
+        self._class_overlay = {}   # (School, Tmima) -> {Internal_ID}
+        self._exact_ids = {}
+        self._near_ids = {}
+        self._content_hash = {}    # Internal_ID -> (exact, near)
+
+    def rebuild(self, df, base_version, last_seq, read_end_seq=None, sheet_rows=None):
+        """
+        Πλήρες χτίσιμο από το DataFrame (μόνο όταν αλλάξει η έκδοση δεδομένων). last_seq: το head() του
+        αρχείου πριν από την ανάγνωση του df, read_end_seq/sheet_rows: το head() μετά την ανάγνωση και το
+        row_count του worksheet που διαβάστηκε (βλ. apply).
+        """
+        with self.lock:
+            self._set_base(df)
+            self._class_hash = compute_class_versions(df)
+            self._class_seq = {}
+            self._derived.clear()
+            self.base_version = base_version
+            self.last_seq = last_seq
+            self._read_window = (last_seq, read_end_seq or last_seq, sheet_rows)
+            self.headers = list(df.attrs.get(SHEET_HEADERS_ATTR, CLASSBOT_REQUIRED_COLS))
+            get_user_posts_index(self.shard_key).rebuild(df)
+            self._reserve_memory()
+
+    def sync(self, change_log):
+        """Εφαρμόζει τις αλλαγές της ουράς του αρχείου που αφορούν αυτό το shard."""
+        with self.lock:
+            applied = False
+            for entry in change_log.tail(self.last_seq):
+                if entry['shard'] == self.shard_key:
+                    self.apply(entry)
+                    applied = True
+                self.last_seq = entry['seq']
+            if applied:
+                self._reserve_memory()
+
+    def memory_size(self):
+        """Προσεγγιστικό μέγεθος (bytes) των όψεων μαζί με το ευρετήριο καταχωρήσεων χρηστών (χωρίς τα παράγωγα)."""
+        with self.lock:
+            overlay = deep_sizeof((self._overlay, self._class_overlay, self._exact_ids, self._near_ids, self._content_hash))
+            return self._base_bytes + overlay + get_user_posts_index(self.shard_key).memory_size()
+
+    def _reserve_memory(self):
+        if self._budget is not None:
+            self._budget.reserve(self._derived.name, self.memory_size())
+
+    def apply(self, entry):
+        """Εφαρμόζει μία αλλαγή του αρχείου στις όψεις και στο ευρετήριο καταχωρήσεων χρηστών."""
+        internal_id, seq, op = entry['internal_id'], entry['seq'], entry['op']
+        posts_index = get_user_posts_index(self.shard_key)
+        with self.lock:
+            if op == 'delete':
+                if self._snapshot_has_delete(entry):
+                    return
+                record = self._remove(internal_id, seq)
+                self._shift_after(internal_id)
+                if record is not None:
+                    posts_index.remove(record[7], internal_id)
+            else:
+                existed = self._remove(internal_id, seq) is not None
+                self._add(internal_id, record_from_sheet_row(entry['row']), seq)
+                if existed:
+                    posts_index.update(internal_id, entry['row'])
+                else:
+                    posts_index.add(internal_id, entry['row'])
+
+    def _snapshot_has_delete(self, entry):
+        """
+        True αν η διαγραφή φαίνεται ήδη στο στιγμιότυπο του rebuild, οπότε δεύτερη εφαρμογή θα αφαιρούσε
+        (και θα μετατόπιζε) την επόμενη σειρά. Αποφασίζεται από τις θέσεις στο αρχείο αλλαγών: οι αλλαγές
+        έως το head() πριν από την ανάγνωση είναι στο στιγμιότυπο (και δεν φτάνουν εδώ) και όσες
+        καταγράφηκαν μετά την ανάγνωση δεν είναι. Για όσες καταγράφηκαν κατά την ανάγνωση συγκρίνεται το
+        row_count του στιγμιότυπου με το row_count του worksheet αμέσως μετά τη διαγραφή.
+        """
+        _, read_end_seq, sheet_rows = self._read_window
+        if entry['seq'] > read_end_seq or sheet_rows is None or entry.get('row_count') is None:
+            return False
+        return sheet_rows <= entry['row_count']
+
+    def _base_position(self, internal_id):
+        """Η θέση στο DataFrame της σειράς που ισχύει ακόμη με αυτό το Internal_ID, ή None."""
+        start, end = np.searchsorted(self._base_ids, [internal_id, internal_id + 1])
+        for position in range(start, end):
+            if self._alive[position]:
+                return position
+        return None
+
+    def _base_record(self, position):
+        return tuple(self._frame.iloc[position])
+
+    def _record(self, internal_id):
+        """Η τρέχουσα εγγραφή του Internal_ID (από το overlay ή από το DataFrame), ή None."""
+        record = self._overlay.get(internal_id)
+        if record is not None:
+            return record
+        position = self._base_position(internal_id)
+        return self._base_record(position) if position is not None else None
+
+    def _hash_add(self, internal_id, exact, near):
+        self._content_hash[internal_id] = (exact, near)
+        self._exact_ids.setdefault(exact, set()).add(internal_id)
+        self._near_ids.setdefault(near, set()).add(internal_id)
+
+    def _hash_remove(self, internal_id):
+        hashes = self._content_hash.pop(internal_id, None)
+        if hashes is None:
+            return
+        for index, value in zip((self._exact_ids, self._near_ids), hashes):
+            ids = index.get(value, set())
+            ids.discard(internal_id)
+            if not ids:
+                index.pop(value, None)
+
+    def _touch(self, key, seq):
+        self._class_seq[key] = seq
+        self._drop_derived(key)
+
+    def _drop_derived(self, key):
+        for kind in self.DERIVED_KINDS:
+            self._derived.pop((kind,) + key)
+
+    def _count(self, key, delta):
+        """Ενημερώνει το πλήθος καταχωρήσεων του τμήματος και τη λίστα τμημάτων του σχολείου."""
+        school, tmima = key
+        self._class_count[key] = self._class_count.get(key, 0) + delta
+        if self._class_count[key] > 0:
+            self._school_classes.setdefault(school, set()).add(tmima)
+            return
+        self._school_classes.get(school, set()).discard(tmima)
+        if not self._school_classes.get(school):
+            self._school_classes.pop(school, None)
+
+    def _add(self, internal_id, record, seq):
+        key = (record[5], record[6])
+        self._overlay[internal_id] = record
+        self._class_overlay.setdefault(key, set()).add(internal_id)
+        self._hash_add(internal_id, *entry_content_hashes(record_to_sheet_row(record)))
+        self._count(key, 1)
+        self._touch(key, seq)
+
+    def _remove(self, internal_id, seq):
+        record = self._overlay.pop(internal_id, None)
+        if record is not None:
+            key = (record[5], record[6])
+            self._class_overlay.get(key, set()).discard(internal_id)
+            self._hash_remove(internal_id)
+        else:
+            position = self._base_position(internal_id)
+            if position is None:
+                return None
+            record = self._base_record(position)
+            self._alive[position] = False
+            key = self._class_keys[self._base_class[position]]
+        self._count(key, -1)
+        self._touch(key, seq)
+        return record
+
+    def _shift_after(self, internal_id):
+        """Η delete_rows μετακινεί προς τα πάνω τις επόμενες σειρές: μετατόπιση των Internal_ID τους."""
+        shifted = self._base_ids > internal_id
+        # Το περιεχόμενο που εμφανίζεται δεν αλλάζει: μόνο τα cached παράγωγα (Internal_ID)
+        for code in np.unique(self._base_class[shifted & self._alive]):
+            self._drop_derived(self._class_keys[code])
+        self._base_ids[shifted] -= 1
+
+        self._overlay = {(iid - 1 if iid > internal_id else iid): record for iid, record in self._overlay.items()}
+        self._content_hash = {(iid - 1 if iid > internal_id else iid): hashes for iid, hashes in self._content_hash.items()}
+        for index in (self._exact_ids, self._near_ids, self._class_overlay):
+            for value, ids in index.items():
+                if any(iid > internal_id for iid in ids):
+                    index[value] = {(iid - 1 if iid > internal_id else iid) for iid in ids}
+                    if index is self._class_overlay:
+                        self._drop_derived(value)
+
+    def _base_hash_ids(self, kind, value):
+        """Internal_ID των σειρών του DataFrame (που ισχύουν ακόμη) με αυτό το hash, με δυαδική αναζήτηση."""
+        hashes, order = self._hash_order[kind]
+        value = np.uint64(value)
+        start, end = np.searchsorted(hashes, value, side='left'), np.searchsorted(hashes, value, side='right')
+        positions = order[start:end]
+        return set(self._base_ids[positions[self._alive[positions]]].tolist())
+
+    def duplicates(self, exact, near):
+        """
+        Καταχωρήσεις με το ίδιο περιεχόμενο (βλ. entry_content_hashes), σε O(log n): (ταξινομημένα
+        Internal_ID με ίδιο exact hash, ταξινομημένα Internal_ID με ίδιο μόνο το near hash).
+        """
+        with self.lock:
+            exact_ids = self._base_hash_ids('exact', exact) | self._exact_ids.get(exact, set())
+            near_ids = (self._base_hash_ids('near', near) | self._near_ids.get(near, set())) - exact_ids
+        return sorted(exact_ids), sorted(near_ids)
+
+    def schools(self):
+        """Ταξινομημένη λίστα σχολείων με καταχωρήσεις."""
+        with self.lock:
+            return sorted(self._school_classes)
+
+    def classes(self, school):
+        """Ταξινομημένη λίστα τμημάτων του σχολείου με καταχωρήσεις."""
+        with self.lock:
+            return sorted(self._school_classes.get(school, ()))
+
+    def class_version(self, school, tmima):
+        """Έκδοση δεδομένων του τμήματος: hash κατά τη φόρτωση + τελευταία αλλαγή από το αρχείο."""
+        with self.lock:
+            return f"{self._class_hash.get((school, tmima), '0')}.{self._class_seq.get((school, tmima), 0)}"
+
+    def class_frame(self, school, tmima):
+        """DataFrame των καταχωρήσεων ενός τμήματος (ίδια μορφή με το load_data), cached μέχρι την επόμενη αλλαγή του."""
+        key = (school, tmima)
+
+        def build():
+            positions = self._class_rows.get(key, np.array([], dtype=np.int64))
+            positions = positions[self._alive[positions]]
+            overlay_ids = sorted(self._class_overlay.get(key, ()))
+            parts = [self._frame.iloc[positions]]
+            if overlay_ids:
+                parts.append(pd.DataFrame.from_records([self._overlay[iid] for iid in overlay_ids], columns=CLASSBOT_REQUIRED_COLS))
+            frame = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+            frame['Date'] = pd.to_datetime(frame['Date'])
+            frame['ActionDate'] = pd.to_datetime(frame['ActionDate'])
+            frame['Internal_ID'] = np.concatenate([self._base_ids[positions], np.array(overlay_ids, dtype=np.int64)])
+            frame = frame.sort_values('Internal_ID', kind='stable')
+            frame.index = frame['Internal_ID'] - 1
+            return frame
+
+        with self.lock:
+            return self._derived.get_or_compute(('frame',) + key, build)
+
+    def search_maps(self, school, tmima):
+        """Έξοδος της create_search_maps για ένα τμήμα, cached μέχρι την επόμενη αλλαγή του."""
+        def build():
+            frame = self.class_frame(school, tmima)
+            return create_search_maps(frame) if not frame.empty else ({}, {})
+
+        with self.lock:
+            return self._derived.get_or_compute(('search_maps', school, tmima), build)
+
+    def _class_records(self, school, tmima):
+        """(Internal_ID, εγγραφή) για κάθε καταχώρηση του τμήματος, από το (cached) class_frame."""
+        frame = self.class_frame(school, tmima)
+        records = frame[CLASSBOT_REQUIRED_COLS].itertuples(index=False, name=None)
+        return zip(frame['Internal_ID'].tolist(), records)
+
+    def class_timeline(self, school, tmima):
+        """
+        Οι καταχωρήσεις του τμήματος ως (Date, Internal_ID, εγγραφή), οι νεότερες πρώτα (και για την ίδια
+        ημέρα η πιο πρόσφατη σειρά του Sheet). Cached μέχρι την επόμενη αλλαγή του τμήματος.
+        """
+        def build():
+            entries = [(record[4], iid, record) for iid, record in self._class_records(school, tmima)]
+            return sorted((entry for entry in entries if pd.notna(entry[0])), reverse=True)
+
+        with self.lock:
+            return self._derived.get_or_compute(('timeline', school, tmima), build)
+
+    def class_actions(self, school, tmima):
+        """
+        Οι καταχωρήσεις του τμήματος με ActionDate ως (ActionDate, Internal_ID, εγγραφή), σε αύξουσα σειρά
+        (για bisect ανά ημερομηνία). Cached μέχρι την επόμενη αλλαγή του τμήματος.
+        """
+        def build():
+            entries = [(record[8], iid, record) for iid, record in self._class_records(school, tmima)]
+            return sorted(entry for entry in entries if pd.notna(entry[0]))
+
+        with self.lock:
+            return self._derived.get_or_compute(('actions', school, tmima), build)
+
+    def row(self, internal_id):
+        """Η καταχώρηση με το Internal_ID και την έκδοσή της (Version) ως pd.Series (για τη φόρμα επεξεργασίας), ή None."""
+        with self.lock:
+            record = self._record(int(internal_id))
+        if record is None:
+            return None
+        return pd.Series(
+            list(record) + [int(internal_id), entry_version(record)],
+            index=CLASSBOT_REQUIRED_COLS + ['Internal_ID', 'Version']
+        )
+
+    def sheet_row(self, internal_id):
+        """Η καταχώρηση σε μορφή σειράς Sheet (για την προηγούμενη τιμή στο αρχείο αλλαγών), ή None."""
+        with self.lock:
+            record = self._record(int(internal_id))
+        return record_to_sheet_row(record) if record is not None else None
+
+@st.cache_resource
+def get_classbot_views(shard_key: str = ""):
+    """Επιστρέφει τις κοινόχρηστες όψεις ενός shard ('' για το ενιαίο ClassBot)."""
+    return ClassBotViews(shard_key, budget=get_memory_budget())
+
+def sync_classbot_views(df, data_version, shard_key=""):
+    """
+    Όψεις του shard: ξαναχτίζονται μόνο αν άλλαξε η έκδοση δεδομένων, αλλιώς ενημερώνονται από την ουρά
+    του αρχείου. Μετά από νέο χτίσιμο εφαρμόζονται οι αλλαγές που καταγράφηκαν από την αρχή της
+    ανάγνωσης του df (CHANGE_LOG_SEQ_ATTR), ώστε να μη χαθεί εγγραφή που έγινε όσο διαβαζόταν το Sheet.
+    """
+    views = get_classbot_views(shard_key)
+    change_log = get_change_log()
+    with views.lock:
+        rebuilt = views.base_version != data_version
+        if rebuilt:
+            log_seq = df.attrs.get(CHANGE_LOG_SEQ_ATTR, change_log.head())
+            views.rebuild(
+                df, data_version, log_seq,
+                read_end_seq=df.attrs.get(CHANGE_LOG_READ_END_ATTR, log_seq), sheet_rows=df.attrs.get(SHEET_ROWS_ATTR),
+            )
+        views.sync(change_log)
+    if rebuilt:
+        start_cache_warmup(views)
+    return views
+
+def refresh_classbot_views(data_version, loader, args, shard_key=""):
+    """
+    Οι όψεις του shard στην έκδοση data_version. Αν είναι ήδη χτισμένες σε αυτή την έκδοση εφαρμόζεται μόνο
+    η ουρά του αρχείου αλλαγών και ο loader δεν καλείται, οπότε το Sheet δεν ξανακατεβαίνει (ακόμη κι αν
+    η cache του loader έχει αφαιρέσει το DataFrame). Αλλιώς οι όψεις ξαναχτίζονται από το loader(*args) και
+    το DataFrame αφαιρείται από την cache του loader: τις στήλες του τις κρατούν πλέον οι όψεις, δηλωμένες
+    στο όριο μνήμης χωρίς να αφαιρούνται. Επιστρέφει None αν ο loader δεν έφερε δεδομένα.
+    """
+    views = get_classbot_views(shard_key)
+    if views.base_version == data_version:
+        views.sync(get_change_log())
+        return views
+    df, _ = loader(*args)
+    if 'School' not in df.columns:
+        return None
+    views = sync_classbot_views(df, data_version, shard_key)
+    loader.release(*args)
+    return views
+
+def record_classbot_change(op, school, internal_id, row, previous=None, baseline=None, row_count=None):
+    """
+    Καταγράφει μια εγγραφή της εφαρμογής στο αρχείο αλλαγών. Η έκδοση δεδομένων του worksheet δεν
+    αλλάζει (δεν ξανακατεβαίνει τίποτα): οι όψεις εφαρμόζουν την αλλαγή από την ουρά του αρχείου.
+    baseline: η τιμή της begin_classbot_write πριν από την εγγραφή, row_count: το ws.row_count μετά τη διαγραφή.
+    """
+    get_change_log().append(
+        op, classbot_shard_key(school), internal_id, row,
+        user=st.session_state.get('logged_in_userid'), previous=previous, row_count=row_count,
+    )
+    if SHARDED_MODE:
+        get_data_version_probe().acknowledge_write(shard_route(school)[0], baseline)
+    else:
+        get_data_version_probe().acknowledge_write(SHEET_NAME, baseline)
+
+
+# --------------------------------------------------------------------------------
+# FRAGMENTS & ΚΟΣΤΟΣ ΕΠΑΝΕΚΤΕΛΕΣΗΣ
+# --------------------------------------------------------------------------------
+# Οι φόρμες, η διαχείριση καταχωρήσεων, η αναζήτηση και οι ενότητες ροής είναι st.fragment:
+# μια αλλαγή σε widget τους ξανατρέχει μόνο το fragment και όχι ολόκληρο το voithos.py.
+# Οι εγγραφές καλούν st.rerun() (εμβέλεια "app"), οπότε μετά από αυτές ανανεώνεται όλη η σελίδα.
+
+class RerunCostMeter:
+    """Χρόνος εκτέλεσης ανά εμβέλεια: ολόκληρη η σελίδα ('page') ή ένα fragment που ξανατρέχει μόνο του."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, scope, seconds):
+        with self._lock:
+            stats = self._stats.setdefault(scope, {'runs': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+            stats['runs'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['last'] = seconds
+
+    @contextmanager
+    def measure(self, scope):
+        """Μετρά το μπλοκ (μόνο όταν ολοκληρωθεί κανονικά, όχι όταν διακοπεί από st.rerun())."""
+        start = time.perf_counter()
+        yield
+        self.record(scope, time.perf_counter() - start)
+
+    def stats(self):
+        """Scope -> {'runs', 'avg_ms', 'max_ms', 'last_ms'}."""
+        with self._lock:
+            return {
+                scope: {
+                    'runs': stats['runs'],
+                    'avg_ms': 1000 * stats['total'] / stats['runs'],
+                    'max_ms': 1000 * stats['max'],
+                    'last_ms': 1000 * stats['last'],
+                }
+                for scope, stats in self._stats.items()
+            }
+
+@st.cache_resource
+def get_rerun_cost_meter():
+    """Επιστρέφει τον κοινόχρηστο μετρητή κόστους επανεκτέλεσης."""
+    return RerunCostMeter()
+
+def measured_fragment(scope):
+    """
+    Σαν το @st.fragment, αλλά μετρά και τον χρόνο κάθε επανεκτέλεσης μόνο του fragment (με το όνομα scope).
+    Όταν τρέχει ως μέρος ολόκληρης της σελίδας, ο χρόνος του περιέχεται στο 'page'.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ctx = get_script_run_ctx()
+            if ctx is None or not ctx.fragment_ids_this_run:
+                return func(*args, **kwargs)
+            with get_rerun_cost_meter().measure(scope):
+                return func(*args, **kwargs)
+        return st.fragment(wrapper)
+    return decorator
+
 
 # --------------------------------------------------------------------------------
 # 2. ΦΟΡΜΑ ΚΑΤΑΧΩΡΗΣΗΣ / AUTHENTICATION / UPDATE
 # --------------------------------------------------------------------------------
 
-def submit_entry(new_entry_list):
-    """Προσθέτει μια νέα σειρά στο Google Sheet (ClassBot)."""
+def submit_entry(new_entry_list, allow_near_duplicate=False):
+    """
+    Προσθέτει μια νέα σειρά στο Google Sheet (ClassBot). Πανομοιότυπη καταχώρηση (ίδιο exact hash
+    περιεχομένου) απορρίπτεται. Σχεδόν ίδια (ίδιο near hash) κρατείται για επιβεβαίωση από τον
+    χρήστη, εκτός αν allow_near_duplicate=True.
+    """
     if gc is None:
         st.error("Η σύνδεση με το Google Sheets απέτυχε.")
         return
 
     try:
-        sh = gc.open(SHEET_NAME)
-        ws = sh.get_worksheet(0) # Sheet ClassBot
-
-        # Προσθήκη της νέας σειράς
-        ws.append_row(new_entry_list)
+        school = new_entry_list[5]
+        exact_ids, near_ids = get_classbot_views(classbot_shard_key(school)).duplicates(*entry_content_hashes(new_entry_list))
+        if exact_ids:
+            st.error(f"⚠️ Η ίδια καταχώρηση υπάρχει ήδη (ID: {', '.join(map(str, exact_ids))}). Δεν καταχωρήθηκε ξανά.")
+            return
+        if near_ids and not allow_near_duplicate:
+            st.session_state['pending_duplicate_entry'] = (new_entry_list, near_ids)
+            st.session_state['entry_expander_state'] = True
+            return
+
+        ws = open_classbot_worksheet(school)
+        headers = get_classbot_views(classbot_shard_key(school)).headers
+        baseline = begin_classbot_write(school)
+
+        # Προσθήκη της νέας σειράς (με τη σειρά των στηλών του worksheet)
+        append_response = ws.append_row(entry_to_sheet_values(new_entry_list, headers))
+
+        # Καταγραφή στο αρχείο αλλαγών (Internal_ID = σειρά sheet - 1). Αν δεν είναι γνωστή
+        # η σειρά, γίνεται πλήρης επαναφόρτωση του ClassBot (νέα έκδοση δεδομένων).
+        new_row_number = _appended_row_number(append_response)
+        if new_row_number:
+            record_classbot_change('insert', school, new_row_number - 1, new_entry_list, baseline=baseline)
+        else:
+            invalidate_classbot_data(school, baseline=baseline)
 
         # Κλείνουμε τη φόρμα και επαναφέρουμε τον τύπο καταχώρησης
         st.session_state['entry_expander_state'] = False 
@@ -276,8 +1717,7 @@ def submit_entry(new_entry_list):
         if 'new_url_value' in st.session_state:
              st.session_state['new_url_value'] = "" # Μηδενίζουμε και το URL
 
-        # Καθαρισμός cache και επανεκτέλεση
-        st.cache_data.clear()
+        # Επανεκτέλεση (οι όψεις εφαρμόζουν την αλλαγή από το αρχείο αλλαγών)
         st.success("🎉 Η καταχώρηση έγινε επιτυχώς! Η εφαρμογή ανανεώνεται...")
         st.balloons()
         st.rerun()
@@ -286,25 +1726,48 @@ def submit_entry(new_entry_list):
         st.error(f"Σφάλμα κατά την καταχώρηση. Ελέγξτε τα δικαιώματα. Λεπτομέρειες: {e}")
 
 
-def update_entry(row_index: int, updated_list: list):
-    """Ενημερώνει μια υπάρχουσα σειρά στο Google Sheet (ClassBot) με βάση το Internal_ID."""
+CONFLICT_MESSAGE = (
+    "⚠️ Η καταχώρηση άλλαξε ή μετακινήθηκε από άλλον χρήστη μετά τη φόρτωσή της, οπότε η αλλαγή σας "
+    "δεν αποθηκεύτηκε. Η σελίδα θα ενημερωθεί σε λίγα δευτερόλεπτα: ελέγξτε την καταχώρηση και ξαναδοκιμάστε."
+)
+
+def entry_unchanged(ws, internal_id, expected_version, headers):
+    """
+    Αισιόδοξος έλεγχος ταυτοχρονισμού: διαβάζει μόνο τη σειρά της καταχώρησης (όχι όλο το Sheet)
+    και τη συγκρίνει με την έκδοση που είδε ο χρήστης. Αν στο μεταξύ κάποιος διόρθωσε, διέγραψε ή
+    μετακίνησε σειρές, η έκδοση διαφέρει. (Το Sheet δεν κλειδώνει σειρές: μένει μόνο το μικρό
+    διάστημα ανάμεσα στον έλεγχο και στην εγγραφή.) headers: η επικεφαλίδα του worksheet.
+    """
+    with quota_priority(PRIORITY_WRITE):
+        values = ws.row_values(int(internal_id) + 1)
+    return entry_version(record_from_sheet_row(entry_from_sheet_values(values, headers))) == expected_version
+
+def update_entry(row_index: int, updated_list: list, expected_version: str):
+    """Ενημερώνει μια υπάρχουσα σειρά στο Google Sheet (ClassBot) με βάση το Internal_ID, αν δεν άλλαξε στο μεταξύ."""
     if gc is None:
         st.error("Η σύνδεση με το Google Sheets απέτυχε.")
         return False
 
     try:
-        sh = gc.open(SHEET_NAME)
-        ws = sh.get_worksheet(0) # Sheet ClassBot
+        school = updated_list[5]
+        ws = open_classbot_worksheet(school)
 
         # Η gspread row index (1-based) είναι το Internal_ID + 1 (Internal_ID = Pandas index + 1)
         gspread_row_index = row_index + 1
+
+        views = get_classbot_views(classbot_shard_key(school))
+        if not entry_unchanged(ws, row_index, expected_version, views.headers):
+            st.session_state.pop('edit_delete_version', None) # η επόμενη προσπάθεια ελέγχεται με την τρέχουσα έκδοση
+            st.error(CONFLICT_MESSAGE)
+            return False
         
-        # Ενημέρωση της σειράς με τα νέα δεδομένα (χρησιμοποιείται η ws.update(cell, value))
-        # Το gspread.update(range_name, values) παίρνει μια λίστα λιστών (για μία σειρά)
-        ws.update(f'A{gspread_row_index}', [updated_list], value_input_option='USER_ENTERED') 
+        # Ενημέρωση των κελιών της σειράς με τα νέα δεδομένα (ένα αίτημα batch_update, βλ. entry_cell_updates)
+        previous = views.sheet_row(row_index)
+        baseline = begin_classbot_write(school)
+        ws.batch_update(entry_cell_updates(gspread_row_index, updated_list, views.headers), value_input_option='USER_ENTERED')
+        record_classbot_change('update', school, row_index, updated_list, previous=previous, baseline=baseline)
 
-        # Καθαρισμός cache και επανεκτέλεση
-        st.cache_data.clear() 
+        # Επανεκτέλεση (οι όψεις εφαρμόζουν την αλλαγή από το αρχείο αλλαγών)
         st.success("✅ Η διόρθωση έγινε επιτυχώς! Η εφαρμογή ανανεώθηκε.")
         st.rerun() 
         return True
@@ -314,6 +1777,7 @@ def update_entry(row_index: int, updated_list: list):
         return False
 # -----------------------------------------------------------------------------
 
+@measured_fragment("entry_form")
 def data_entry_form(available_schools, logged_in_school, logged_in_userid):
     """Δημιουργεί τη φόρμα εισαγωγής νέων δεδομένων. (Το σχολείο είναι προ-επιλεγμένο)"""
     
@@ -359,7 +1823,7 @@ def data_entry_form(available_schools, logged_in_school, logged_in_userid):
             
         st.session_state.entry_type = st.radio(
             "Τύπος Καταχώρησης", 
-            ('Text', 'Link'), 
+            ENTRY_TYPES, 
             horizontal=True,
             index=0 if st.session_state['entry_type'] == 'Text' else 1,
             key="radio_type_key"
@@ -428,9 +1892,7 @@ def data_entry_form(available_schools, logged_in_school, logged_in_userid):
                         final_url = 'https://' + final_url
                 
                 # ΕΛΕΓΧΟΣ ΕΓΚΥΡΟΤΗΤΑΤΟΣ ΤΜΗΜΑΤΟΣ (αν δεν έγινε επιλογή)
-                tmima_pattern = re.compile(r'^[Α-Ω0-9]+$')
-
-                if not tmima_pattern.match(final_tmima) or final_tmima == "":
+                if not TMIMA_PATTERN.match(final_tmima) or final_tmima == "":
                     st.error("⚠️ Σφάλμα Τμήματος: Το πεδίο 'Τμήμα' είναι κενό ή περιέχει μη επιτρεπτούς χαρακτήρες. Χρησιμοποιήστε μόνο Ελληνικούς κεφαλαίους (Α-Ω) και αριθμούς (0-9).")
                     st.stop()
                 
@@ -459,9 +1921,27 @@ def data_entry_form(available_schools, logged_in_school, logged_in_userid):
                     ]
                     submit_entry(new_entry_list)
 
-def edit_entry_form(entry_data: pd.Series, logged_in_school: str):
+        # Σχεδόν ίδια καταχώρηση με υπάρχουσα: ο χρήστης επιβεβαιώνει ή ακυρώνει
+        pending = st.session_state.get('pending_duplicate_entry')
+        if pending:
+            pending_entry, near_ids = pending
+            st.warning(
+                f"⚠️ Υπάρχει ήδη παρόμοια καταχώρηση στο {pending_entry[6]} (ID: {', '.join(map(str, near_ids))}) "
+                f"με φράση-κλειδί '{pending_entry[0]}'. Θέλετε να καταχωρηθεί και αυτή;"
+            )
+            col_confirm, col_cancel = st.columns(2)
+            if col_confirm.button("✅ Καταχώρηση παρ' όλα αυτά", key="confirm_duplicate_entry"):
+                del st.session_state['pending_duplicate_entry']
+                submit_entry(pending_entry, allow_near_duplicate=True)
+            col_cancel.button(
+                "✖ Ακύρωση", key="cancel_duplicate_entry",
+                on_click=lambda: st.session_state.pop('pending_duplicate_entry', None)
+            )
+
+def edit_entry_form(entry_data: pd.Series, logged_in_school: str, expected_version: str):
     """
-    Δημιουργεί τη φόρμα επεξεργασίας για μια συγκεκριμένη καταχώρηση.
+    Δημιουργεί τη φόρμα επεξεργασίας για μια συγκεκριμένη καταχώρηση. expected_version: η έκδοση της
+    καταχώρησης όταν την επέλεξε ο χρήστης (βλ. manage_user_posts).
     """
     current_keyword = entry_data['Keyword']
     current_info = entry_data['Info']
@@ -491,7 +1971,7 @@ def edit_entry_form(entry_data: pd.Series, logged_in_school: str):
     # Radio Button για την επιλογή Τύπου (Text/Link)
     st.session_state[f'edit_entry_type_{internal_id}'] = st.radio(
         "Τύπος Καταχώρησης", 
-        ('Text', 'Link'), 
+        ENTRY_TYPES, 
         index=0 if current_type == 'Text' else 1,
         horizontal=True,
         key=f"edit_radio_type_{internal_id}"
@@ -612,8 +2092,7 @@ def edit_entry_form(entry_data: pd.Series, logged_in_school: str):
                     final_edited_url = 'https://' + final_edited_url
 
             # Έλεγχος εγκυρότητας Τμήματος
-            tmima_pattern = re.compile(r'^[Α-Ω0-9]+$')
-            if not tmima_pattern.match(final_edited_tmima_cleaned) or final_edited_tmima_cleaned == "":
+            if not TMIMA_PATTERN.match(final_edited_tmima_cleaned) or final_edited_tmima_cleaned == "":
                 st.error("⚠️ Σφάλμα Τμήματος: Το πεδίο 'Τμήμα' είναι κενό ή περιέχει μη επιτρεπτούς χαρακτήρες. Χρησιμοποιήστε μόνο Ελληνικούς κεφαλαίους (Α-Ω) και αριθμούς (0-9).")
                 st.stop()
             
@@ -642,7 +2121,7 @@ def edit_entry_form(entry_data: pd.Series, logged_in_school: str):
                 ]
                 
                 # Καλείται η συνάρτηση update_entry
-                update_entry(internal_id, updated_entry_list)
+                update_entry(internal_id, updated_entry_list, expected_version=expected_version)
 
 
 def teacher_login(df_users):
@@ -664,7 +2143,6 @@ def teacher_login(df_users):
             st.session_state.logged_in_userid = None
             # Κλείνουμε το expander κατά την αποσύνδεση
             st.session_state['entry_expander_state'] = False 
-            st.cache_data.clear()
             st.rerun()
         return True
 
@@ -698,37 +2176,25 @@ def teacher_login(df_users):
 
     return st.session_state.authenticated
 
-def manage_user_posts(df, logged_in_userid):
+@measured_fragment("manage_posts")
+def manage_user_posts(views, logged_in_userid):
     """Εμφανίζει και επιτρέπει τη διαχείριση (διόρθωση/διαγραφή) των καταχωρήσεων του χρήστη."""
     
-    # Χρησιμοποιούμε τη στήλη 'UserId' για το φιλτράρισμα
-    # Το df.get('UserId', '') διασφαλίζει ότι υπάρχει η στήλη.
-    user_posts = df[df.get('UserId', '').astype(str).str.strip() == logged_in_userid].copy()
+    # Το ευρετήριο UserId -> καταχωρήσεις χτίζεται μαζί με τις όψεις (ClassBotViews),
+    # οπότε εδώ το κόστος είναι ανάλογο των καταχωρήσεων του χρήστη και όχι του πλήρους DataFrame.
     logged_in_school = st.session_state.get('logged_in_school') # Χρειαζόμαστε το σχολείο για το edit form
+    user_posts = get_user_posts_index(classbot_shard_key(logged_in_school)).get(logged_in_userid)
     
-    if user_posts.empty:
+    if not user_posts:
         st.info(f"Δεν βρέθηκαν καταχωρήσεις για τον δικό σας χρήστη (UserId: {logged_in_userid}).")
         return
 
     st.header("✏️ Διαχείριση Καταχώρησης")
     st.info(f"Εμφανίζονται οι **{len(user_posts)}** καταχωρήσεις σας. Μπορείτε να τις επεξεργαστείτε ή να τις διαγράψετε.")
     
-    user_posts = user_posts.sort_values(by='Date', ascending=False)
-    
-    # Δημιουργία λίστας για την επιλογή επεξεργασίας/διαγραφής
-    post_options = ["-- Επιλέξτε Καταχώρηση --"]
-    post_details_map = {} # Για να αποθηκεύσουμε τις λεπτομέρειες κάθε post (Pandas Series)
-    for index, row in user_posts.iterrows():
-        date_str = row['Date'].strftime(DATE_FORMAT)
-        tmima = row['Tmima']
-        keyword = row['Keyword']
-        # Εμφάνιση ειδοποίησης αν είναι στο ημερολόγιο
-        calendar_status = " [📅]" if pd.notna(row.get('ActionDate')) else ""
-        
-        info_preview = row['Info'][:70] + "..." if len(row['Info']) > 70 else row['Info']
-        option_label = f"[{date_str} - {tmima}]{calendar_status} {keyword} - {info_preview} (ID: {row['Internal_ID']})"
-        post_options.append(option_label)
-        post_details_map[option_label] = row # Αποθηκεύουμε ολόκληρη τη σειρά (DataFrame row)
+    # Δημιουργία λίστας για την επιλογή επεξεργασίας/διαγραφής (οι ετικέτες είναι έτοιμες από το ευρετήριο)
+    post_options = ["-- Επιλέξτε Καταχώρηση --"] + [label for label, _ in user_posts]
+    post_ids_map = dict(user_posts) # Ετικέτα -> Internal_ID
 
     # ----------------------------------------------------------------------
     # Επιλογή Καταχώρησης για Επεξεργασία/Διαγραφή
@@ -740,7 +2206,18 @@ def manage_user_posts(df, logged_in_userid):
     )
 
     if selected_post_str != "-- Επιλέξτε Καταχώρηση --":
-        selected_post_row = post_details_map[selected_post_str]
+        selected_post_row = views.row(post_ids_map[selected_post_str])
+        if selected_post_row is None:
+            st.warning("Η καταχώρηση ενημερώνεται. Παρακαλώ δοκιμάστε ξανά σε λίγο.")
+            return
+
+        # Η έκδοση που είδε ο χρήστης κρατείται από τη στιγμή της επιλογής: οι όψεις ενημερώνονται σε κάθε
+        # εκτέλεση, οπότε μια αλλαγή άλλου χρήστη ανάμεσα στην επιλογή και στην υποβολή θα περνούσε απαρατήρητη
+        selected_version = st.session_state.get('edit_delete_version')
+        if selected_version is None or selected_version[0] != selected_post_str:
+            selected_version = (selected_post_str, selected_post_row['Version'])
+            st.session_state['edit_delete_version'] = selected_version
+        expected_version = selected_version[1]
         
         # ----------------------------------------------------------------------
         # Φόρμα Επεξεργασίας (Edit Form)
@@ -749,7 +2226,7 @@ def manage_user_posts(df, logged_in_userid):
             st.markdown("### Επεξεργασία Υπάρχουσας Πληροφορίας")
             
             # Καλεί τη νέα συνάρτηση για τη φόρμα επεξεργασίας
-            edit_entry_form(selected_post_row, logged_in_school)
+            edit_entry_form(selected_post_row, logged_in_school, expected_version)
 
         st.markdown("---") # Οπτικός διαχωρισμός
         
@@ -767,11 +2244,19 @@ def manage_user_posts(df, logged_in_userid):
                 gspread_row_index = int(selected_post_row['Internal_ID']) + 1 
 
                 try:
-                    sh = gc.open(SHEET_NAME)
-                    ws = sh.get_worksheet(0)
+                    ws = open_classbot_worksheet(logged_in_school)
+                    if not entry_unchanged(ws, selected_post_row['Internal_ID'], expected_version, views.headers):
+                        st.session_state.pop('edit_delete_version', None)
+                        st.error(CONFLICT_MESSAGE)
+                        st.stop()
+                    baseline = begin_classbot_write(logged_in_school)
                     ws.delete_rows(gspread_row_index)
+                    record_classbot_change(
+                        'delete', logged_in_school, selected_post_row['Internal_ID'], None,
+                        previous=views.sheet_row(selected_post_row['Internal_ID']), baseline=baseline,
+                        row_count=ws.row_count, # η gspread το μειώνει τοπικά με τη delete_rows
+                    )
                     
-                    st.cache_data.clear()
                     st.success(f"🗑️ Η καταχώρηση (ID: {selected_post_row['Internal_ID']}) διαγράφηκε επιτυχώς.")
                     st.rerun()
 
@@ -782,329 +2267,868 @@ def manage_user_posts(df, logged_in_userid):
 
 
 # --------------------------------------------------------------------------------
-# 3. UI / ΚΥΡΙΑ ΛΟΓΙΚΗ
+# 3. ΕΝΟΤΗΤΕΣ ΡΟΗΣ (ΠΡΟΣΦΑΤΕΣ / ΠΡΟΣΕΧΕΙΣ) & ΚΑΡΤΕΣ
 # --------------------------------------------------------------------------------
+# Κοινοί κανόνες για τη σελίδα και για το offline digest (digest.py).
+
+RECENT_DAYS = 2
+UPCOMING_DAYS = 30
+RENDER_CACHE_MAX_ENTRIES = 2000
+
+def select_recent_posts(df, today):
+    """Καταχωρήσεις των τελευταίων RECENT_DAYS ημερών, νεότερες πρώτα."""
+    recent_posts = df[df['Date'].dt.date >= today - timedelta(days=RECENT_DAYS)]
+    return recent_posts.sort_values(by='Date', ascending=False)
+
+def select_upcoming_posts(df, today):
+    """Καταχωρήσεις με ActionDate από σήμερα έως UPCOMING_DAYS ημέρες, με στήλη 'Action_Date_Only' για ομαδοποίηση."""
+    future_limit = today + timedelta(days=UPCOMING_DAYS)
+
+    # Φιλτράρουμε πρώτα τις έγκυρες ActionDate για να αποφύγουμε TypeError στη σύγκριση
+    valid_action_dates = df[pd.notna(df['ActionDate'])]
+    future_posts = valid_action_dates[
+        (valid_action_dates['ActionDate'].dt.date >= today) & 
+        (valid_action_dates['ActionDate'].dt.date <= future_limit)
+    ].copy()
+
+    future_posts['Action_Date_Only'] = future_posts['ActionDate'].dt.date
+    return future_posts.sort_values(by='ActionDate', ascending=True)
+
+def days_remaining_message(date_only, today):
+    """Μήνυμα έμφασης για τις ημέρες που απομένουν μέχρι μια ενέργεια."""
+    days_remaining = (date_only - today).days
+    if days_remaining == 0:
+        return "**ΣΗΜΕΡΑ!**"
+    elif days_remaining == 1:
+        return "**ΑΥΡΙΟ!**"
+    elif days_remaining > 1:
+        return f"Σε **{days_remaining}** ημέρες"
+    return ""
+
+LINK_STATUS_LABELS = {
+    LINK_STATUS_DEAD: "❌ Ο σύνδεσμος δεν είναι πλέον διαθέσιμος.",
+    LINK_STATUS_RESTRICTED: "🔒 Ο σύνδεσμος απαιτεί πρόσβαση (δεν είναι κοινόχρηστος).",
+    LINK_STATUS_UNREACHABLE: "⚠️ Ο σύνδεσμος δεν απαντά αυτή τη στιγμή.",
+}
+
+def render_link_preview_lines(link_meta):
+    """Γραμμές HTML με τον τίτλο/favicon της σελίδας ή την κατάσταση ενός συνδέσμου που δεν λειτουργεί."""
+    if link_meta['status'] != LINK_STATUS_OK:
+        return [f'<div class="card-link-status">{LINK_STATUS_LABELS[link_meta["status"]]}</div>']
+    if not link_meta['title']:
+        return []
+    icon = f"<img src='{html.escape(link_meta['favicon'], quote=True)}' width='16' height='16'>" if link_meta['favicon'] else ""
+    return [f'<div class="card-link-preview">{icon}{html.escape(link_meta["title"])}</div>']
 
-st.set_page_config(page_title="Βοηθός Τάξης", layout="centered")
+def render_card_html(item_type, info, url, keyword, date_str=None, link_meta=None, tmima=None):
+    """
+    Δημιουργεί το HTML μιας κάρτας καταχώρησης (date_str=None: χωρίς ημερομηνία στην κάρτα).
+    link_meta: τα μεταδεδομένα του συνδέσμου από την cache του link_preview, αν υπάρχουν.
+    tmima: ετικέτα τμήματος (για τη ροή όλου του σχολείου, όπου οι κάρτες είναι από πολλά τμήματα).
+    """
+    item_type_clean = str(item_type).strip().lower()
+    css_class = 'info-card'
+
+    if item_type_clean == 'link':
+        css_class += ' info-card-link'
+        link_description = info.strip()
+        link_url = url.strip()
+        if link_url:
+            # Καθαρό HTML <a> tag με quote_plus
+            safe_url = quote_plus(link_url, safe=':/')
+            content = f"🔗 <strong>Σύνδεσμος:</strong> <a href='{safe_url}' target='_blank' style='color: #1A5276; text-decoration: none;'>{link_description}</a>"
+        else:
+            content = f"⚠️ <strong>Προσοχή:</strong> Καταχώρηση συνδέσμου χωρίς URL. Περιγραφή: {link_description}"
+    elif item_type_clean == 'text':
+        css_class += ' info-card-text'
+        content = f"💬 <strong>Περιγραφή:</strong> {info}"
+    else:
+        content = f"Άγνωστος Τύπος Καταχώρησης. {info}"
+
+    # Χωρίς εσοχές και κενές γραμμές: οι κάρτες συνενώνονται σε ένα markdown (βλ. render_*_section)
+    lines = [f'<div class="{css_class}">']
+    if tmima:
+        lines.append(f'<span class="card-class">🏫 {tmima}</span>')
+    if date_str:
+        lines.append(f'<span class="card-date">🗓️ {date_str}</span>')
+    lines.append(content)
+    if link_meta and item_type_clean == 'link' and url.strip():
+        lines += render_link_preview_lines(link_meta)
+    lines += [f'<div class="card-keyword">🔑 Keyword: {keyword}</div>', '</div>']
+    return "\n".join(lines)
+
+def render_recent_section(class_df, today, link_previews=None):
+    """Έτοιμο HTML των καρτών 'Πρόσφατες Ανακοινώσεις' ενός τμήματος ('' αν δεν υπάρχουν). link_previews: URL -> μεταδεδομένα."""
+    link_previews = link_previews or {}
+    recent_posts = select_recent_posts(class_df, today)
+    cards = [
+        render_card_html(item_type, info, url, keyword, date_obj.strftime(DATE_FORMAT), link_meta=link_previews.get(url))
+        for item_type, info, url, keyword, date_obj in zip(recent_posts['Type'], recent_posts['Info'], recent_posts['URL'], recent_posts['Keyword'], recent_posts['Date'])
+    ]
+    return "\n\n".join(cards)
+
+def render_upcoming_section(class_df, today, link_previews=None):
+    """Έτοιμο markdown/HTML της ενότητας 'Προσεχείς Ενέργειες' (επικεφαλίδα ανά ημέρα + κάρτες, '' αν δεν υπάρχουν)."""
+    link_previews = link_previews or {}
+    future_posts = select_upcoming_posts(class_df, today)
+    blocks = []
+    for date_only, group in future_posts.groupby('Action_Date_Only'):
+        # Επικεφαλίδα Ημέρας και οπτικός διαχωρισμός
+        blocks.append(f"### 🗓️ {date_only.strftime(DATE_FORMAT)} - {days_remaining_message(date_only, today)}")
+        blocks.append('<div style="margin-bottom: 10px; border-bottom: 1px dashed #D6EAF8;"></div>')
+        # Κάρτες χωρίς ημερομηνία (είναι στην επικεφαλίδα)
+        blocks += [
+            render_card_html(item_type, info, url, keyword, link_meta=link_previews.get(url))
+            for item_type, info, url, keyword in zip(group['Type'], group['Info'], group['URL'], group['Keyword'])
+        ]
+    return "\n\n".join(blocks)
 
-# Εφαρμογή του Custom CSS
-apply_custom_css()
+@st.cache_resource
+def get_rendered_section_cache():
+    """
+    Κοινόχρηστη LRU cache με το έτοιμο HTML των ενοτήτων ροής για τους επισκέπτες. Κλειδί: (School,
+    Tmima, έκδοση δεδομένων τμήματος, ημέρα, αποτύπωμα συνδέσμων τμήματος, ενότητα). Κάθε κλειδί υπολογίζεται
+    μία φορά, ακόμη και αν το ζητήσουν ταυτόχρονα πολλές συνεδρίες.
+    """
+    return get_memory_budget().cache("sections", max_entries=RENDER_CACHE_MAX_ENTRIES)
 
-# ΟΡΙΣΤΕ ΤΗΝ RAW URL ΓΙΑ ΤΟ ΛΟΓΟΤΥΠΟ
-RAW_IMAGE_URL = "https://raw.githubusercontent.com/nikosn937/bot/main/ClassBot.gif"
+def feed_sections_html(views, school, tmima, today, section_cache=None, link_fetcher=None):
+    """
+    (HTML 'Πρόσφατες Ανακοινώσεις', HTML 'Προσεχείς Ενέργειες') του τμήματος. Είναι κοινά για όλους τους
+    επισκέπτες: υπολογίζονται μία φορά ανά (School, Tmima, έκδοση δεδομένων τμήματος, ημέρα).
+    section_cache/link_fetcher: οι caches για κλήσεις εκτός συνεδρίας (αλλιώς οι κοινόχρηστες της διεργασίας).
+    """
+    class_df = views.class_frame(school, tmima)
+    if section_cache is None:
+        section_cache = get_rendered_section_cache()
+    # Τα μεταδεδομένα συνδέσμων έρχονται από την cache του link_preview. Στο κλειδί μπαίνει μόνο το
+    # αποτύπωμα των συνδέσμων του τμήματος, ώστε ένας σύνδεσμος άλλου τμήματος να μην ακυρώνει τις ενότητες
+    link_previews = link_previews_for(class_df, link_fetcher)
+    class_key = (school, tmima, views.class_version(school, tmima), today, link_previews_signature(link_previews))
+    recent_html = section_cache.get_or_compute(class_key + ('recent',), lambda: render_recent_section(class_df, today, link_previews))
+    upcoming_html = section_cache.get_or_compute(class_key + ('upcoming',), lambda: render_upcoming_section(class_df, today, link_previews))
+    return recent_html, upcoming_html
 
-# Δημιουργία δύο στηλών: η πρώτη (1/5) για το λογότυπο, η δεύτερη (4/5) για τον τίτλο
-col1, col2 = st.columns([1, 4])
 
-with col1:
-    st.image(RAW_IMAGE_URL, width=150)
+# --------------------------------------------------------------------------------
+# ΑΝΑΖΗΤΗΣΗ: CACHE ΑΠΟΤΕΛΕΣΜΑΤΩΝ & ΠΡΟΤΑΣΕΙΣ
+# --------------------------------------------------------------------------------
 
-with col2:
-    st.markdown("<h2 class='main-header'>Ψηφιακός Βοηθός Τάξης</h2>", unsafe_allow_html=True)
-    st.caption("Steam Project")
+QUERY_CACHE_MAX_ENTRIES = 5000
+SEARCH_SUGGESTIONS_POPULAR = 10
 
-st.markdown("---") 
+class QueryResultCache:
+    """
+    Κοινόχρηστη LRU cache αποτελεσμάτων αναζήτησης. Κλειδί: (School, Tmima, ομαλοποιημένη
+    φράση, έκδοση δεδομένων τμήματος). Μετρά και πόσες φορές ζητήθηκε κάθε φράση, για τις
+    προτάσεις "δημοφιλών αναζητήσεων" του τμήματος. Οι μετρητές κρατούνται χωριστά από τις
+    αποθηκευμένες τιμές (που δεν τροποποιούνται) και ενημερώνονται μία φορά ανά αίτημα.
+    """
 
-# Φόρτωση όλων των δεδομένων και των διαθέσιμων επιλογών
-full_df, available_schools = load_data()
-df_users = load_users_data() # Φόρτωση δεδομένων χρηστών
+    def __init__(self, cache):
+        self._lock = threading.Lock()
+        self._cache = cache # κλειδί -> αποτελέσματα (BudgetedCache, με τα δικά της hits/misses)
+        self._requests = {} # κλειδί -> πλήθος αιτημάτων
+
+    def get_or_compute(self, key, compute):
+        # Ο υπολογισμός είναι φθηνός (χάρτες στη μνήμη)
+        results = self._cache.get_or_compute(key, compute)
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if len(self._requests) > 2 * QUERY_CACHE_MAX_ENTRIES:
+                # Ξεχνά τους μετρητές των φράσεων που έχουν αφαιρεθεί από την cache
+                cached = {cached_key for cached_key, _ in self._cache.items()}
+                self._requests = {k: count for k, count in self._requests.items() if k in cached}
+        return results
+
+    def popular_queries(self, school, tmima, class_version, limit):
+        """Οι συχνότερες φράσεις του τμήματος (της τρέχουσας έκδοσης) που έδωσαν αποτελέσματα."""
+        with self._lock:
+            requests = dict(self._requests)
+        counts = [
+            (requests.get(key, 0), key[2]) for key, results in self._cache.items()
+            if key[0] == school and key[1] == tmima and key[3] == class_version and results
+        ]
+        return [query for _, query in sorted(counts, key=lambda item: (-item[0], item[1]))[:limit]]
+
+    def stats(self):
+        return self._cache.stats()
 
-# ΕΝΣΩΜΑΤΩΣΗ ΦΟΡΜΑΣ ΣΥΝΔΕΣΗΣ ΣΤΗΝ ΠΛΕΥΡΙΚΗ ΣΤΗΛΗ
-is_authenticated = teacher_login(df_users)
-st.markdown("---")
+@st.cache_resource
+def get_query_result_cache():
+    """Επιστρέφει την κοινόχρηστη cache αποτελεσμάτων αναζήτησης."""
+    return QueryResultCache(get_memory_budget().cache("queries", max_entries=QUERY_CACHE_MAX_ENTRIES))
+
+def find_search_results(tag_to_keyword_map, keyword_to_data_map, search_tag):
+    """Αποτελέσματα μιας αναζήτησης ως (Date, Info, URL, Type, School, Tmima, Keyword), τα νεότερα πρώτα."""
+    results = []
+    for keyword in tag_to_keyword_map.get(search_tag, ()):
+        # Κάθε στοιχείο έχει 9 πεδία: (Info, URL, Type, Date, School, Tmima, UserId, ActionDate, Internal_ID)
+        for info, url, item_type, date_obj, school, tmima, _, _, _ in keyword_to_data_map.get(keyword, []):
+            results.append((date_obj, info, url, item_type, school, tmima, keyword))
+    results.sort(key=lambda x: x[0], reverse=True)
+    return tuple(results)
+
+def search_class_results(views, school, tmima, search_tag, query_cache=None):
+    """Αποτελέσματα αναζήτησης σε ένα τμήμα, από την cache όταν η φράση έχει ξαναζητηθεί στην ίδια έκδοση."""
+    key = (school, tmima, search_tag, views.class_version(school, tmima))
+    if query_cache is None:
+        query_cache = get_query_result_cache()
+    return query_cache.get_or_compute(
+        key, lambda: find_search_results(*views.search_maps(school, tmima), search_tag)
+    )
 
+def search_suggestions(views, school, tmima):
+    """Προτάσεις για το πεδίο αναζήτησης: πρώτα οι δημοφιλείς αναζητήσεις του τμήματος, μετά όλα τα tags."""
+    popular = get_query_result_cache().popular_queries(
+        school, tmima, views.class_version(school, tmima), SEARCH_SUGGESTIONS_POPULAR
+    )
+    tags = sorted(views.search_maps(school, tmima)[0])
+    return list(dict.fromkeys(popular + tags))
 
-# 1. ΕΠΙΛΟΓΗ ΣΧΟΛΕΙΟΥ
-logged_in_school_val = st.session_state.get('logged_in_school')
-default_index = 0
-if logged_in_school_val and logged_in_school_val in available_schools:
-    # Εύρεση της index για την αυτόματη επιλογή
-    try:
-        default_index = available_schools.index(logged_in_school_val) + 1
-    except ValueError:
-        default_index = 0
-
-selected_school = st.selectbox(
-    "Επιλέξτε Σχολείο:",
-    options=["-- Επιλέξτε --"] + available_schools,
-    index=default_index, # Χρησιμοποιούμε την default_index
-    key="school_selector"
-)
+@st.cache_resource
+def get_link_preview_fetcher():
+    """Επιστρέφει τον κοινόχρηστο fetcher μεταδεδομένων συνδέσμων (με τη μόνιμη cache του)."""
+    return LinkMetadataFetcher(LinkPreviewCache(LINK_PREVIEW_CACHE_PATH))
+
+def link_previews_for(df, fetcher=None):
+    """
+    URL -> μεταδεδομένα για τις καταχωρήσεις Link του df, μόνο από την cache: όσα λείπουν ή έληξαν
+    ζητούνται στο παρασκήνιο και εμφανίζονται σε επόμενη εκτέλεση. Η σελίδα δεν περιμένει ποτέ το δίκτυο.
+    """
+    if not LINK_PREVIEWS_ENABLED or df.empty:
+        return {}
+    urls = df.loc[df['Type'].str.lower() == 'link', 'URL']
+    if fetcher is None:
+        fetcher = get_link_preview_fetcher()
+    return fetcher.previews([url for url in urls.str.strip().unique() if url])
+
+def link_previews_for_records(records):
+    """Όπως το link_previews_for, για εγγραφές των όψεων (πλειάδες με τη σειρά του CLASSBOT_REQUIRED_COLS)."""
+    if not LINK_PREVIEWS_ENABLED:
+        return {}
+    urls = [record[2] for record in records if record[3].lower() == 'link' and record[2]]
+    return get_link_preview_fetcher().previews(list(dict.fromkeys(urls))) if urls else {}
+
+def link_previews_signature(link_previews):
+    """Αποτύπωμα των ορατών πεδίων (κατάσταση, τίτλος, favicon) ενός χάρτη URL -> μεταδεδομένα, για τα κλειδιά των caches HTML."""
+    visible = sorted(
+        [url] + [meta.get(field) for field in LinkPreviewCache.VISIBLE_FIELDS] for url, meta in link_previews.items()
+    )
+    return hashlib.sha1(json.dumps(visible, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+# --------------------------------------------------------------------------------
+# ΡΟΗ ΟΛΟΥ ΤΟΥ ΣΧΟΛΕΙΟΥ (ΣΥΓΧΩΝΕΥΣΗ ΤΜΗΜΑΤΩΝ)
+# --------------------------------------------------------------------------------
 
-# 2. ΦΙΛΤΡΑΡΙΣΜΑ DF ανά ΣΧΟΛΕΙΟ
-if selected_school and selected_school != "-- Επιλέξτε --" and not full_df.empty:
+SCHOOL_FEED_PAGE_SIZE = 20
+SCHOOL_FEED_RECENT = 'recent'
+SCHOOL_FEED_UPCOMING = 'upcoming'
 
-    logged_in_school = st.session_state.get('logged_in_school')
-    logged_in_userid = st.session_state.get('logged_in_userid') 
+def merged_school_feed(views, school, tmimata, kind, today):
+    """
+    Ενιαίο χρονολόγιο των τμημάτων tmimata ως iterator από (ημερομηνία, Internal_ID, εγγραφή).
+    Συγχωνεύει (k-way merge, heapq.merge) τις ήδη ταξινομημένες λίστες κάθε τμήματος από τις όψεις,
+    χωρίς φιλτράρισμα ή ταξινόμηση του DataFrame του σχολείου:
+    SCHOOL_FEED_RECENT: όλες οι καταχωρήσεις, οι νεότερες πρώτα.
+    SCHOOL_FEED_UPCOMING: οι ενέργειες από σήμερα έως UPCOMING_DAYS ημέρες, οι πλησιέστερες πρώτα.
+    """
+    if kind == SCHOOL_FEED_RECENT:
+        return heapq.merge(*(views.class_timeline(school, tmima) for tmima in tmimata), reverse=True)
+    start = (pd.Timestamp(today),)
+    end = (pd.Timestamp(today + timedelta(days=UPCOMING_DAYS + 1)),)
+    ranges = []
+    for tmima in tmimata:
+        actions = views.class_actions(school, tmima)
+        # bisect στη λίστα του τμήματος: μόνο το διάστημα [σήμερα, σήμερα + UPCOMING_DAYS]
+        ranges.append(islice(actions, bisect.bisect_left(actions, start), bisect.bisect_left(actions, end)))
+    return heapq.merge(*ranges)
+
+def school_feed_page(views, school, tmimata, kind, today, page, page_size=SCHOOL_FEED_PAGE_SIZE):
+    """Μία σελίδα του ενιαίου χρονολογίου: (καταχωρήσεις, υπάρχει επόμενη σελίδα)."""
+    merged = merged_school_feed(views, school, tmimata, kind, today)
+    items = list(islice(merged, page * page_size, (page + 1) * page_size + 1))
+    return items[:page_size], len(items) > page_size
+
+def render_school_feed_page(items, kind, today):
+    """HTML μιας σελίδας του ενιαίου χρονολογίου: κάρτες με ετικέτα τμήματος (και επικεφαλίδα ανά ημέρα για τις ενέργειες)."""
+    link_previews = link_previews_for_records([record for _, _, record in items])
+    blocks = []
+    current_day = None
+    for date_obj, _, record in items:
+        keyword, info, url, item_type, _, _, tmima = record[:7]
+        if kind == SCHOOL_FEED_RECENT:
+            blocks.append(render_card_html(item_type, info, url, keyword, date_obj.strftime(DATE_FORMAT), link_meta=link_previews.get(url), tmima=tmima))
+            continue
+        date_only = date_obj.date()
+        if date_only != current_day:
+            current_day = date_only
+            blocks.append(f"### 🗓️ {date_only.strftime(DATE_FORMAT)} - {days_remaining_message(date_only, today)}")
+            blocks.append('<div style="margin-bottom: 10px; border-bottom: 1px dashed #D6EAF8;"></div>')
+        blocks.append(render_card_html(item_type, info, url, keyword, link_meta=link_previews.get(url), tmima=tmima))
+    return "\n\n".join(blocks)
 
-    # --------------------------------------------------------------------------
-    # ΕΛΕΓΧΟΣ ΠΡΟΣΒΑΣΗΣ ΦΟΡΜΑΣ ΚΑΤΑΧΩΡΗΣΗΣ / ΔΙΑΧΕΙΡΙΣΗΣ
-    # --------------------------------------------------------------------------
-    if is_authenticated and logged_in_school == selected_school:
-        # 1. Εμφάνιση Φόρμας Καταχώρησης
-        data_entry_form(available_schools, logged_in_school, logged_in_userid)
+
+# --------------------------------------------------------------------------------
+# ΣΤΑΤΙΣΤΙΚΑ ΧΡΗΣΗΣ & ΠΡΟΘΕΡΜΑΝΣΗ CACHES
+# --------------------------------------------------------------------------------
+# Μετρητές στη μνήμη (χωρίς στοιχεία χρηστών) για τις αναζητήσεις και τις επιλογές τμημάτων,
+# που γράφονται περιοδικά σε τοπικό αρχείο JSON. Μετά από κάθε νέα φόρτωση δεδομένων, τα
+# δημοφιλέστερα τμήματα προθερμαίνονται στο παρασκήνιο, ώστε οι πρώτοι επισκέπτες να βρίσκουν
+# έτοιμες τις όψεις, τις ενότητες ροής και τα αποτελέσματα των συχνών αναζητήσεων.
+
+ANALYTICS_MAX_TERMS = 5000 # Όριο φράσεων ανά μετρητή (κρατούνται οι συχνότερες)
+ANALYTICS_MAX_TERM_LENGTH = 100
+
+class QueryAnalytics:
+    """
+    Συγκεντρωτικοί μετρητές χρήσης: αναζητήσεις ανά ομαλοποιημένη φράση (συνολικά και ανά τμήμα),
+    αναζητήσεις χωρίς αποτέλεσμα και επιλογές (School, Tmima). Η καταγραφή είναι μια αύξηση
+    μετρητή υπό κλείδωμα. Το αρχείο γράφεται το πολύ κάθε flush_interval δευτερόλεπτα.
+    """
+
+    def __init__(self, path, flush_interval=60, max_terms=ANALYTICS_MAX_TERMS):
+        self._lock = threading.Lock()
+        self._path = path
+        self._flush_interval = flush_interval
+        self._max_terms = max_terms
+        self._terms = {}
+        self._zero_results = {}
+        self._classes = {}      # (School, Tmima) -> επιλογές
+        self._class_terms = {}  # (School, Tmima) -> {φράση: αναζητήσεις}
+        self._dirty = False
+        self._flushed_at = time.time()
+        self.warmups = []       # Οι τελευταίες προθερμάνσεις (για τα στατιστικά)
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._load(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError):
+                pass # Κατεστραμμένο αρχείο: οι μετρητές ξεκινούν από την αρχή
+
+    def _load(self, data):
+        self._terms = dict(data['terms'])
+        self._zero_results = dict(data['zero_results'])
+        for item in data['classes']:
+            key = (item['school'], item['tmima'])
+            self._classes[key] = item['selections']
+            self._class_terms[key] = dict(item['terms'])
+
+    def _bump(self, counter, term):
+        counter[term] = counter.get(term, 0) + 1
+        if len(counter) > self._max_terms:
+            # Κρατούνται οι συχνότερες φράσεις (πρακτικά όριο μνήμης για αυθαίρετες αναζητήσεις)
+            keep = sorted(counter.items(), key=lambda item: -item[1])[:self._max_terms * 3 // 4]
+            counter.clear()
+            counter.update(keep)
+
+    def record_class(self, school, tmima):
+        """Μια συνεδρία επέλεξε το τμήμα."""
+        with self._lock:
+            key = (school, tmima)
+            self._classes[key] = self._classes.get(key, 0) + 1
+            self._dirty = True
+        self._flush_if_due()
+
+    def record_search(self, school, tmima, term, result_count):
+        """Μια αναζήτηση (ήδη ομαλοποιημένη με normalize_text) στο τμήμα, με το πλήθος των αποτελεσμάτων της."""
+        term = term[:ANALYTICS_MAX_TERM_LENGTH]
+        if not term:
+            return
+        with self._lock:
+            self._bump(self._terms, term)
+            self._bump(self._class_terms.setdefault((school, tmima), {}), term)
+            if not result_count:
+                self._bump(self._zero_results, term)
+            self._dirty = True
+        self._flush_if_due()
+
+    def popular_classes(self, limit, schools=None):
+        """Τα τμήματα με τις περισσότερες επιλογές (προαιρετικά μόνο των σχολείων schools), ως (School, Tmima)."""
+        with self._lock:
+            counts = [(count, key) for key, count in self._classes.items() if schools is None or key[0] in schools]
+        return [key for _, key in sorted(counts, key=lambda item: (-item[0], item[1]))[:limit]]
+
+    def popular_terms(self, school, tmima, limit):
+        """Οι συχνότερες αναζητήσεις του τμήματος."""
+        with self._lock:
+            counts = list(self._class_terms.get((school, tmima), {}).items())
+        return [term for term, _ in sorted(counts, key=lambda item: (-item[1], item[0]))[:limit]]
+
+    def top_terms(self, limit, zero_results=False):
+        """Οι συχνότερες αναζητήσεις συνολικά (ή μόνο όσες δεν έδωσαν αποτέλεσμα) ως (φράση, πλήθος)."""
+        with self._lock:
+            counts = list((self._zero_results if zero_results else self._terms).items())
+        return sorted(counts, key=lambda item: (-item[1], item[0]))[:limit]
+
+    def record_warmup(self, shard_key, classes, queries, seconds):
+        with self._lock:
+            self.warmups = (self.warmups + [{
+                'shard': shard_key, 'classes': classes, 'queries': queries,
+                'ms': 1000 * seconds, 'at': datetime.now(),
+            }])[-5:]
+
+    def _flush_if_due(self):
+        with self._lock:
+            due = self._dirty and time.time() - self._flushed_at >= self._flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Γράφει τους μετρητές στο αρχείο (μέσω προσωρινού αρχείου), αν υπάρχουν αλλαγές."""
+        with self._lock:
+            if not self._path or not self._dirty:
+                return
+            payload = json.dumps({
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+                'terms': self._terms,
+                'zero_results': self._zero_results,
+                'classes': [
+                    {'school': school, 'tmima': tmima, 'selections': self._classes.get((school, tmima), 0),
+                     'terms': self._class_terms.get((school, tmima), {})}
+                    for school, tmima in sorted(set(self._classes) | set(self._class_terms))
+                ],
+            }, ensure_ascii=False)
+            self._dirty = False
+            self._flushed_at = time.time()
+        tmp_path = f"{self._path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+@st.cache_resource
+def get_query_analytics():
+    """Επιστρέφει τους κοινόχρηστους μετρητές χρήσης (γράφονται και στον τερματισμό της διεργασίας)."""
+    analytics = QueryAnalytics(ANALYTICS_PATH, flush_interval=ANALYTICS_FLUSH_SECONDS)
+    atexit.register(analytics.flush)
+    return analytics
+
+def track_class_selection(school, tmima):
+    """Καταγράφει την επιλογή τμήματος μία φορά ανά αλλαγή (όχι σε κάθε επανεκτέλεση της σελίδας)."""
+    if st.session_state.get('analytics_class') != (school, tmima):
+        st.session_state['analytics_class'] = (school, tmima)
+        get_query_analytics().record_class(school, tmima)
+
+def track_search(school, tmima, term, result_count):
+    """Καταγράφει μια αναζήτηση μία φορά ανά νέα φράση της συνεδρίας (όχι σε κάθε επανεκτέλεση)."""
+    if st.session_state.get('analytics_search') != (school, tmima, term):
+        st.session_state['analytics_search'] = (school, tmima, term)
+        get_query_analytics().record_search(school, tmima, term, result_count)
+
+def warm_classbot_caches(views, classes, today, section_cache, query_cache, analytics, link_fetcher=None):
+    """
+    Προθερμαίνει τα τμήματα classes: όψεις (DataFrame/χάρτες αναζήτησης), έτοιμο HTML των ενοτήτων
+    ροής και τα αποτελέσματα των WARM_QUERIES συχνότερων αναζητήσεών τους. Επιστρέφει το πλήθος των αναζητήσεων.
+    Χρησιμοποιεί μόνο τις caches που της δίνονται (καμία κλήση του Streamlit), ώστε να τρέχει εκτός συνεδρίας.
+    """
+    queries = 0
+    for school, tmima in classes:
+        views.search_maps(school, tmima) # Χτίζει και το class_frame
+        feed_sections_html(views, school, tmima, today, section_cache, link_fetcher)
+        for term in analytics.popular_terms(school, tmima, WARM_QUERIES):
+            search_class_results(views, school, tmima, term, query_cache)
+            queries += 1
+    return queries
+
+def start_cache_warmup(views):
+    """
+    Μετά από νέα φόρτωση δεδομένων: προθέρμανση των WARM_CLASSES δημοφιλέστερων τμημάτων του shard
+    σε thread στο παρασκήνιο. Οι caches κλειδώνουν ανά κλειδί, οπότε ένας επισκέπτης που φτάνει
+    στη διάρκειά της περιμένει τον ίδιο υπολογισμό αντί να τον επαναλάβει. Το thread δεν παίρνει το
+    context της συνεδρίας (που μπορεί να έχει ήδη τελειώσει): οι κοινόχρηστες caches αναζητούνται εδώ
+    και του δίνονται έτοιμες.
+    """
+    analytics = get_query_analytics()
+    classes = analytics.popular_classes(WARM_CLASSES, schools=set(views.schools()))
+    if not classes:
+        return None
+    section_cache, query_cache = get_rendered_section_cache(), get_query_result_cache()
+    link_fetcher = get_link_preview_fetcher() if LINK_PREVIEWS_ENABLED else None
+
+    def _warm():
+        start = time.perf_counter()
+        queries = warm_classbot_caches(views, classes, datetime.now().date(), section_cache, query_cache, analytics, link_fetcher)
+        analytics.record_warmup(views.shard_key, len(classes), queries, time.perf_counter() - start)
+
+    thread = threading.Thread(target=_warm, name="classbot-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def show_cache_stats():
+    """Εμφανίζει στατιστικά των caches στην πλευρική στήλη (όταν `show_cache_stats = true` στα secrets)."""
+    if not st.secrets.get("show_cache_stats", False):
+        return
+    with st.sidebar.expander("📊 Στατιστικά Cache"):
+        stats = get_rendered_section_cache().stats()
+        st.markdown(
+            f"**Ενότητες ροής:** {stats['entries']} εγγραφές, "
+            f"{stats['hits']} hits / {stats['misses']} misses "
+            f"(hit rate {stats['hit_rate']:.0%})"
+        )
+        stats = get_query_result_cache().stats()
+        st.markdown(
+            f"**Αναζητήσεις:** {stats['entries']} εγγραφές, "
+            f"{stats['hits']} hits / {stats['misses']} misses "
+            f"(hit rate {stats['hit_rate']:.0%})"
+        )
+        # Μνήμη ανά cache (για τη διαστασιολόγηση του container)
+        budget = get_memory_budget().stats()
+        st.markdown(f"**Μνήμη caches:** {budget['used_bytes'] / 2**20:.1f} από {budget['budget_bytes'] / 2**20:.0f} MB")
+        st.dataframe(pd.DataFrame([
+            {
+                'Cache': name, 'Εγγραφές': cache['entries'], 'MB': round(cache['bytes'] / 2**20, 2),
+                'Hit rate': f"{cache['hit_rate']:.0%}", 'Αφαιρέσεις': cache['evictions'],
+            }
+            for name, cache in budget['caches'].items()
+        ] + [
+            # Δεσμευμένη μνήμη (π.χ. οι όψεις ClassBotViews): μετρά στο όριο αλλά δεν αφαιρείται
+            {'Cache': name, 'Εγγραφές': None, 'MB': round(size / 2**20, 2), 'Hit rate': "-", 'Αφαιρέσεις': None}
+            for name, size in budget['reserved'].items()
+        ]), hide_index=True)
+        if LINK_PREVIEWS_ENABLED:
+            stats = get_link_preview_fetcher().cache.stats()
+            by_status = ", ".join(f"{status}: {count}" for status, count in sorted(stats['by_status'].items()))
+            st.markdown(f"**Σύνδεσμοι:** {stats['entries']} ελεγμένοι ({by_status or '-'})")
+        analytics = get_query_analytics()
+        popular = ", ".join(f"{school}/{tmima}" for school, tmima in analytics.popular_classes(5))
+        st.markdown(f"**Δημοφιλή τμήματα:** {popular or '-'}")
+        zero_results = ", ".join(f"{term} ({count})" for term, count in analytics.top_terms(5, zero_results=True))
+        st.markdown(f"**Αναζητήσεις χωρίς αποτέλεσμα:** {zero_results or '-'}")
+        for warmup in analytics.warmups:
+            st.markdown(
+                f"**Προθέρμανση {warmup['shard'] or CLASSBOT_SHEET}:** {warmup['classes']} τμήματα, "
+                f"{warmup['queries']} αναζητήσεις σε {warmup['ms']:.0f} ms ({warmup['at'].strftime('%H:%M:%S')})"
+            )
+        # Όριο αιτημάτων Google API: αναμονές, ουρές, 429 και συγχωνευμένες αναγνώσεις
+        quota = get_sheets_quota().stats()
+        for kind, bucket in quota['buckets'].items():
+            queued = sum(bucket['queued'].values())
+            st.markdown(
+                f"**API {kind}:** {bucket['calls']} αιτήματα, {bucket['throttled']} με αναμονή "
+                f"(μέση {bucket['avg_wait_ms']:.0f} ms, μέγιστη {bucket['max_wait_ms']:.0f} ms), "
+                f"ουρά {queued} (μέγιστη {bucket['max_queue']}), 429: {bucket['rate_limited']}, "
+                f"timeouts: {bucket['timeouts']}, διαθέσιμα {bucket['tokens']:.0f}/{bucket['per_minute']:.0f}"
+            )
+        st.markdown(f"**API συγχωνευμένες αναγνώσεις:** {quota['collapsed']}")
+        for spreadsheet_name, version in get_data_version_probe().stats().items():
+            status = "⚠️ χωρίς απάντηση" if version['failed'] else version['modified']
+            st.markdown(f"**{spreadsheet_name}:** epoch {version['epoch']} ({status})")
+        # Κόστος επανεκτέλεσης: ολόκληρη η σελίδα ('page') έναντι των fragments που ξανατρέχουν μόνα τους
+        for scope, cost in sorted(get_rerun_cost_meter().stats().items()):
+            st.markdown(
+                f"**Εκτέλεση {scope}:** {cost['runs']} φορές, "
+                f"μέσος χρόνος {cost['avg_ms']:.0f} ms (μέγιστος {cost['max_ms']:.0f} ms)"
+            )
+
+def is_admin():
+    """True αν ο συνδεδεμένος χρήστης περιλαμβάνεται στο `admin_userids` των secrets."""
+    userid = st.session_state.get('logged_in_userid')
+    return bool(st.session_state.get('authenticated') and userid) and userid in st.secrets.get("admin_userids", [])
+
+def show_quarantine_report():
+    """Εμφανίζει στους διαχειριστές τις σειρές που μπήκαν σε καραντίνα κατά την τελευταία φόρτωση."""
+    if not is_admin():
+        return
+    reports = get_ingest_quarantine().reports()
+    if not reports:
+        return
+    total = sum(report['quarantined'] + len(report['missing_columns']) for report in reports.values())
+    with st.sidebar.expander(f"🧹 Καραντίνα δεδομένων ({total})", expanded=False):
+        for source, report in sorted(reports.items()):
+            st.markdown(
+                f"**{source}:** {report['valid']} έγκυρες, {report['quarantined']} σε καραντίνα "
+                f"(έλεγχος {report['checked_at'].strftime('%H:%M:%S')})"
+            )
+            if report['missing_columns']:
+                st.warning(f"Λείπουν οι στήλες: {', '.join(report['missing_columns'])}")
+            if report['rows']:
+                if report['quarantined'] > len(report['rows']):
+                    st.caption(f"Εμφανίζονται οι πρώτες {len(report['rows'])} σειρές.")
+                st.dataframe(pd.DataFrame(report['rows']), hide_index=True)
+
+
+# --------------------------------------------------------------------------------
+# 4. UI / ΚΥΡΙΑ ΛΟΓΙΚΗ
+# --------------------------------------------------------------------------------
+
+# ΟΡΙΣΤΕ ΤΗΝ RAW URL ΓΙΑ ΤΟ ΛΟΓΟΤΥΠΟ
+RAW_IMAGE_URL = "https://raw.githubusercontent.com/nikosn937/bot/main/ClassBot.gif"
+
+@measured_fragment("feed")
+def show_feed_sections(views, selected_school, selected_tmima):
+    """Οι ενότητες "Πρόσφατες Ανακοινώσεις" και "Προσεχείς Ενέργειες" του τμήματος."""
+    # ----------------------------------------------------------------------
+    # ΕΜΦΑΝΙΣΗ ΤΕΛΕΥΤΑΙΩΝ 2 ΗΜΕΡΩΝ 
+    # ----------------------------------------------------------------------
+
+    today = datetime.now().date()
+    recent_html, upcoming_html = feed_sections_html(views, selected_school, selected_tmima, today)
+
+    if recent_html:
+        st.markdown(f"## 📢 Πρόσφατες Ανακοινώσεις ({selected_tmima})")
+        st.info(f"Εμφανίζονται οι καταχωρήσεις των τελευταίων {RECENT_DAYS} ημερών.")
+        st.markdown(recent_html, unsafe_allow_html=True)
         st.markdown("---") 
-        
-        # 2. Εμφάνιση Φόρμας Διαχείρισης (Διόρθωσης/Διαγραφής)
-        manage_user_posts(full_df, logged_in_userid)
-        st.markdown("---")
-        
-    elif is_authenticated:
-        st.warning(f"Είστε συνδεδεμένος ως εκπαιδευτικός του **{logged_in_school}** (UserId: {logged_in_userid}). Για καταχώρηση/διαχείριση, πρέπει να επιλέξετε το σχολείο σας ('{logged_in_school}').")
+    else:
+        st.info(f"Δεν υπάρχουν πρόσφατες ανακοινώσεις (τελευταίες {RECENT_DAYS} ημέρες) για το τμήμα {selected_tmima}.")
         st.markdown("---")
+
+    # ----------------------------------------------------------------------
+    # ΕΝΟΤΗΤΑ: ΠΡΟΣΕΧΕΙΣ ΕΝΕΡΓΕΙΕΣ (ΗΜΕΡΟΛΟΓΙΟ)
+    # ----------------------------------------------------------------------
+
+    if upcoming_html:
+        future_limit = today + timedelta(days=UPCOMING_DAYS)
+        st.markdown(f"## 📅 Προσεχείς Ενέργειες/Γεγονότα ({selected_tmima})")
+        st.info(f"Εμφανίζονται οι καταχωρήσεις που πρέπει να γίνουν από σήμερα μέχρι την {future_limit.strftime(DATE_FORMAT)}.")
+        st.markdown(upcoming_html, unsafe_allow_html=True)
+        st.markdown("---") 
     else:
-        st.info("Για να δείτε/χρησιμοποιήσετε τη φόρμα καταχώρησης/διαχείρισης, παρακαλώ συνδεθείτε ως εκπαιδευτικός από την πλαϊνή στήλη (sidebar).")
+        st.info(f"Δεν υπάρχουν προγραμματισμένες ενέργειες/γεγονότα για το τμήμα {selected_tmima} τις επόμενες {UPCOMING_DAYS} ημέρες.")
         st.markdown("---")
+    # ----------------------------------------------------------------------
+    # ΤΕΛΟΣ: ΠΡΟΣΕΧΕΙΣ ΕΝΕΡΓΕΙΕΣ
+    # ----------------------------------------------------------------------
 
+@measured_fragment("search")
+def show_search_section(views, selected_school, selected_tmima):
+    """Το πεδίο αναζήτησης φράσεων-κλειδιών του τμήματος και τα αποτελέσματά του."""
+    st.markdown("## 🔍 Αναζήτηση Παλαιότερων Πληροφοριών")
+    st.info("Για να βρείτε κάτι συγκεκριμένο ή παλαιότερο, πληκτρολογήστε τη φράση-κλειδί (keyword) παρακάτω.")
 
-    # Φιλτράρισμα βάσει του επιλεγμένου σχολείου
-    filtered_df_school = full_df[full_df['School'] == selected_school].copy()
+    # ----------------------------------------------------------------------
+    # ΛΟΓΙΚΗ ΑΝΑΖΗΤΗΣΗΣ (Με χρήση CSS Card Styling & Link Fix)
+    # ----------------------------------------------------------------------
 
-    # Εύρεση διαθέσιμων τμημάτων για το επιλεγμένο σχολείο (για την αναζήτηση - από τα δεδομένα)
-    current_tmimata = sorted(filtered_df_school['Tmima'].unique().tolist())
+    tag_to_keyword_map, keyword_to_data_map = views.search_maps(selected_school, selected_tmima)
+    current_available_keys = sorted(keyword_to_data_map)
+
+    info_message = f"Διαθέσιμες φράσεις-κλειδιά: **{', '.join(current_available_keys)}**" if current_available_keys else "Δεν βρέθηκαν διαθέσιμες φράσεις-κλειδιά για αυτά τα κριτήρια."
+    st.info(info_message)
+
+    # Οι προτάσεις (δημοφιλείς αναζητήσεις του τμήματος και tags) φιλτράρονται στον browser όσο
+    # πληκτρολογεί ο χρήστης, χωρίς rerun ανά πλήκτρο: το fragment ξανατρέχει μόνο όταν επιλεγεί
+    # μια πρόταση ή καταχωρηθεί νέα φράση (Enter).
+    user_input = st.selectbox(
+        'Τι θέλεις να μάθεις;',
+        options=search_suggestions(views, selected_school, selected_tmima),
+        index=None,
+        accept_new_options=True,
+        placeholder='Πληκτρολόγησε π.χ. εκδρομη, εργασια, βιβλια...',
+        key="search_query" # Σταθερό κλειδί: η σειρά των προτάσεων αλλάζει χωρίς να χάνεται η αναζήτηση
+    )
 
-    # --------------------------------------------------------------------------
-    # ΛΟΓΙΚΗ: ΥΠΟΧΡΕΩΤΙΚΗ ΕΠΙΛΟΓΗ ΤΜΗΜΑΤΟΣ ΓΙΑ ΑΝΑΖΗΤΗΣΗ
-    # --------------------------------------------------------------------------
+    if user_input and keyword_to_data_map:
+        search_tag = normalize_text(user_input)
+        results = search_class_results(views, selected_school, selected_tmima, search_tag)
+        track_search(selected_school, selected_tmima, search_tag, len(results))
+
+        if results:
+            st.success(f"Βρέθηκαν **{len(results)}** πληροφορίες για το '{user_input}'.")
+            link_previews = link_previews_for(views.class_frame(selected_school, selected_tmima))
+
+            for date_obj, info, url, item_type, school, tmima, keyword_result in results:
+                date_str = date_obj.strftime(DATE_FORMAT) if pd.notna(date_obj) else "Άγνωστη Ημ/νία"
+                st.markdown(render_card_html(item_type, info, url, keyword_result, date_str, link_meta=link_previews.get(url)), unsafe_allow_html=True)
 
-    if not current_tmimata:
-        st.warning(f"Το Σχολείο '{selected_school}' δεν έχει καταχωρήσεις τμημάτων στο σύστημα για αναζήτηση.")
+        else:
+            st.warning(f"Δεν βρέθηκε απάντηση για το: '{user_input}'.")
+
+    st.markdown("---")
 
+SCHOOL_FEED_OPTION = "🏫 Όλα τα τμήματα"
+
+def set_school_feed_page(page):
+    st.session_state['school_feed_page'] = page
+
+@measured_fragment("school_feed")
+def show_school_feed(views, selected_school, current_tmimata):
+    """Ενιαίο χρονολόγιο του σχολείου (ή των επιλεγμένων τμημάτων), με ετικέτα τμήματος και σελιδοποίηση."""
+    st.markdown(f"## 🏫 Ροή Σχολείου ({selected_school})")
+    selected_tmimata = st.multiselect(
+        "Τμήματα:",
+        options=current_tmimata,
+        default=current_tmimata,
+        key="school_feed_tmimata",
+        help="Π.χ. μόνο τα τμήματα των παιδιών σας."
+    )
+    kind = st.radio(
+        "Εμφάνιση:",
+        (SCHOOL_FEED_RECENT, SCHOOL_FEED_UPCOMING),
+        format_func={SCHOOL_FEED_RECENT: "📢 Ανακοινώσεις", SCHOOL_FEED_UPCOMING: "📅 Προσεχείς Ενέργειες"}.get,
+        horizontal=True,
+        key="school_feed_kind"
+    )
+    if not selected_tmimata:
+        st.info("Επιλέξτε τουλάχιστον ένα τμήμα.")
+        st.markdown("---")
+        return
+
+    # Η σελίδα μηδενίζεται όταν αλλάξουν τα κριτήρια (σχολείο, τμήματα, είδος)
+    criteria = (selected_school, tuple(selected_tmimata), kind)
+    if st.session_state.get('school_feed_criteria') != criteria:
+        st.session_state['school_feed_criteria'] = criteria
+        st.session_state['school_feed_page'] = 0
+    page = st.session_state['school_feed_page']
+
+    today = datetime.now().date()
+    items, has_more = school_feed_page(views, selected_school, selected_tmimata, kind, today, page)
+    if items:
+        st.markdown(render_school_feed_page(items, kind, today), unsafe_allow_html=True)
+    elif kind == SCHOOL_FEED_RECENT:
+        st.info("Δεν υπάρχουν ανακοινώσεις για τα επιλεγμένα τμήματα.")
     else:
-        # 3β. Υποχρεωτική επιλογή Τμήματος για Αναζήτηση
-        selected_tmima = st.selectbox(
-            "Επιλέξτε Τμήμα (Υποχρεωτικό για Αναζήτηση):",
-            options=["-- Επιλέξτε Τμήμα --"] + current_tmimata,
-            key="tmima_selector"
-        )
+        st.info(f"Δεν υπάρχουν προγραμματισμένες ενέργειες/γεγονότα για τα επιλεγμένα τμήματα τις επόμενες {UPCOMING_DAYS} ημέρες.")
 
-        # ΕΚΚΙΝΗΣΗ ΛΟΓΙΚΗΣ ΕΜΦΑΝΙΣΗΣ ΜΟΝΟ ΑΝ ΕΧΕΙ ΕΠΙΛΕΓΕΙ ΕΓΚΥΡΟ ΤΜΗΜΑ
-        if selected_tmima and selected_tmima != "-- Επιλέξτε Τμήμα --":
+    # Σελιδοποίηση: το callback αλλάζει τη σελίδα πριν ξανατρέξει (μόνο) το fragment
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    col_prev.button(
+        "◀ Νεότερα" if kind == SCHOOL_FEED_RECENT else "◀ Προηγούμενα", disabled=page == 0,
+        on_click=set_school_feed_page, args=(page - 1,), key="school_feed_prev"
+    )
+    col_page.caption(f"Σελίδα {page + 1}")
+    col_next.button(
+        "Παλαιότερα ▶" if kind == SCHOOL_FEED_RECENT else "Επόμενα ▶", disabled=not has_more,
+        on_click=set_school_feed_page, args=(page + 1,), key="school_feed_next"
+    )
+    st.markdown("---")
 
-            # 4. ΤΕΛΙΚΟ ΦΙΛΤΡΑΡΙΣΜΑ DF ανά ΤΜΗΜΑ
-            filtered_df = filtered_df_school[filtered_df_school['Tmima'] == selected_tmima]
 
-            # ----------------------------------------------------------------------
-            # ΕΜΦΑΝΙΣΗ ΤΕΛΕΥΤΑΙΩΝ 2 ΗΜΕΡΩΝ 
-            # ----------------------------------------------------------------------
+def main():
+    """Σχεδιάζει τη σελίδα (εκτελείται από το `streamlit run voithos.py`)."""
+    st.set_page_config(page_title="Βοηθός Τάξης", layout="centered")
 
-            two_days_ago = datetime.now() - timedelta(days=2)
-            recent_posts = filtered_df[filtered_df['Date'].dt.date >= two_days_ago.date()]
+    # Εφαρμογή του Custom CSS
+    apply_custom_css()
 
-            if not recent_posts.empty:
-                st.markdown(f"## 📢 Πρόσφατες Ανακοινώσεις ({selected_tmima})")
-                st.info("Εμφανίζονται οι καταχωρήσεις των τελευταίων 2 ημερών.")
+    # Δημιουργία δύο στηλών: η πρώτη (1/5) για το λογότυπο, η δεύτερη (4/5) για τον τίτλο
+    col1, col2 = st.columns([1, 4])
 
-                recent_posts = recent_posts.sort_values(by='Date', ascending=False)
+    with col1:
+        st.image(RAW_IMAGE_URL, width=150)
 
-                for _, row in recent_posts.iterrows():
-                    date_str = row['Date'].strftime(DATE_FORMAT)
-                    keyword = row['Keyword']
-                    item_type = row['Type'].strip().lower()
+    with col2:
+        st.markdown("<h2 class='main-header'>Ψηφιακός Βοηθός Τάξης</h2>", unsafe_allow_html=True)
+        st.caption("Steam Project")
 
-                    # Επιλογή κλάσης CSS βάσει τύπου
-                    css_class = 'info-card'
-                    content = ""
-                    
-                    if item_type == 'link':
-                        css_class += ' info-card-link'
-                        link_description = row['Info'].strip()
-                        link_url = row['URL'].strip()
-                        # ΔΙΟΡΘΩΣΗ: Καθαρό HTML <a> tag με quote_plus
-                        safe_url = quote_plus(link_url, safe=':/') 
-                        content = f"🔗 **Σύνδεσμος:** <a href='{safe_url}' target='_blank' style='color: #1A5276; text-decoration: none;'>{link_description}</a>"
-                    elif item_type == 'text':
-                        css_class += ' info-card-text'
-                        content = f"💬 **Περιγραφή:** {row['Info']}"
-
-                    # Δόμηση της κάρτας HTML
-                    card_html = f"""
-                    <div class="{css_class}">
-                        <span class="card-date">🗓️ {date_str}</span>
-                        {content}
-                        <div class="card-keyword">🔑 Keyword: {keyword}</div>
-                    </div>
-                    """
-                    st.markdown(card_html, unsafe_allow_html=True)
-
-                st.markdown("---") 
-            else:
-                st.info(f"Δεν υπάρχουν πρόσφατες ανακοινώσεις (τελευταίες 2 ημέρες) για το τμήμα {selected_tmima}.")
-                st.markdown("---")
+    st.markdown("---") 
 
-            # ----------------------------------------------------------------------
-            # ΕΝΟΤΗΤΑ: ΠΡΟΣΕΧΕΙΣ ΕΝΕΡΓΕΙΕΣ (ΗΜΕΡΟΛΟΓΙΟ)
-            # ----------------------------------------------------------------------
-            
-            # Υπολογισμός των 30 ημερών από σήμερα
-            today = datetime.now().date()
-            future_limit = today + timedelta(days=30)
-            
-            # ΔΙΟΡΘΩΣΗ: Φιλτράρουμε πρώτα τις έγκυρες ActionDate για να αποφύγουμε TypeError στη σύγκριση
-            valid_action_dates = filtered_df[pd.notna(filtered_df['ActionDate'])].copy()
+    # Φόρτωση όλων των δεδομένων και των διαθέσιμων επιλογών. Η σελίδα διαβάζει από τις
+    # όψεις (ClassBotViews), που ενημερώνονται σταδιακά από το αρχείο αλλαγών.
+    views = None
+    if SHARDED_MODE:
+        # Σε λειτουργία shards φορτώνεται εδώ μόνο ο πίνακας δρομολόγησης.
+        # Τα δεδομένα φορτώνονται μετά την επιλογή σχολείου (μόνο τα shards των ενεργών συνεδριών).
+        available_schools = sorted(shard_routes())
+    else:
+        # Το ClassBot κατεβαίνει μόνο όταν αλλάξει η έκδοσή του (βλ. refresh_classbot_views)
+        data_version = classbot_data_version()
+        views = refresh_classbot_views(data_version, load_data, (data_version,))
+        available_schools = views.schools() if views else []
+    df_users = load_users_data(settings_data_version()) # Φόρτωση δεδομένων χρηστών
+
+    # ΕΝΣΩΜΑΤΩΣΗ ΦΟΡΜΑΣ ΣΥΝΔΕΣΗΣ ΣΤΗΝ ΠΛΕΥΡΙΚΗ ΣΤΗΛΗ
+    is_authenticated = teacher_login(df_users)
+    show_cache_stats()
+    show_quarantine_report()
+    st.markdown("---")
 
-            # ΦΙΛΤΡΟ:
-            # 1. Πρέπει να υπάρχει ActionDate (δεν είναι NaT - Not a Time)
-            # 2. Η ActionDate πρέπει να είναι στο μέλλον (από σήμερα και για 30 μέρες)
-            future_posts = valid_action_dates[
-                (valid_action_dates['ActionDate'].dt.date >= today) & 
-                (valid_action_dates['ActionDate'].dt.date <= future_limit)
-            ].copy()
 
+    # 1. ΕΠΙΛΟΓΗ ΣΧΟΛΕΙΟΥ
+    logged_in_school_val = st.session_state.get('logged_in_school')
+    default_index = 0
+    if logged_in_school_val and logged_in_school_val in available_schools:
+        # Εύρεση της index για την αυτόματη επιλογή
+        try:
+            default_index = available_schools.index(logged_in_school_val) + 1
+        except ValueError:
+            default_index = 0
+
+    selected_school = st.selectbox(
+        "Επιλέξτε Σχολείο:",
+        options=["-- Επιλέξτε --"] + available_schools,
+        index=default_index, # Χρησιμοποιούμε την default_index
+        key="school_selector"
+    )
 
-            if not future_posts.empty:
-                st.markdown(f"## 📅 Προσεχείς Ενέργειες/Γεγονότα ({selected_tmima})")
-                st.info(f"Εμφανίζονται οι καταχωρήσεις που πρέπει να γίνουν από σήμερα μέχρι την {future_limit.strftime(DATE_FORMAT)}.")
+    if SHARDED_MODE and selected_school and selected_school != "-- Επιλέξτε --":
+        # Ενημέρωση των όψεων του σχολείου· τα υπόλοιπα ενεργά σχολεία ανανεώνονται στο παρασκήνιο
+        mark_school_active(selected_school)
+        views = load_school_views(active_shard_schools(), selected_school)
 
-                # ΠΡΟΣΘΗΚΗ: Δημιουργία στήλης με μόνο την ημερομηνία για ομαδοποίηση
-                future_posts['Action_Date_Only'] = future_posts['ActionDate'].dt.date
-                
-                # Ταξινόμηση βάση της ActionDate
-                future_posts = future_posts.sort_values(by='ActionDate', ascending=True)
+    # 2. ΦΙΛΤΡΑΡΙΣΜΑ ανά ΣΧΟΛΕΙΟ
+    # (Αρκεί να υπάρχουν οι όψεις: ένα άδειο shard σχολείου πρέπει να δέχεται την πρώτη καταχώρηση)
+    if selected_school and selected_school != "-- Επιλέξτε --" and views is not None:
 
-                # ΝΕΟ: Ομαδοποίηση ανά ημερομηνία
-                grouped_posts = future_posts.groupby('Action_Date_Only')
+        logged_in_school = st.session_state.get('logged_in_school')
+        logged_in_userid = st.session_state.get('logged_in_userid') 
 
-                for date_only, group in grouped_posts:
-                    # Εμφάνιση της ΗΜΕΡΟΜΗΝΙΑΣ ως επικεφαλίδα
-                    date_str = date_only.strftime(DATE_FORMAT)
-                    
-                    # Υπολογισμός ημερών που απομένουν για έμφαση
-                    days_remaining = (date_only - today).days
-                    days_message = ""
-                    if days_remaining == 0:
-                        days_message = "**ΣΗΜΕΡΑ!**"
-                    elif days_remaining == 1:
-                        days_message = "**ΑΥΡΙΟ!**"
-                    elif days_remaining > 1:
-                        days_message = f"Σε **{days_remaining}** ημέρες"
-                    
-                    # Επικεφαλίδα Ημέρας
-                    st.markdown(f"### 🗓️ {date_str} - {days_message}")
-                    st.markdown('<div style="margin-bottom: 10px; border-bottom: 1px dashed #D6EAF8;"></div>', unsafe_allow_html=True) # Οπτικός διαχωρισμός
-
-                    # Εμφάνιση των γεγονότων για αυτήν την ημέρα
-                    for _, row in group.iterrows():
-                        # Χρησιμοποιούμε την ActionDate για την εμφάνιση
-                        
-                        keyword = row['Keyword']
-                        item_type = row['Type'].strip().lower()
-
-                        # Επιλογή κλάσης CSS: Χρησιμοποιούμε μπλε για τις επικείμενες ενέργειες
-                        css_class = 'info-card'
-                        content = ""
-                        
-                        if item_type == 'link':
-                            css_class += ' info-card-link'
-                            link_description = row['Info'].strip()
-                            link_url = row['URL'].strip()
-                            safe_url = quote_plus(link_url, safe=':/') 
-                            content = f"🔗 **Σύνδεσμος:** <a href='{safe_url}' target='_blank' style='color: #1A5276; text-decoration: none;'>{link_description}</a>"
-                        elif item_type == 'text':
-                            css_class += ' info-card-text'
-                            content = f"💬 **Περιγραφή:** {row['Info']}"
-
-                        # Δόμηση της κάρτας HTML (αφαιρούμε την ημερομηνία από την κάρτα, καθώς είναι στην επικεφαλίδα)
-                        card_html = f"""
-                        <div class="{css_class}">
-                            {content}
-                            <div class="card-keyword">🔑 Keyword: {keyword}</div>
-                        </div>
-                        """
-                        st.markdown(card_html, unsafe_allow_html=True)
-
-                st.markdown("---") 
-            else:
-                st.info(f"Δεν υπάρχουν προγραμματισμένες ενέργειες/γεγονότα για το τμήμα {selected_tmima} τις επόμενες 30 ημέρες.")
-                st.markdown("---")
-            # ----------------------------------------------------------------------
-            # ΤΕΛΟΣ: ΠΡΟΣΕΧΕΙΣ ΕΝΕΡΓΕΙΕΣ
-            # ----------------------------------------------------------------------
+        # --------------------------------------------------------------------------
+        # ΕΛΕΓΧΟΣ ΠΡΟΣΒΑΣΗΣ ΦΟΡΜΑΣ ΚΑΤΑΧΩΡΗΣΗΣ / ΔΙΑΧΕΙΡΙΣΗΣ
+        # --------------------------------------------------------------------------
+        if is_authenticated and logged_in_school == selected_school:
+            # 1. Εμφάνιση Φόρμας Καταχώρησης
+            data_entry_form(available_schools, logged_in_school, logged_in_userid)
+            st.markdown("---") 
 
+            # 2. Εμφάνιση Φόρμας Διαχείρισης (Διόρθωσης/Διαγραφής)
+            manage_user_posts(views, logged_in_userid)
+            st.markdown("---")
 
-            st.markdown("## 🔍 Αναζήτηση Παλαιότερων Πληροφοριών")
-            st.info("Για να βρείτε κάτι συγκεκριμένο ή παλαιότερο, πληκτρολογήστε τη φράση-κλειδί (keyword) παρακάτω.")
+        elif is_authenticated:
+            st.warning(f"Είστε συνδεδεμένος ως εκπαιδευτικός του **{logged_in_school}** (UserId: {logged_in_userid}). Για καταχώρηση/διαχείριση, πρέπει να επιλέξετε το σχολείο σας ('{logged_in_school}').")
+            st.markdown("---")
+        else:
+            st.info("Για να δείτε/χρησιμοποιήσετε τη φόρμα καταχώρησης/διαχείρισης, παρακαλώ συνδεθείτε ως εκπαιδευτικός από την πλαϊνή στήλη (sidebar).")
+            st.markdown("---")
 
-            # ----------------------------------------------------------------------
-            # ΛΟΓΙΚΗ ΑΝΑΖΗΤΗΣΗΣ (Με χρήση CSS Card Styling & Link Fix)
-            # ----------------------------------------------------------------------
 
-            tag_to_keyword_map, keyword_to_data_map = create_search_maps(filtered_df)
-            current_available_keys = sorted(filtered_df['Keyword'].unique().tolist())
+        # Εύρεση διαθέσιμων τμημάτων για το επιλεγμένο σχολείο (για την αναζήτηση - από τα δεδομένα)
+        current_tmimata = views.classes(selected_school)
 
-            info_message = f"Διαθέσιμες φράσεις-κλειδιά: **{', '.join(current_available_keys)}**" if current_available_keys else "Δεν βρέθηκαν διαθέσιμες φράσεις-κλειδιά για αυτά τα κριτήρια."
-            st.info(info_message)
+        # --------------------------------------------------------------------------
+        # ΛΟΓΙΚΗ: ΥΠΟΧΡΕΩΤΙΚΗ ΕΠΙΛΟΓΗ ΤΜΗΜΑΤΟΣ ΓΙΑ ΑΝΑΖΗΤΗΣΗ
+        # --------------------------------------------------------------------------
 
-            user_input = st.text_input(
-                'Τι θέλεις να μάθεις;',
-                placeholder='Πληκτρολόγησε π.χ. εκδρομη, εργασια, βιβλια...'
+        if not current_tmimata:
+            st.warning(f"Το Σχολείο '{selected_school}' δεν έχει καταχωρήσεις τμημάτων στο σύστημα για αναζήτηση.")
+
+        else:
+            # 3β. Υποχρεωτική επιλογή Τμήματος για Αναζήτηση
+            selected_tmima = st.selectbox(
+                "Επιλέξτε Τμήμα (Υποχρεωτικό για Αναζήτηση):",
+                options=["-- Επιλέξτε Τμήμα --", SCHOOL_FEED_OPTION] + current_tmimata,
+                key="tmima_selector"
             )
 
-            if user_input and keyword_to_data_map:
-                search_tag = normalize_text(user_input)
-                matching_keywords = tag_to_keyword_map.get(search_tag, set())
-
-                if matching_keywords:
-                    all_results = []
-
-                    for keyword in matching_keywords:
-                        # Το zip έχει 9 στοιχεία: (Info, URL, Type, Date, School, Tmima, UserId, ActionDate, Internal_ID)
-                        all_results.extend(keyword_to_data_map.get(keyword, []))
-
-                    st.success(f"Βρέθηκαν **{len(all_results)}** πληροφορίες για το '{user_input}'.")
-
-                    results_list = []
-                    # Αγνοούμε UserId, ActionDate και Internal_ID για την εμφάνιση. Προσθέτουμε πίσω το keyword για εμφάνιση.
-                    for info, url, item_type, date_obj, school, tmima, _, _, _ in all_results:
-                        # Στοιχείο 7: Keyword
-                        results_list.append((date_obj, info, url, item_type, school, tmima, keyword))
-
-                    results_list.sort(key=lambda x: x[0], reverse=True)
-
-                    for i, (date_obj, info, url, item_type, school, tmima, keyword_result) in enumerate(results_list, 1):
-                        date_str = date_obj.strftime(DATE_FORMAT) if pd.notna(date_obj) else "Άγνωστη Ημ/νία"
-                        
-                        item_type_clean = item_type.strip().lower()
-                        css_class = 'info-card'
-                        content = ""
-
-                        if item_type_clean == 'link':
-                            css_class += ' info-card-link'
-                            link_description = info.strip()
-                            link_url = url.strip()
-                            if link_url:
-                                # ΔΙΟΡΘΩΣΗ: Καθαρό HTML <a> tag με quote_plus
-                                safe_url = quote_plus(link_url, safe=':/')
-                                content = f"🔗 **Σύνδεσμος:** <a href='{safe_url}' target='_blank' style='color: #1A5276; text-decoration: none;'>{link_description}</a>"
-                            else:
-                                content = f"⚠️ **Προσοχή:** Καταχώρηση συνδέσμου χωρίς URL. Περιγραφή: {link_description}"
-
-                        elif item_type_clean == 'text':
-                            css_class += ' info-card-text'
-                            content = f"💬 **Περιγραφή:** {info}"
-                        else:
-                            content = f"Άγνωστος Τύπος Καταχώρησης. {info}"
-                        
-                        # Δόμηση της κάρτας HTML
-                        card_html = f"""
-                        <div class="{css_class}">
-                            <span class="card-date">🗓️ {date_str}</span>
-                            {content}
-                            <div class="card-keyword">🔑 Keyword: {keyword_result}</div>
-                        </div>
-                        """
-                        st.markdown(card_html, unsafe_allow_html=True)
+            if selected_tmima == SCHOOL_FEED_OPTION:
+                # Ροή όλου του σχολείου (ή όσων τμημάτων επιλεγούν), χωρίς αναζήτηση
+                show_school_feed(views, selected_school, current_tmimata)
 
-                else:
-                    st.warning(f"Δεν βρέθηκε απάντηση για το: '{user_input}'.")
+            # ΕΚΚΙΝΗΣΗ ΛΟΓΙΚΗΣ ΕΜΦΑΝΙΣΗΣ ΜΟΝΟ ΑΝ ΕΧΕΙ ΕΠΙΛΕΓΕΙ ΕΓΚΥΡΟ ΤΜΗΜΑ
+            elif selected_tmima and selected_tmima != "-- Επιλέξτε Τμήμα --":
 
-            st.markdown("---")
+                track_class_selection(selected_school, selected_tmima)
+                # 4. Ενότητες ροής και αναζήτηση (fragments: μια αναζήτηση δεν ξανατρέχει τη ροή)
+                show_feed_sections(views, selected_school, selected_tmima)
+                show_search_section(views, selected_school, selected_tmima)
+
+
+    elif not available_schools:
+        st.warning("Παρακαλώ συμπληρώστε το Google Sheet με τις στήλες 'School' και 'Tmima' στο φύλλο 'ClassBot', καθώς και τα φύλλα 'Χρήστες' (UserId, School, Name, UserName, Password) και 'Σχολεία'.")
+    elif selected_school and selected_school != "-- Επιλέξτε --":
+        st.warning(f"Δεν ήταν δυνατή η φόρτωση των δεδομένων για το Σχολείο '{selected_school}'.")
+    else:
+        st.info("Παρακαλώ επιλέξτε Σχολείο για να ξεκινήσει η αναζήτηση.")
 
 
-elif full_df.empty:
-    st.warning("Παρακαλώ συμπληρώστε το Google Sheet με τις στήλες 'School' και 'Tmima' στο φύλλο 'ClassBot', καθώς και τα φύλλα 'Χρήστες' (UserId, School, Name, UserName, Password) και 'Σχολεία'.")
-else:
-    st.info("Παρακαλώ επιλέξτε Σχολείο για να ξεκινήσει η αναζήτηση.")
+    st.caption("Ψηφιακός Βοηθός Τάξης - Steam Project - nikosn937@gmail.com.")
 
 
-st.caption("Ψηφιακός Βοηθός Τάξης - Steam Project - nikosn937@gmail.com.")
+if __name__ == "__main__":
+    with get_rerun_cost_meter().measure("page"):
+        main()